@@ -0,0 +1,26 @@
+import asyncio
+import logging
+from pyhidpp import DevicesManager
+from pyhidpp.core.async_connected_device import AsyncConnectedDevice
+
+
+async def read_sensor(device_info, nb_readings=100):
+    async with AsyncConnectedDevice(device_info) as device:
+        await device.enumerate_all()
+        readings = []
+        for _ in range(nb_readings):
+            readings.append(await device.features.x9402.read_measurement(0))
+        return device_info.name, readings
+
+
+async def main():
+    dev_man = DevicesManager(log_to_console=True, log_level=logging.INFO)
+    # drive every connected device at the same time
+    results = await asyncio.gather(
+        *(read_sensor(dev) for dev in dev_man.get_devices_list())
+    )
+    for name, readings in results:
+        print(name, readings[-1])
+
+
+asyncio.run(main())
@@ -0,0 +1,139 @@
+"""
+HIDPPRequest microbenchmark: per packet time and memory of the report handling done
+by the listener (parse) and commander (serialise) threads, compared to the former
+list based request (kept below as reference)
+
+no device needed: python -m Examples.bench_request
+"""
+
+import logging
+import sys
+import timeit
+import tracemalloc
+
+from pyhidpp.core.connected_device import build_output_report
+from pyhidpp.core.request import HIDPPRequest
+
+NB_PACKETS = 100_000
+
+logger = logging.getLogger("hidpp")
+
+
+class ListRequest:
+    """
+    former HIDPPRequest (long reports only): params stored as a list, padded on
+    construction and rebuilt into a new list for every write
+    """
+
+    def __init__(self, dev_idx=0xFF, feature=0x00, function=0x00, sw_id=0x0F,
+                 params=None, req_type="LONG", from_list=None):
+        self.logger = logging.getLogger("hidpp")
+        if from_list is not None:
+            if from_list[0] == 0x11:
+                from_list.extend([0] * (20 - len(from_list)))
+                self.req_type = "LONG"
+                self.length = 20
+            self.dev_idx = from_list[1]
+            self.feature = from_list[2]
+            self.function = from_list[3] >> 4
+            self.sw_id = from_list[3] & 0x0F
+            self.params = from_list[4:]
+        else:
+            self.req_type = req_type
+            if req_type == "LONG":
+                self.length = 20
+            self.dev_idx = dev_idx
+            self.feature = feature
+            self.function = function
+            self.sw_id = sw_id
+            self.params = params
+            while len(self.params) < self.length - 4:
+                self.params.append(0)
+
+    def build_request(self):
+        req = [0x00] * self.length
+        if self.req_type == "LONG":
+            req[0] = 0x11
+        req[1] = self.dev_idx
+        req[2] = self.feature
+        req[3] = self.function << 4 | self.sw_id
+        req[4:] = self.params
+        return req
+
+
+# x9402 read_measurement response, as returned by hid.read
+REPORT = [0x11, 0x01, 0x05, 0x0A, 0x00, 0x34, 0x12, 0x78, 0x56, 0x20] + [0] * 10
+OUT = bytearray(64)
+
+
+# the list() stands for the list returned by hid.read
+def read_list_request():
+    ret = list(REPORT)
+    logger.debug("LONG R: [{}]".format(", ".join(hex(x) for x in ret)))
+    res = ListRequest(from_list=ret)
+    return res.feature, res.function, res.sw_id, res.params[1] + res.params[2] * 256
+
+
+def read_hidpp_request():
+    ret = list(REPORT)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("LONG R: [{}]".format(", ".join(hex(x) for x in ret)))
+    res = HIDPPRequest.from_report(ret)
+    return res.feature, res.function, res.sw_id, res.params[1] + res.params[2] * 256
+
+
+def write_list_request():
+    req = ListRequest(0x01, 0x05, 0, 0x0A, [0, 0, 0])
+    req_list = req.build_request()
+    logger.debug("LONG W: [{}]".format(", ".join(hex(x) for x in req_list)))
+    return req_list
+
+
+def write_hidpp_request():
+    req = HIDPPRequest(0x01, 0x05, 0, 0x0A, [0, 0, 0])
+    report = build_output_report(req, out=OUT)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("LONG W: [{}]".format(", ".join(hex(x) for x in report)))
+    return report
+
+
+def deep_size(res):
+    """
+    memory held by a parsed report (ie kept in the input queue)
+    """
+    if isinstance(res, HIDPPRequest):
+        return sys.getsizeof(res) + sys.getsizeof(res.params)
+    return (
+        sys.getsizeof(res)
+        + sys.getsizeof(res.__dict__)
+        + sys.getsizeof(res.params)
+    )
+
+
+def measure(func):
+    time_us = min(timeit.repeat(func, number=NB_PACKETS, repeat=5)) / NB_PACKETS * 1e6
+
+    # peak memory used while handling one packet
+    tracemalloc.start()
+    func()  # warm up
+    start, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return time_us, peak - start
+
+
+for name, func in [
+    ("read   list request", read_list_request),
+    ("read   HIDPPRequest", read_hidpp_request),
+    ("write  list request", write_list_request),
+    ("write  HIDPPRequest", write_hidpp_request),
+]:
+    time_us, peak = measure(func)
+    print("{}: {:6.3f} us/packet, {:5d} B peak/packet".format(name, time_us, peak))
+
+print("parsed report size: list request {} B, HIDPPRequest {} B".format(
+    deep_size(ListRequest(from_list=list(REPORT))),
+    deep_size(HIDPPRequest.from_report(REPORT)),
+))
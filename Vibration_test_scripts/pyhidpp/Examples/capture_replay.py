@@ -0,0 +1,29 @@
+import logging
+import os
+import tempfile
+from pyhidpp import DevicesManager
+from pyhidpp.simulator import ReplayHid, VirtualDevice, VirtualHid
+
+capture_path = os.path.join(tempfile.gettempdir(), "bravo.hidcap")
+
+# capture a session (over the simulator here, same with a physical device)
+with VirtualHid([VirtualDevice("Bravo")]):
+    dev_man = DevicesManager(log_to_console=True, log_level=logging.INFO)
+    device = dev_man.connect_with_name("Bravo")
+    device.start_capture(capture_path)
+    print(device.features.x0003.get_fw_info(0))
+    captured = device.features.x9402.read_measurements(100)
+    device.disconnect()  # stops the capture
+
+# replay it: same script, no device
+with ReplayHid(capture_path) as backend:
+    dev_man = DevicesManager(log_to_console=True, log_level=logging.INFO)
+    device = dev_man.connect_with_name("Bravo")
+    print(device.features.x0003.get_fw_info(0))
+    replayed = device.features.x9402.read_measurements(100)
+    device.disconnect()
+    print(
+        "{} reports replayed, {} divergences, same readings: {}".format(
+            backend.replayed_count, backend.divergences, replayed == captured
+        )
+    )
@@ -19,7 +19,7 @@ global_data = []
 
 def my_callback(req: HIDPPRequest, timestamp: int):
     global global_data
-    global_data.append(req.params[0:])
+    global_data.append(bytes(req.params))
     
 
 def start_monitoring(device: ConnectedDevice, num_measurements=0, sensor_index=0x00):
@@ -0,0 +1,47 @@
+import logging
+import time
+from pyhidpp import DevicesManager
+from pyhidpp.core.request import HIDPPRequest
+from pyhidpp.simulator import LinkModel, VirtualDevice, VirtualHid
+
+# no physical device needed: the discovery and ConnectedDevice run over a simulated
+# device, with 1ms + 0..0.5ms of latency (LinkModel.loss to simulate packet loss)
+bravo = VirtualDevice("Bravo")
+backend = VirtualHid([bravo], LinkModel(latency_s=0.001, jitter_s=0.0005))
+backend.install()
+
+dev_man = DevicesManager(log_to_console=True, log_level=logging.INFO)
+device = dev_man.connect_with_name("Bravo")
+device.enumerate_all()
+print(device.features.x0003.get_fw_info(0))
+
+# request throughput
+nb_requests = 1000
+start = time.perf_counter()
+readings = device.features.x9402.read_measurements(nb_requests)
+elapsed = time.perf_counter() - start
+print(
+    "{} readings in {:.3f}s ({:.0f} req/s), {} lost".format(
+        nb_requests, elapsed, nb_requests / elapsed, readings.count(None)
+    )
+)
+
+# round trip times per feature/function
+device.print_transport_stats()
+
+# notification burst
+notifs = []
+
+
+def my_callback(req: HIDPPRequest, timestamp):
+    notifs.append(req)
+
+
+device.register_notif(0x9402, 0, my_callback)
+bravo.notify_burst(0x9402, 0, 1000, interval_s=0.0005)
+time.sleep(1)
+print("{} notifications received out of 1000".format(len(notifs)))
+print(device.notifications.stats())
+
+device.disconnect()
+backend.uninstall()
@@ -1,9 +1,37 @@
-from .core.connected_device import ConnectedDevice
-from .core.devices_manager import DevicesManager
+"""
+pyhidpp
+
+the classes below are imported on first access (from pyhidpp import DevicesManager
+only loads what DevicesManager needs), import pyhidpp stays cheap
+"""
+
+import importlib
+
 from .core.utils import *
-from .features.features import Features
-from .features.feature import Feature
-from .core.request import HIDPPRequest
-from .core.device_info import DeviceInfo
-from .core.interface import HIDPPInterface
-from .core.discovery import list_devices, get_interfaces_list
+
+_LAZY_IMPORTS = {
+    "ConnectedDevice": ".core.connected_device",
+    "AsyncConnectedDevice": ".core.async_connected_device",
+    "DevicesManager": ".core.devices_manager",
+    "Features": ".features.features",
+    "Feature": ".features.feature",
+    "HIDPPRequest": ".core.request",
+    "Codec": ".core.codec",
+    "DeviceInfo": ".core.device_info",
+    "HIDPPInterface": ".core.interface",
+    "list_devices": ".core.discovery",
+    "get_interfaces_list": ".core.discovery",
+}
+
+
+def __getattr__(name):
+    module = _LAZY_IMPORTS.get(name)
+    if module is None:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_IMPORTS))
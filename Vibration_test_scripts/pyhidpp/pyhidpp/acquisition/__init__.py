@@ -0,0 +1,7 @@
+from .ring_buffer import SampleRing, SAMPLE_DTYPE
+from .sampler import X9402Sampler
+from .monitor_stream import X9402MonitorStream
+from .sample_store import SampleStore, STORE_DTYPE
+from .recorder import StoreRecorder
+from .decimation import MinMaxPyramid, lttb
+from .statistics import ChannelStats, SampleStatistics
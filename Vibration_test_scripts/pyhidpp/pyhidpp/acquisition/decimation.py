@@ -0,0 +1,275 @@
+"""
+plot decimation
+
+reduces any time window of a SampleStore to at most max_points points (about twice
+the plot width in pixels), whatever the window length, for interactive pan/zoom over
+hours of samples:
+    - minmax: min and max of each of max_points / 2 buckets, the envelope of the
+      signal (spikes are never lost). Read from a pyramid of per block min/max built
+      incrementally as the store grows: a window costs O(max_points), not O(rows)
+    - lttb: Largest-Triangle-Three-Buckets on the minmax envelope (4 x max_points
+      preselection, MinMaxLTTB): the shape of the signal, one point per bucket
+"""
+
+import numpy as np
+
+from .sample_store import SampleStore
+
+# rows per block of the first pyramid level, blocks per block of the next levels
+BLOCK_ROWS = 16
+FANOUT = 4
+# rows read from the store per batch while building the pyramid
+UPDATE_BATCH_ROWS = 1 << 16
+# minmax preselection of lttb: points per output point
+LTTB_PRESELECTION = 4
+
+
+def lttb(x, y, n_out) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets, return the indexes of the n_out selected points
+    (first and last points always selected)
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64) - x[0]
+    y = np.asarray(y, dtype=np.float64)
+    # n_out - 2 buckets over the points 1..n-2, plus the last point as last bucket
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    starts = np.append(edges[:-1], n - 1)
+    sizes = np.diff(np.append(starts, n))
+    mean_x = np.add.reduceat(x, starts) / sizes
+    mean_y = np.add.reduceat(y, starts) / sizes
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for bucket in range(n_out - 2):
+        lo, hi = starts[bucket], starts[bucket + 1]
+        next_x, next_y = mean_x[bucket + 1], mean_y[bucket + 1]
+        # twice the area of the triangles (a, candidate, next bucket mean)
+        area = np.abs(
+            (x[a] - next_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y - y[a])
+        )
+        a = lo + int(area.argmax())
+        selected[bucket + 1] = a
+    return selected
+
+
+class _Level:
+    """
+    per block first t_ns, min and max of each field, in growable arrays
+    """
+
+    def __init__(self, fields, dtype):
+        self.fields = fields
+        self.count = 0
+        self.t_ns = np.empty(1024, dtype=np.int64)
+        self.min = {name: np.empty(1024, dtype=dtype[name]) for name in fields}
+        self.max = {name: np.empty(1024, dtype=dtype[name]) for name in fields}
+
+    def append(self, t_ns, mins, maxs):
+        end = self.count + len(t_ns)
+        if end > len(self.t_ns):
+            capacity = max(end, 2 * len(self.t_ns))
+            self.t_ns = np.resize(self.t_ns, capacity)
+            for name in self.fields:
+                self.min[name] = np.resize(self.min[name], capacity)
+                self.max[name] = np.resize(self.max[name], capacity)
+        self.t_ns[self.count : end] = t_ns
+        for name in self.fields:
+            self.min[name][self.count : end] = mins[name]
+            self.max[name][self.count : end] = maxs[name]
+        self.count = end
+
+
+class MinMaxPyramid:
+    """
+    usage:
+        pyramid = MinMaxPyramid(store)
+        points = pyramid.decimate(t0_ns, t1_ns, max_points=2 * plot_width_px)
+        plot(points["t_ns"], points["adc"])
+
+    level k holds the min/max of blocks of BLOCK_ROWS * FANOUT**k rows (memory: under
+    a tenth of the store for the default fields). decimate() first takes the rows
+    written since the last call into account
+    """
+
+    def __init__(
+        self,
+        store: SampleStore,
+        fields=("adc", "baseline", "preload"),
+        block_rows=BLOCK_ROWS,
+        fanout=FANOUT,
+    ):
+        self.store = store
+        self.fields = fields
+        self.block_rows = block_rows
+        self.fanout = fanout
+        self.levels: list[_Level] = []
+        # store rows aggregated in the first level
+        self._rows = 0
+
+    def block_size(self, level):
+        return self.block_rows * self.fanout**level
+
+    def update(self):
+        """
+        aggregate the complete blocks written since the last update
+        """
+        complete = len(self.store) // self.block_rows * self.block_rows
+        if complete <= self._rows:
+            return
+        if not self.levels:
+            self.levels.append(_Level(self.fields, self.store.dtype))
+        while self._rows < complete:
+            stop = min(complete, self._rows + UPDATE_BATCH_ROWS)
+            rows = self.store.rows(self._rows, stop)
+            self.levels[0].append(
+                rows["t_ns"][:: self.block_rows],
+                {n: rows[n].reshape(-1, self.block_rows).min(axis=1) for n in self.fields},
+                {n: rows[n].reshape(-1, self.block_rows).max(axis=1) for n in self.fields},
+            )
+            self._rows = stop
+
+        level = 0
+        while self.levels[level].count >= self.fanout:
+            if level + 1 == len(self.levels):
+                self.levels.append(_Level(self.fields, self.store.dtype))
+            child, parent = self.levels[level], self.levels[level + 1]
+            first = parent.count * self.fanout
+            end = child.count // self.fanout * self.fanout
+            if end > first:
+                parent.append(
+                    child.t_ns[first : end : self.fanout],
+                    {
+                        n: child.min[n][first:end].reshape(-1, self.fanout).min(axis=1)
+                        for n in self.fields
+                    },
+                    {
+                        n: child.max[n][first:end].reshape(-1, self.fanout).max(axis=1)
+                        for n in self.fields
+                    },
+                )
+            level += 1
+
+    def decimate(self, t0_ns, t1_ns, max_points, method="minmax") -> np.ndarray:
+        """
+        points of the window t0_ns <= t_ns < t1_ns, at most max_points
+        method: "minmax" (envelope, 2 points per bucket) or "lttb"
+        return a structured array of t_ns and the fields, the raw rows when the
+        window holds no more than max_points rows
+        """
+        self.update()
+        store = self.store
+        start, stop = store.index(t0_ns), store.index(t1_ns)
+        if stop - start <= max_points:
+            rows = store.rows(start, stop)
+            points = np.empty(len(rows), dtype=self.__dtype())
+            for name in points.dtype.names:
+                points[name] = rows[name]
+            return points
+
+        if method == "minmax":
+            return self.__minmax(start, stop, max_points // 2)
+        if method == "lttb":
+            envelope = self.__minmax(start, stop, max_points * LTTB_PRESELECTION // 2)
+            return envelope[lttb(envelope["t_ns"], envelope[self.fields[0]], max_points)]
+        raise ValueError("unknown decimation method {!r}".format(method))
+
+    def __dtype(self):
+        return np.dtype(
+            [("t_ns", "<i8")] + [(name, self.store.dtype[name]) for name in self.fields]
+        )
+
+    def __spanned(self, start, stop, level):
+        """
+        blocks of level covering start..stop, plus one for the rows not aggregated
+        """
+        size = self.block_size(level)
+        return -(-stop // size) - start // size + 1
+
+    def __minmax(self, start, stop, buckets):
+        """
+        min/max of the blocks of the first level with at most buckets blocks in
+        start..stop, 2 points (min, max) per block at the time of its first row.
+        The partial blocks at both ends of the window are aggregated from the
+        rows inside the window only
+        """
+        level = 0
+        while level + 1 < len(self.levels) and self.__spanned(start, stop, level) > buckets:
+            level += 1
+        size = self.block_size(level)
+        count = self.levels[level].count if self.levels else 0
+        first = -(-start // size)  # first block starting in the window
+        end = max(first, min(stop // size, count))  # complete blocks first..end
+        head_stop = min(first * size, stop)
+        tail_start = max(end * size, head_stop)
+
+        t_ns, mins, maxs = [], {n: [] for n in self.fields}, {n: [] for n in self.fields}
+        if start < head_stop:
+            self.__append(t_ns, mins, maxs, *self.__aggregate(start, head_stop))
+        if end > first:
+            blocks = self.levels[level]
+            self.__append(
+                t_ns,
+                mins,
+                maxs,
+                blocks.t_ns[first:end],
+                {n: blocks.min[n][first:end] for n in self.fields},
+                {n: blocks.max[n][first:end] for n in self.fields},
+            )
+        if tail_start < stop:
+            self.__append(t_ns, mins, maxs, *self.__aggregate(tail_start, stop))
+
+        points = np.empty(2 * sum(len(t) for t in t_ns), dtype=self.__dtype())
+        points["t_ns"] = np.repeat(np.concatenate(t_ns), 2)
+        for name in self.fields:
+            points[name][0::2] = np.concatenate(mins[name])
+            points[name][1::2] = np.concatenate(maxs[name])
+        return points
+
+    def __append(self, t_ns, mins, maxs, block_t_ns, block_mins, block_maxs):
+        t_ns.append(block_t_ns)
+        for name in self.fields:
+            mins[name].append(block_mins[name])
+            maxs[name].append(block_maxs[name])
+
+    def __aggregate(self, start, stop):
+        """
+        one block of the rows start..stop: t_ns of its first row, min and max,
+        from the largest aggregated blocks it holds and the raw rows around them
+        """
+        t0_ns = None
+        mins, maxs = [], []
+        position = start
+        while position < stop:
+            for level in range(len(self.levels) - 1, -1, -1):
+                size = self.block_size(level)
+                index = position // size
+                if (
+                    position % size == 0
+                    and position + size <= stop
+                    and index < self.levels[level].count
+                ):
+                    blocks = self.levels[level]
+                    block_t_ns = blocks.t_ns[index]
+                    mins.append({n: blocks.min[n][index] for n in self.fields})
+                    maxs.append({n: blocks.max[n][index] for n in self.fields})
+                    position += size
+                    break
+            else:
+                # raw rows up to the next block of the first level
+                end = min(stop, (position // self.block_rows + 1) * self.block_rows)
+                rows = self.store.rows(position, end)
+                block_t_ns = rows["t_ns"][0]
+                mins.append({n: rows[n].min() for n in self.fields})
+                maxs.append({n: rows[n].max() for n in self.fields})
+                position = end
+            if t0_ns is None:
+                t0_ns = block_t_ns
+        return (
+            np.array([t0_ns]),
+            {n: np.array([min(m[n] for m in mins)]) for n in self.fields},
+            {n: np.array([max(m[n] for m in maxs)]) for n in self.fields},
+        )
@@ -0,0 +1,209 @@
+"""
+x9402 monitor stream
+
+notification driven acquisition: x9402 monitorTest makes the device push
+monitorReport events (MONITOR_SAMPLES measurements each), no request per sample.
+The reports are decoded in the notification worker straight into a SampleRing,
+packetIdx is tracked to count the lost reports, and the test is re-armed before
+its count runs out (a finite count stops the device by itself if the host goes
+away).
+"""
+
+import logging
+import time
+from threading import Event, Thread
+from typing import TYPE_CHECKING
+
+from ..features.x9402 import X9402, signed_count
+from .ring_buffer import SampleRing
+
+if TYPE_CHECKING:
+    from ..core.connected_device import ConnectedDevice
+
+# monitorReport count of each monitorTest, re-armed when REARM_MARGIN are left
+ARM_COUNT = 4096
+REARM_MARGIN = 1024
+# re-arm when no report came for that long (device reconnected, test aborted)
+STALL_TIMEOUT_S = 1.0
+
+
+class X9402MonitorStream:
+    """
+    usage:
+        stream = X9402MonitorStream(device)
+        if stream.start():  # False when monitorTest is not supported
+            ...
+            start, rows = stream.ring.snapshot(200)  # rows["adc"], rows["t_ns"]...
+            stream.stop()
+
+    samples are timestamped from the reception time of their report, spread over
+    the interval since the previous report. preload is not part of monitorReport:
+    the value read by start() (readMeasurement) is used.
+
+    counters: packets, samples, gaps (discontinuities of packetIdx), lost_packets,
+    rearms. running/failed/lost_samples/rate() as X9402Sampler
+    """
+
+    def __init__(
+        self,
+        device: "ConnectedDevice",
+        ring: SampleRing = None,
+        sensor_idx=0,
+        arm_count=ARM_COUNT,
+        rearm_margin=REARM_MARGIN,
+        stall_timeout_s=STALL_TIMEOUT_S,
+    ):
+        self.device = device
+        self.ring = ring if ring is not None else SampleRing()
+        self.sensor_idx = sensor_idx
+        self.arm_count = arm_count
+        self.rearm_margin = min(rearm_margin, arm_count - 1)
+        self.stall_timeout_s = stall_timeout_s
+        self.logger = logging.getLogger("hidpp")
+
+        self.packets = 0
+        self.samples = 0
+        self.gaps = 0
+        self.lost_packets = 0
+        self.rearms = 0
+        self.failed = False
+        self.preload = 0
+
+        self._x9402: X9402 | None = None
+        self._last_packet_idx = None
+        self._last_t_ns = None
+        self._sample_period_ns = 0
+        self._armed_remaining = 0
+        self._last_report_s = 0.0
+        self._stop = Event()
+        self._rearm = Event()
+        self._thread: Thread | None = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def lost_samples(self):
+        return self.lost_packets * X9402.MONITOR_SAMPLES
+
+    def start(self) -> bool:
+        """
+        enable the monitor test, return False if the device refused it
+        """
+        if self.running:
+            return True
+        x9402 = self._x9402 = self.device.features.x9402
+        measurement = x9402.read_measurement(self.sensor_idx)
+        if measurement is None:
+            return False
+        self.preload = measurement[2]
+
+        self.device.register_notif(
+            X9402.feature_id, X9402.monitor_report_event, self.__on_report
+        )
+        self.failed = False
+        self._last_packet_idx = None
+        self._last_t_ns = None
+        self._last_report_s = time.monotonic()
+        if not self.__arm():
+            self.device.unregister_notif(X9402.feature_id, X9402.monitor_report_event)
+            return False
+
+        self._stop.clear()
+        self._thread = Thread(target=self.__control, name="x9402-monitor", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+        self._rearm.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._x9402 is not None and self.device.connected:
+            self._x9402.monitor_mode(0, self.sensor_idx)
+        self.device.unregister_notif(X9402.feature_id, X9402.monitor_report_event)
+
+    def rate(self, window=256):
+        """
+        sample rate (Hz) over the last window samples
+        """
+        _, rows = self.ring.snapshot(window)
+        if len(rows) < 2:
+            return 0.0
+        duration_ns = int(rows["t_ns"][-1]) - int(rows["t_ns"][0])
+        return (len(rows) - 1) * 1e9 / duration_ns if duration_ns > 0 else 0.0
+
+    def __arm(self):
+        if self._x9402.monitor_mode(self.arm_count, self.sensor_idx) is None:
+            return False
+        self._armed_remaining = self.arm_count
+        self._last_report_s = time.monotonic()
+        return True
+
+    def __control(self):
+        """
+        re-arm the test before it ends, or when the reports stopped coming
+        """
+        while not self._stop.is_set():
+            self._rearm.wait(self.stall_timeout_s / 2)
+            self._rearm.clear()
+            if self._stop.is_set():
+                return
+            stalled = time.monotonic() - self._last_report_s > self.stall_timeout_s
+            if self._armed_remaining > self.rearm_margin and not stalled:
+                continue
+            if not self.device.connected:
+                continue
+            if stalled:
+                self.logger.info("x9402 monitor stream stalled, re-arming")
+            if self.__arm():
+                self.rearms += 1
+            elif stalled:
+                self.logger.warning("x9402 monitor stream could not be re-armed")
+                self.failed = True
+                return
+
+    def __on_report(self, req, timestamp):
+        """
+        notification worker: decode one monitorReport into the ring, timestamped
+        from req.received_s (monotonic, as the sampler)
+        """
+        values = X9402.MONITOR_REPORT.decode(req.params)
+        if values[0] != self.sensor_idx:
+            return
+        packet_idx = values[1]
+        t_ns = int(req.received_s * 1e9)
+        self._last_report_s = req.received_s
+
+        last_idx = self._last_packet_idx
+        last_t_ns = self._last_t_ns
+        if last_idx is not None:
+            skipped = (packet_idx - last_idx - 1) & 0xFFFF
+            interval_ns = (t_ns - last_t_ns) // X9402.MONITOR_SAMPLES
+            if skipped == 0:
+                self._sample_period_ns = interval_ns
+            else:
+                # keep the samples after the ones of the previous report
+                self._sample_period_ns = min(self._sample_period_ns, interval_ns)
+            if skipped and packet_idx != 0:
+                # packetIdx restarts from 0 when the test is re-armed
+                self.gaps += 1
+                self.lost_packets += skipped
+        self._last_packet_idx = packet_idx
+        self._last_t_ns = t_ns
+
+        baseline = signed_count(values[-1])
+        preload = self.preload
+        period_ns = self._sample_period_ns
+        append = self.ring.append
+        last = X9402.MONITOR_SAMPLES - 1
+        for i, measurement in enumerate(values[2:-1]):
+            append(t_ns - (last - i) * period_ns, signed_count(measurement), baseline, preload)
+
+        self.packets += 1
+        self.samples += X9402.MONITOR_SAMPLES
+        self._armed_remaining -= 1
+        if self._armed_remaining == self.rearm_margin:
+            self._rearm.set()
@@ -0,0 +1,110 @@
+"""
+store recorder
+
+writes the samples of a SampleRing to a SampleStore from its own thread, in
+batches every period_s: the acquisition thread never waits for the disk. The ring
+must hold more than period_s of samples, the ones overwritten before being
+recorded are counted as dropped. The recorder stops on a write error (ie disk
+full), see failed.
+"""
+
+import logging
+import time
+from threading import Event, Thread
+
+from .ring_buffer import SampleRing
+from .sample_store import SampleStore
+
+# ring drain period
+RECORD_PERIOD_S = 0.2
+
+
+class StoreRecorder:
+    """
+    usage:
+        recorder = StoreRecorder(sampler.ring, SampleStore("soak_0417"), segment_s=600)
+        recorder.start()  # records the samples acquired from now on
+        ...
+        recorder.stop()  # records the last samples, flushes the store
+
+    segment_s: rotate the store (new chunk file) every segment_s
+    counters: recorded, dropped (overwritten in the ring before being recorded),
+    segments (chunks started by rotation)
+    failed: recording stopped by a store write error
+    """
+
+    def __init__(
+        self,
+        ring: SampleRing,
+        store: SampleStore,
+        device_id=0,
+        period_s=RECORD_PERIOD_S,
+        segment_s=None,
+    ):
+        self.ring = ring
+        self.store = store
+        self.device_id = device_id
+        self.period_s = period_s
+        self.segment_s = segment_s
+        self.logger = logging.getLogger("hidpp")
+
+        self.recorded = 0
+        self.dropped = 0
+        self.segments = 0
+        self.failed = False
+        self._next = 0
+        self._stop = Event()
+        self._thread: Thread | None = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._next = self.ring.count
+        self.failed = False
+        self._stop.clear()
+        self._thread = Thread(target=self.__run, name="store-recorder", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __run(self):
+        segment_start = time.monotonic()
+        while not self._stop.wait(self.period_s):
+            if not self.__record():
+                return
+            if self.segment_s and time.monotonic() - segment_start >= self.segment_s:
+                self.store.rotate()
+                self.segments += 1
+                segment_start = time.monotonic()
+        self.__record()
+
+    def __record(self):
+        """
+        return False when recording failed
+        """
+        start, rows = self.ring.snapshot(since=self._next)
+        if start > self._next:
+            self.dropped += start - self._next
+        self._next = start + len(rows)
+        try:
+            self.store.write(rows, self.device_id)
+            self.store.flush()
+        except ValueError as e:
+            self.logger.warning("{} samples not recorded: {}".format(len(rows), e))
+            self.dropped += len(rows)
+            return True
+        except OSError as e:
+            self.logger.error("Recording to {} failed: {}".format(self.store.path, e))
+            self.dropped += len(rows)
+            self.failed = True
+            return False
+        self.recorded += len(rows)
+        return True
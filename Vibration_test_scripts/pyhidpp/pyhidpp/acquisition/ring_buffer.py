@@ -0,0 +1,98 @@
+"""
+sample ring buffer
+
+fixed size numpy buffer of timestamped samples, written by one acquisition thread
+and read by any number of consumers (GUI, statistics) without lock: the writer
+announces the rows it is about to fill (writing), fills them, then publishes them
+by increasing count. Readers copy the rows they want and drop the ones the writer
+may have overwritten during the copy.
+"""
+
+import numpy as np
+
+# x9402 measurement, t_ns from time.monotonic_ns()
+SAMPLE_DTYPE = np.dtype(
+    [("t_ns", "<i8"), ("adc", "<i4"), ("baseline", "<i4"), ("preload", "<i2")]
+)
+
+
+class SampleRing:
+    """
+    ring of the last capacity samples. count is the number of samples ever
+    written: sample i (absolute index) is in slot i % capacity while
+    i >= count - capacity. writing: count once the rows being written are
+    published, the slots of samples before writing - capacity may be overwritten
+    """
+
+    def __init__(self, capacity=1 << 16, dtype=SAMPLE_DTYPE):
+        self.capacity = capacity
+        self.dtype = dtype
+        self._data = np.zeros(capacity, dtype=dtype)
+        self.count = 0
+        self.writing = 0
+        # absolute index of the first sample after clear()
+        self.first = 0
+
+    """ WRITER (single thread)
+    """
+
+    def append(self, *row):
+        count = self.count
+        self.writing = count + 1
+        self._data[count % self.capacity] = row
+        self.count = count + 1
+
+    def extend(self, rows: np.ndarray):
+        """
+        append a structured array of rows (same fields as dtype), only the last
+        capacity ones are kept when there are more
+        """
+        end = self.count + len(rows)
+        rows = rows[-self.capacity :]
+        self.writing = end
+        start = (end - len(rows)) % self.capacity
+        head = min(len(rows), self.capacity - start)
+        self._data[start : start + head] = rows[:head]
+        self._data[: len(rows) - head] = rows[head:]
+        self.count = end
+
+    """ READERS
+    """
+
+    def clear(self):
+        """
+        forget the samples written so far (the writer keeps going)
+        """
+        self.first = self.count
+
+    def snapshot(self, n=None, since=None) -> tuple[int, np.ndarray]:
+        """
+        copy of the last n samples (all the buffered ones by default), or of the
+        samples from absolute index since on
+        return (absolute index of the first returned sample, rows)
+        """
+        end = self.count
+        start = max(end - self.capacity, self.first)
+        if since is not None:
+            start = max(start, since)
+        if n is not None:
+            start = max(start, end - n)
+        if start >= end:
+            return end, self._data[:0].copy()
+
+        capacity = self.capacity
+        first_slot, end_slot = start % capacity, end % capacity
+        if first_slot < end_slot:
+            rows = self._data[first_slot:end_slot].copy()
+        else:
+            rows = np.concatenate((self._data[first_slot:], self._data[:end_slot]))
+
+        # rows the writer went over while copying, or is writing
+        overwritten = self.writing - capacity - start
+        if overwritten > 0:
+            rows = rows[overwritten:]
+            start += overwritten
+        return start, rows
+
+    def __len__(self):
+        return min(self.count - self.first, self.capacity)
@@ -0,0 +1,274 @@
+"""
+chunked sample store
+
+append-only on disk store of timestamped samples for long captures: a directory of
+chunk files of at most chunk_rows raw STORE_DTYPE rows, plus store.json describing
+the layout (and the attributes of the capture). rotate() starts a new chunk early:
+chunks are the segments of a capture (eg one per 10 minutes). The writer appends
+through a buffered file (constant memory whatever the capture length), the readers
+memory-map the chunks: a time window is found by bisecting the first timestamp of
+the chunks then the t_ns column of the chunks it spans (t_ns is non-decreasing),
+nothing else is read from the disk.
+
+a capture interrupted by a crash stays readable: the rows are fixed size, a
+partial last row is ignored.
+"""
+
+import bisect
+import json
+import os
+
+import numpy as np
+
+from .ring_buffer import SAMPLE_DTYPE
+
+STORE_DTYPE = np.dtype(SAMPLE_DTYPE.descr + [("device_id", "<u2")])
+# 1M rows of 26 bytes per chunk: a 1 kHz capture makes a chunk every 17 minutes
+CHUNK_ROWS = 1 << 20
+METADATA_FILE = "store.json"
+CHUNK_FILE = "chunk_{:06d}.bin"
+STORE_VERSION = 1
+
+
+class SampleStore:
+    """
+    usage:
+        with SampleStore("soak_0417") as store:  # created, or reopened to append
+            store.set_attributes(device="Bravo")  # saved in store.json
+            store.write(rows, device_id=1)  # rows: SAMPLE_DTYPE or STORE_DTYPE array
+        ...
+        store = SampleStore("soak_0417")
+        rows = store.window(t0_ns, t1_ns)  # rows with t0_ns <= t_ns < t1_ns
+
+    one writer (a single process / thread), readers see the rows once flushed
+    """
+
+    def __init__(self, path, chunk_rows=CHUNK_ROWS, dtype=STORE_DTYPE):
+        self.path = path
+        metadata_path = os.path.join(path, METADATA_FILE)
+        if os.path.exists(metadata_path):
+            with open(metadata_path) as f:
+                metadata = json.load(f)
+            if metadata.get("version") != STORE_VERSION:
+                raise ValueError(
+                    "{}: unsupported store version {}".format(path, metadata.get("version"))
+                )
+            self.dtype = np.dtype([tuple(field) for field in metadata["dtype"]])
+            self.chunk_rows = metadata["chunk_rows"]
+            self.attributes = metadata.get("attributes", {})
+        else:
+            os.makedirs(path, exist_ok=True)
+            self.dtype = np.dtype(dtype)
+            self.chunk_rows = chunk_rows
+            self.attributes = {}
+            self.__save_metadata()
+
+        # per chunk: first t_ns, first absolute row (time / row index)
+        self._chunk_t0: list[int] = []
+        self._chunk_start: list[int] = []
+        # memory maps of the complete chunks, the last one is mapped again as it grows
+        self._maps: dict[int, np.memmap] = {}
+        self._file = None
+        self._rows = 0
+        # rows the last chunk can still take, 0: next write starts a new chunk
+        self._chunk_free = 0
+        self._last_t_ns = None
+        self.__scan()
+
+    def __save_metadata(self):
+        with open(os.path.join(self.path, METADATA_FILE), "w") as f:
+            json.dump(
+                {
+                    "version": STORE_VERSION,
+                    "dtype": self.dtype.descr,
+                    "chunk_rows": self.chunk_rows,
+                    "attributes": self.attributes,
+                },
+                f,
+            )
+
+    def __scan(self):
+        chunk = 0
+        while os.path.exists(self.__chunk_path(chunk)):
+            rows = self.__map(chunk)
+            if len(rows) == 0:
+                break
+            self._chunk_t0.append(int(rows["t_ns"][0]))
+            self._chunk_start.append(self._rows)
+            self._rows += len(rows)
+            self._chunk_free = self.chunk_rows - len(rows)
+            self._last_t_ns = int(rows["t_ns"][-1])
+            chunk += 1
+
+    def __chunk_path(self, chunk):
+        return os.path.join(self.path, CHUNK_FILE.format(chunk))
+
+    def __map(self, chunk) -> np.ndarray:
+        """
+        rows of chunk, mapped once complete (full, or followed by another chunk)
+        """
+        rows = self._maps.get(chunk)
+        if rows is not None:
+            return rows
+        count = os.path.getsize(self.__chunk_path(chunk)) // self.dtype.itemsize
+        if count == 0:
+            return np.empty(0, dtype=self.dtype)
+        rows = np.memmap(self.__chunk_path(chunk), dtype=self.dtype, mode="r", shape=(count,))
+        if count >= self.chunk_rows or chunk < len(self._chunk_t0) - 1:
+            self._maps[chunk] = rows
+        return rows
+
+    """ WRITER
+    """
+
+    def set_attributes(self, **attributes):
+        """
+        describe the capture (device, settings...), json serializable values
+        """
+        self.attributes.update(attributes)
+        self.__save_metadata()
+
+    def write(self, rows: np.ndarray, device_id=0):
+        """
+        append rows, in time order: t_ns must not go back from the last stored row
+        rows: STORE_DTYPE array, or without device_id (SAMPLE_DTYPE: ring snapshot)
+        """
+        if len(rows) == 0:
+            return
+        t_ns = rows["t_ns"]
+        if (self._last_t_ns is not None and t_ns[0] < self._last_t_ns) or np.any(
+            t_ns[1:] < t_ns[:-1]
+        ):
+            raise ValueError("samples are not in time order")
+        if rows.dtype != self.dtype:
+            converted = np.empty(len(rows), dtype=self.dtype)
+            for name in self.dtype.names:
+                converted[name] = rows[name] if name in rows.dtype.names else 0
+            if "device_id" not in rows.dtype.names:
+                converted["device_id"] = device_id
+            rows = converted
+
+        written = 0
+        while written < len(rows):
+            if self._chunk_free == 0:
+                self.__new_chunk(int(rows["t_ns"][written]))
+            elif self._file is None:
+                self.__reopen_chunk()
+            count = min(len(rows) - written, self._chunk_free)
+            self._file.write(rows[written : written + count].tobytes())
+            written += count
+            self._rows += count
+            self._chunk_free -= count
+        self._last_t_ns = int(rows["t_ns"][-1])
+
+    def rotate(self):
+        """
+        close the current chunk, the next rows go to a new one
+        """
+        self.close()
+        self._chunk_free = 0
+
+    def __new_chunk(self, t0_ns):
+        self.close()
+        self._chunk_t0.append(t0_ns)
+        self._chunk_start.append(self._rows)
+        self._file = open(self.__chunk_path(len(self._chunk_t0) - 1), "wb")
+        self._chunk_free = self.chunk_rows
+
+    def __reopen_chunk(self):
+        self._file = open(self.__chunk_path(len(self._chunk_t0) - 1), "ab")
+        # drop a partial row left by an interrupted capture
+        self._file.truncate((self._rows - self._chunk_start[-1]) * self.dtype.itemsize)
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    """ READERS
+    """
+
+    def __len__(self):
+        return self._rows
+
+    def refresh(self):
+        """
+        reader of a store written by another process: take the new rows into account
+        """
+        self._chunk_t0.clear()
+        self._chunk_start.clear()
+        self._rows = 0
+        self._chunk_free = 0
+        self._last_t_ns = None
+        self.__scan()
+
+    @property
+    def time_range(self) -> tuple[int, int] | None:
+        """
+        (first, last) t_ns, None when empty
+        """
+        if not self._chunk_t0:
+            return None
+        return self._chunk_t0[0], self._last_t_ns
+
+    def chunks(self):
+        """
+        memory maps of the chunks, in order
+        """
+        self.flush()
+        for chunk in range(len(self._chunk_t0)):
+            yield self.__map(chunk)
+
+    def rows(self, start=0, stop=None) -> np.ndarray:
+        """
+        rows start..stop (absolute row indexes), a view of the chunk when the range
+        does not cross a chunk boundary, else a copy
+        """
+        stop = self._rows if stop is None else min(stop, self._rows)
+        if start >= stop:
+            return np.empty(0, dtype=self.dtype)
+        self.flush()
+        first = bisect.bisect_right(self._chunk_start, start) - 1
+        last = bisect.bisect_right(self._chunk_start, stop - 1) - 1
+        parts = [
+            self.__map(chunk)[
+                max(start - self._chunk_start[chunk], 0) : stop - self._chunk_start[chunk]
+            ]
+            for chunk in range(first, last + 1)
+        ]
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def index(self, t_ns) -> int:
+        """
+        absolute index of the first row with t_ns >= t_ns
+        """
+        if not self._chunk_t0:
+            return 0
+        self.flush()
+        # last chunk starting at or before t_ns: the row is in it, or starts the next
+        chunk = max(bisect.bisect_left(self._chunk_t0, t_ns) - 1, 0)
+        while chunk < len(self._chunk_t0):
+            times = self.__map(chunk)["t_ns"].view(np.ndarray)
+            # bisect reads log2(n) rows, np.searchsorted would first copy the
+            # (strided) column out of the file
+            position = bisect.bisect_left(times, t_ns)
+            if position < len(times):
+                return self._chunk_start[chunk] + position
+            chunk += 1
+        return self._rows
+
+    def window(self, t0_ns, t1_ns) -> np.ndarray:
+        """
+        rows with t0_ns <= t_ns < t1_ns
+        """
+        return self.rows(self.index(t0_ns), self.index(t1_ns))
@@ -0,0 +1,139 @@
+"""
+x9402 background sampler
+
+polls x9402 readMeasurement from its own thread, as fast as the link answers (or
+every period_s), and writes the timestamped (adc, baseline, preload) samples into a
+SampleRing. Consumers only read snapshots of the ring: a device stall delays the
+samples, never the consumer.
+"""
+
+import logging
+import time
+from threading import Event, Thread
+from typing import TYPE_CHECKING, Callable
+
+from .ring_buffer import SampleRing
+
+if TYPE_CHECKING:
+    from ..core.connected_device import ConnectedDevice
+
+# consecutive failed readings after which the sampler gives up
+MAX_CONSECUTIVE_ERRORS = 50
+# wait between two readings attempts while the device is not connected
+DISCONNECTED_POLL_S = 0.1
+
+
+class X9402Sampler:
+    """
+    usage:
+        sampler = X9402Sampler(device)
+        sampler.start()
+        ...
+        start, rows = sampler.ring.snapshot(200)  # rows["adc"], rows["t_ns"]...
+        sampler.stop()
+
+    counters: samples, errors (failed readings). running turns False once stopped,
+    or after MAX_CONSECUTIVE_ERRORS failed readings (on_failure(sampler) called
+    from the sampler thread)
+    """
+
+    def __init__(
+        self,
+        device: "ConnectedDevice",
+        ring: SampleRing = None,
+        period_s=0.0,
+        custom_param=0,
+        on_failure: Callable | None = None,
+    ):
+        self.device = device
+        self.ring = ring if ring is not None else SampleRing()
+        self.period_s = period_s
+        self.custom_param = custom_param
+        self.on_failure = on_failure
+        self.logger = logging.getLogger("hidpp")
+
+        self.samples = 0
+        self.errors = 0
+        self.failed = False
+        self._stop = Event()
+        self._thread: Thread | None = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def lost_samples(self):
+        """
+        failed readings: samples missing from the ring
+        """
+        return self.errors
+
+    def start(self):
+        if self.running:
+            return
+        self.failed = False
+        self._stop.clear()
+        self._thread = Thread(target=self.__run, name="x9402-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def rate(self, window=256):
+        """
+        sample rate (Hz) over the last window samples
+        """
+        _, rows = self.ring.snapshot(window)
+        if len(rows) < 2:
+            return 0.0
+        duration_ns = int(rows["t_ns"][-1]) - int(rows["t_ns"][0])
+        return (len(rows) - 1) * 1e9 / duration_ns if duration_ns > 0 else 0.0
+
+    def __run(self):
+        x9402 = self.device.features.x9402
+        read = x9402.call_stub(2)
+        decode = x9402._decode_measurement
+        params = [self.custom_param]
+        append = self.ring.append
+        period_ns = int(self.period_s * 1e9)
+        next_ns = time.monotonic_ns()
+        consecutive_errors = 0
+
+        while not self._stop.is_set():
+            if not self.device.connected:
+                self._stop.wait(DISCONNECTED_POLL_S)
+                continue
+
+            res = read(params)
+            t_ns = time.monotonic_ns()
+            sample = decode(res) if res is not None else None
+            if sample is None:
+                self.errors += 1
+                consecutive_errors += 1
+                if consecutive_errors >= MAX_CONSECUTIVE_ERRORS:
+                    self.logger.warning(
+                        "x9402 sampler stopped after {} failed readings".format(
+                            consecutive_errors
+                        )
+                    )
+                    self.failed = True
+                    if self.on_failure is not None:
+                        self.on_failure(self)
+                    return
+                continue
+
+            consecutive_errors = 0
+            append(t_ns, *sample)
+            self.samples += 1
+
+            if period_ns:
+                next_ns += period_ns
+                delay_ns = next_ns - time.monotonic_ns()
+                if delay_ns > 0:
+                    self._stop.wait(delay_ns / 1e9)
+                else:
+                    next_ns = time.monotonic_ns()  # late: do not burst to catch up
@@ -0,0 +1,281 @@
+"""
+streaming statistics
+
+incremental statistics of the sample channels (adc, baseline, preload), updated
+in O(1) per sample (samples fed one by one or in batches, a ring snapshot per GUI
+tick), never by re-scanning a buffer:
+    - whole run: count, mean / variance (Welford, batches merged with Chan's
+      formula), min, max
+    - EWMA (exponentially weighted moving average)
+    - sliding window of the last window samples: mean, std, percentiles. The
+      percentiles come from a two-level counting histogram of the integer values
+      of the window: O(1) update, O(sqrt(range)) query
+    - drift: EWMA minus the mean of the first window samples
+"""
+
+import math
+
+import numpy as np
+
+from .ring_buffer import SampleRing
+
+WINDOW = 1024
+EWMA_ALPHA = 0.01
+# integer values range of the sliding percentiles, values outside are clamped
+VALUE_RANGE = (-(1 << 16), 1 << 16)
+# fine bins per coarse bin of the window histogram
+COARSE_BITS = 8
+
+
+class ChannelStats:
+    """
+    statistics of one channel of integer samples
+
+    usage:
+        stats = ChannelStats(window=1000)
+        stats.update(value)  # or update_batch(values)
+        stats.std, stats.window_std, stats.percentile(99), stats.drift
+    """
+
+    def __init__(self, window=WINDOW, ewma_alpha=EWMA_ALPHA, value_range=VALUE_RANGE):
+        self.window = window
+        self.ewma_alpha = ewma_alpha
+        self.value_range = value_range
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = None
+        self.max = None
+        self.ewma = None
+        # mean of the first window samples of the run, reference of drift
+        self.reference = None
+        self._reference_sum = 0
+
+        lo, hi = self.value_range
+        self._fine = np.zeros(hi - lo, dtype=np.int64)
+        self._coarse = np.zeros(((hi - lo - 1) >> COARSE_BITS) + 1, dtype=np.int64)
+        self._ring = np.zeros(self.window, dtype=np.int64)
+        self._position = 0
+        self._filled = 0
+        self._sum = 0
+        self._sum_squares = 0
+
+    """ UPDATE
+    """
+
+    def update(self, value):
+        value = int(value)
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        if self.ewma is None:
+            self.ewma = float(value)
+        else:
+            self.ewma += self.ewma_alpha * (value - self.ewma)
+
+        lo, hi = self.value_range
+        value = min(max(value, lo), hi - 1)
+        if self._filled == self.window:
+            self.__remove(int(self._ring[self._position]))
+        else:
+            self._filled += 1
+        self._ring[self._position] = value
+        self._position = (self._position + 1) % self.window
+        self.__add(value)
+        if self.reference is None:
+            self._reference_sum += value
+            if self.count == self.window:
+                self.reference = self._reference_sum / self.window
+
+    def update_batch(self, values):
+        """
+        update with an array of values, same result as update() on each value
+        """
+        values = np.asarray(values)
+        k = len(values)
+        if k == 0:
+            return
+        batch = values.astype(np.float64)
+        if self.reference is None:
+            lo, hi = self.value_range
+            head = values[: self.window - self.count]
+            self._reference_sum += int(np.clip(head, lo, hi - 1).astype(np.int64).sum())
+            if self.count + k >= self.window:
+                self.reference = self._reference_sum / self.window
+
+        # Welford / Chan merge
+        batch_mean = batch.mean()
+        batch_m2 = float(((batch - batch_mean) ** 2).sum())
+        total = self.count + k
+        delta = batch_mean - self.mean
+        self.mean += delta * k / total
+        self._m2 += batch_m2 + delta * delta * self.count * k / total
+        self.count = total
+        batch_min, batch_max = values.min().item(), values.max().item()
+        self.min = batch_min if self.min is None else min(self.min, batch_min)
+        self.max = batch_max if self.max is None else max(self.max, batch_max)
+
+        # EWMA: e_k = (1 - a)^k e_0 + sum(a (1 - a)^(k - i) x_i)
+        if self.ewma is None:
+            self.ewma, batch = float(batch[0]), batch[1:]
+        if len(batch):
+            decay = 1.0 - self.ewma_alpha
+            weights = self.ewma_alpha * decay ** np.arange(len(batch) - 1, -1, -1)
+            self.ewma = decay ** len(batch) * self.ewma + float(weights @ batch)
+
+        # sliding window: values that stay in the window only
+        lo, hi = self.value_range
+        window_values = np.clip(values[-self.window :], lo, hi - 1).astype(np.int64)
+        k = len(window_values)
+        evicted = max(self._filled + k - self.window, 0)
+        if evicted:
+            oldest = (self._position - self._filled) % self.window
+            old = self._ring[(oldest + np.arange(evicted)) % self.window]
+            np.subtract.at(self._fine, old - lo, 1)
+            np.subtract.at(self._coarse, (old - lo) >> COARSE_BITS, 1)
+            self._sum -= int(old.sum())
+            self._sum_squares -= int((old * old).sum())
+        self._ring[(self._position + np.arange(k)) % self.window] = window_values
+        self._position = (self._position + k) % self.window
+        self._filled = min(self._filled + k, self.window)
+        np.add.at(self._fine, window_values - lo, 1)
+        np.add.at(self._coarse, (window_values - lo) >> COARSE_BITS, 1)
+        self._sum += int(window_values.sum())
+        self._sum_squares += int((window_values * window_values).sum())
+
+    def __add(self, value):
+        index = value - self.value_range[0]
+        self._fine[index] += 1
+        self._coarse[index >> COARSE_BITS] += 1
+        self._sum += value
+        self._sum_squares += value * value
+
+    def __remove(self, value):
+        index = value - self.value_range[0]
+        self._fine[index] -= 1
+        self._coarse[index >> COARSE_BITS] -= 1
+        self._sum -= value
+        self._sum_squares -= value * value
+
+    """ RESULTS
+    """
+
+    @property
+    def variance(self):
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    @property
+    def window_count(self):
+        return self._filled
+
+    @property
+    def window_mean(self):
+        return self._sum / self._filled if self._filled else 0.0
+
+    @property
+    def window_std(self):
+        """
+        standard deviation of the window (noise floor)
+        """
+        n = self._filled
+        if n < 2:
+            return 0.0
+        return math.sqrt(max(self._sum_squares - self._sum * self._sum / n, 0) / (n - 1))
+
+    @property
+    def drift(self):
+        """
+        EWMA minus the mean of the first window samples, None before window samples
+        """
+        if self.reference is None:
+            return None
+        return self.ewma - self.reference
+
+    def percentile(self, q):
+        """
+        lowest window value with at least q percent of the window at or below it
+        (percentile(0): window min, percentile(100): window max), None when empty
+        """
+        n = self._filled
+        if n == 0:
+            return None
+        rank = min(max(math.ceil(q * n / 100), 1), n)
+        coarse = np.cumsum(self._coarse)
+        block = int(np.searchsorted(coarse, rank))
+        before = int(coarse[block - 1]) if block else 0
+        start = block << COARSE_BITS
+        fine = np.cumsum(self._fine[start : start + (1 << COARSE_BITS)])
+        return start + int(np.searchsorted(fine, rank - before)) + self.value_range[0]
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "std": self.std,
+            "min": self.min,
+            "max": self.max,
+            "ewma": self.ewma,
+            "drift": self.drift,
+            "window_mean": self.window_mean,
+            "window_std": self.window_std,
+            "p1": self.percentile(1),
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+        }
+
+
+class SampleStatistics:
+    """
+    ChannelStats of each field of the samples
+
+    usage:
+        stats = SampleStatistics(window=1000)
+        stats.follow(sampler.ring)  # GUI tick: the samples acquired since the last call
+        stats["adc"].window_std, stats["baseline"].drift, stats.snapshot()
+    """
+
+    def __init__(self, fields=("adc", "baseline", "preload"), **channel_args):
+        self.fields = fields
+        self.channels = {name: ChannelStats(**channel_args) for name in fields}
+        self._next = None
+
+    def __getitem__(self, field) -> ChannelStats:
+        return self.channels[field]
+
+    def reset(self):
+        for channel in self.channels.values():
+            channel.reset()
+        self._next = None
+
+    def update(self, rows: np.ndarray):
+        """
+        rows: structured array holding the fields (ring snapshot, store rows)
+        """
+        for name, channel in self.channels.items():
+            channel.update_batch(rows[name])
+
+    def follow(self, ring: SampleRing):
+        """
+        update with the samples written to ring since the last call (the buffered
+        ones on the first call), return the number of samples missed (overwritten)
+        """
+        start, rows = ring.snapshot(since=self._next)
+        missed = start - self._next if self._next is not None else 0
+        self._next = start + len(rows)
+        self.update(rows)
+        return missed
+
+    def snapshot(self):
+        return {name: channel.snapshot() for name, channel in self.channels.items()}
@@ -0,0 +1,553 @@
+"""
+asyncio HIDPP device
+
+all the device reports are read by the event loop: through loop.add_reader on the
+hidraw file descriptors when available (linux), otherwise through one blocking reader
+thread per endpoint handing the reports over to the loop.
+responses are routed to asyncio futures (see ResponseRouter), so any number of
+requests, on any number of devices, can be awaited concurrently (asyncio.gather).
+Works with any asyncio loop, including qasync for Qt applications.
+
+request(), requests(), call() and send_custom_request() are native: they only await
+the router futures. The feature calls (dev.features.xNNNN...) are a thread pool
+wrapper around the blocking feature classes: each device runs them in its own
+executor of FEATURE_CALL_WORKERS threads, more concurrent calls wait for a free
+thread.
+"""
+
+import asyncio
+import functools
+import itertools
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from threading import Event, Thread
+from typing import Callable
+
+from . import hid_backend
+from .connected_device import (
+    PIPELINE_SW_IDS,
+    PIPELINE_WINDOW,
+    READ_TIMEOUT_MS,
+    build_output_report,
+    get_link_state,
+)
+from .device_info import DeviceInfo
+from .notification_dispatcher import NotificationDispatcher
+from .request import HIDPPRequest, request_type
+from .response_router import ResponseRouter
+from ..features.features import Features
+
+HIDRAW_READ_SIZE = 64
+# feature calls of a device running at the same time (executor threads)
+FEATURE_CALL_WORKERS = 4
+# added to the request timeout for a feature call waiting on the event loop
+BRIDGE_TIMEOUT_MARGIN_S = 1
+
+
+class AsyncConnectedDevice:
+    """
+    asyncio version of ConnectedDevice
+
+    usage:
+        dev = await AsyncConnectedDevice.connect(device_info)
+        await dev.enumerate_all()
+        val, bl, preload = await dev.features.x9402.read_measurement(0)
+        await dev.disconnect()
+
+    feature calls are coroutines. The feature classes themselves are shared with
+    ConnectedDevice: they run in the executor of the device (at most
+    FEATURE_CALL_WORKERS calls in flight) while all the device I/O goes through the
+    event loop. Use call() / request() / requests() for more concurrent requests:
+        res = await dev.call(0x9402, 2, [0])
+        val, bl, preload = X9402.MEASUREMENT.decode(res.params)
+    """
+
+    device_info: DeviceInfo
+
+    def __init__(self, device_info: DeviceInfo, software_id=0x0F):
+        self.device_info = device_info
+        self.sw_id = software_id
+        self.connected = False
+        self.is_using_very_long = False
+        self.hidpp_response_length = 20
+
+        self.logger = logging.getLogger("hidpp")
+
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.router: ResponseRouter | None = None
+        # callbacks called inline, from the event loop
+        self.notifications = NotificationDispatcher(workers=0)
+        self.notifs: asyncio.Queue | None = None
+        self.deconnection_callback: Callable | None = None
+        self.reconnection_callback: Callable | None = None
+
+        self.__sw_ids = itertools.cycle(PIPELINE_SW_IDS)
+        self.__fds = []
+        self.__handles = []
+        self.__reader_threads = []
+        self.__reader_stop_signal = Event()
+        self.__write = None
+        # reused for every write (from the event loop thread only)
+        self.__out_report = bytearray(HIDRAW_READ_SIZE)
+        # runs the blocking feature calls, see AsyncFeatures
+        self.executor: ThreadPoolExecutor | None = None
+
+        self.features = AsyncFeatures(_SyncBridge(self))
+
+    @classmethod
+    async def connect(cls, device_info: DeviceInfo, **kwargs):
+        dev = cls(device_info, **kwargs)
+        await dev.open()
+        return dev
+
+    async def open(self):
+        self.loop = asyncio.get_running_loop()
+        self.router = ResponseRouter(future_factory=self.loop.create_future)
+        self.notifs = asyncio.Queue(maxsize=256)
+        self.executor = ThreadPoolExecutor(
+            max_workers=FEATURE_CALL_WORKERS, thread_name_prefix="hidpp-features"
+        )
+
+        interface = self.device_info.interface
+        # same path for several endpoints on hidraw (one node per hid interface)
+        paths = []
+        for endpoint in (interface.short, interface.long, interface.extra_long):
+            if endpoint is not None and endpoint["path"] not in paths:
+                paths.append(endpoint["path"])
+
+        if self.__can_use_hidraw(paths):
+            for path in paths:
+                fd = os.open(path, os.O_RDWR | os.O_NONBLOCK)
+                self.__fds.append(fd)
+                self.loop.add_reader(fd, self.__read_fd, fd)
+                if path == interface.long["path"]:
+                    self.__write = functools.partial(self.__write_fd, fd)
+        else:
+            for path in paths:
+                handle = hid_backend.device()
+                handle.open_path(path)
+                self.__handles.append(handle)
+                reader = Thread(target=self.__read_handle, args=(handle,), daemon=True)
+                self.__reader_threads.append(reader)
+                reader.start()
+            h_out_long = hid_backend.device()
+            h_out_long.open_path(interface.long["path"])
+            self.__handles.append(h_out_long)
+            self.__write = h_out_long.write
+
+        self.connected = True
+        self.logger.info("Connected to device: {}".format(self.device_info.name))
+
+    async def disconnect(self):
+        was_connected = self.connected
+        self.connected = False
+        for fd in self.__fds:
+            self.loop.remove_reader(fd)
+            os.close(fd)
+        self.__fds = []
+
+        self.__reader_stop_signal.set()
+        if self.__reader_threads:
+            await self.loop.run_in_executor(None, self.__join_reader_threads)
+        for handle in self.__handles:
+            handle.close()
+        self.__handles = []
+
+        if self.router is not None:
+            self.router.cancel_all()
+        if self.executor is not None:
+            # running feature calls return None once their requests are cancelled
+            await self.loop.run_in_executor(None, self.executor.shutdown)
+            self.executor = None
+        if was_connected:
+            self.logger.info(
+                "Disconnected from device: {}".format(self.device_info.name)
+            )
+        self.notifications.clear()
+
+    async def __aenter__(self):
+        if not self.connected:
+            await self.open()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.disconnect()
+
+    def next_sw_id(self):
+        """
+        rotating software id for the requests
+        """
+        return next(self.__sw_ids)
+
+    async def request(self, req: HIDPPRequest, timeout=1) -> HIDPPRequest | None:
+        """
+        send a HIDpp request and wait for the response (None on timeout)
+        req is tagged with the next free sw_id, see ConnectedDevice
+        """
+        self.__tag(req)
+        future = self.router.register(req)
+        self.__write(
+            build_output_report(req, self.is_using_very_long, self.__out_report)
+        )
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self.router.unregister(req, future, lost=True)
+            return None
+        except asyncio.CancelledError:
+            self.router.unregister(req, future)
+            if not self.connected:
+                return None  # pending requests cancelled by the disconnection
+            raise  # the caller itself was cancelled
+
+    async def requests(
+        self, reqs: list[HIDPPRequest], timeout=1, window=PIPELINE_WINDOW
+    ) -> list[HIDPPRequest | None]:
+        """
+        pipelined requests: up to window requests in flight, see
+        ConnectedDevice.send_reqs_and_wait_responses
+        """
+        semaphore = asyncio.Semaphore(max(1, min(window, len(PIPELINE_SW_IDS))))
+
+        async def send(req):
+            async with semaphore:
+                return await self.request(req, timeout)
+
+        return list(await asyncio.gather(*(send(req) for req in reqs)))
+
+    def __tag(self, req):
+        """
+        next sw_id not used by a request still waiting for its response, see
+        ConnectedDevice
+        """
+        for _ in PIPELINE_SW_IDS:
+            req.sw_id = self.next_sw_id()
+            if not self.router.is_waiting(req):
+                return
+        for _ in PIPELINE_SW_IDS:
+            req.sw_id = self.next_sw_id()
+            if not self.router.is_pending(req):
+                return
+
+    async def call(
+        self, feature_id, function_nb, params, timeout=1
+    ) -> HIDPPRequest | None:
+        """
+        native feature call: send function_nb of feature_id (enumerated on first
+        use) and wait for its response, None on timeout or error report.
+        no executor thread involved, the response params are decoded by the caller
+        (ie with the Codec of the feature class)
+        """
+        if not self.connected:
+            self.logger.warning("ERROR: device is not connected")
+            return None
+
+        if not await self.enumerate_feature(feature_id):
+            self.logger.warning(
+                "Feature id: 0x{:04X} is not available".format(feature_id)
+            )
+            return None
+        req = HIDPPRequest(
+            dev_idx=self.device_info.sub_idx,
+            feature=self.device_info.features[feature_id].idx,
+            function=function_nb,
+            req_type=request_type(len(params)),
+            params=params,
+        )
+        res = await self.request(req, timeout)
+        if res is None:
+            self.logger.warning(
+                "No response received for feature 0x{:04X}".format(feature_id)
+            )
+        elif res.feature == 0xFF:
+            self.logger.warning(
+                "Device returned error response for feature 0x{:04X}"
+                " - error code: {}".format(feature_id, res.params[1])
+            )
+            return None
+        return res
+
+    async def send_custom_request(self, feature_id, function_nb, params):
+        if not self.connected:
+            self.logger.warning("ERROR: device is not connected")
+            return None
+
+        if not self.device_info.is_enumerated(feature_id):
+            self.logger.warning("Feature id:{} is not enumerated".format(feature_id))
+            return None
+        feature_idx = self.device_info.features[feature_id].idx
+
+        req = HIDPPRequest(
+            dev_idx=self.device_info.sub_idx,
+            feature=feature_idx,
+            function=function_nb,
+            sw_id=self.next_sw_id(),
+            req_type=request_type(len(params)),
+            params=params,
+        )
+        return await self.request(req)
+
+    async def enumerate_feature(self, f_id):
+        if not self.connected:
+            return False
+
+        if self.device_info.is_enumerated(f_id):
+            return True
+
+        f = await self.features.x0000.get_feature(f_id)
+        if f.idx == 0:  # idx 0 means not found
+            return False
+
+        self.device_info.add_feature(f)
+        return True
+
+    async def enumerate_all(self):
+        if not self.connected:
+            return False
+
+        if not await self.enumerate_feature(0x0001):
+            return False
+
+        cnt = await self.features.x0001.get_count()
+
+        f_infos = await asyncio.gather(
+            *(self.features.x0001.get_feature_id(idx) for idx in range(2, cnt + 1))
+        )
+        complete = True
+        for f_info in f_infos:
+            if f_info is None or f_info.id == 0:
+                # no response: id 0 would overwrite the root feature entry
+                complete = False
+                continue
+            self.device_info.add_feature(f_info)
+
+        if not complete:
+            self.logger.warning("Incomplete feature table")
+        self.device_info.print_features_set()
+        return True
+
+    def register_notif(self, feature_id, notif_id, callback):
+        """
+        callback(req, timestamp) is called from the event loop, timestamp: datetime
+        at reception, req.received_s: time.monotonic() at reception
+        """
+        if not self.device_info.is_enumerated(feature_id):
+            self.logger.warning("Could not register notif. Feature is not enumerated")
+            return
+        f_idx = self.device_info.features[feature_id].idx
+        self.notifications.register(f_idx, notif_id, callback)
+
+    def unregister_notif(self, feature_id, notif_id):
+        if not self.device_info.is_enumerated(feature_id):
+            self.logger.warning("Could not unregister notif. Feature is not enumerated")
+            return
+        f_idx = self.device_info.features[feature_id].idx
+        self.notifications.unregister(f_idx, notif_id)
+
+    async def wait_notif(self, timeout_s=2):
+        """
+        wait for an incoming report which is neither a response nor a registered notif
+        """
+        try:
+            return await asyncio.wait_for(self.notifs.get(), timeout_s)
+        except asyncio.TimeoutError:
+            return None
+
+    """ PRIVATE METHODS
+        not to be used outside this class
+    """
+
+    def __can_use_hidraw(self, paths):
+        return (
+            sys.platform.startswith("linux")
+            and hid_backend.is_hidapi()
+            and all(path.startswith(b"/dev/hidraw") for path in paths)
+            and hasattr(self.loop, "add_reader")
+        )
+
+    def __read_fd(self, fd):
+        try:
+            data = os.read(fd, HIDRAW_READ_SIZE)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            # device unplugged
+            self.logger.warning("Read error on device {}: {}".format(self.device_info.name, e))
+            self.loop.remove_reader(fd)
+            self.connected = False
+            self.router.cancel_all()
+            return
+        self.__on_report(data)
+
+    @staticmethod
+    def __write_fd(fd, report):
+        os.write(fd, report)
+
+    def __read_handle(self, handle):
+        while not self.__reader_stop_signal.is_set():
+            ret = handle.read(HIDRAW_READ_SIZE, READ_TIMEOUT_MS)
+            if len(ret) > 0:
+                self.loop.call_soon_threadsafe(self.__on_report, ret)
+
+    def __join_reader_threads(self):
+        for reader in self.__reader_threads:
+            reader.join()
+        self.__reader_threads = []
+
+    def __on_report(self, data):
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("R: [{}]".format(", ".join(hex(x) for x in data)))
+        req = HIDPPRequest.from_report(data)
+
+        if req.req_type == "SHORT":
+            self.__process_link_notif(req)
+
+        if self.router.dispatch(req):
+            return
+
+        if self.notifications.dispatch(req):
+            return
+
+        if self.notifs.full():
+            self.notifs.get_nowait()  # drop the oldest, nobody is reading them
+        self.notifs.put_nowait(req)
+
+    def __process_link_notif(self, req):
+        link_established = get_link_state(req, self.device_info.sub_idx)
+        if link_established is False:
+            self.logger.info("Device link lost")
+            self.connected = False
+            if self.deconnection_callback is not None:
+                self.deconnection_callback()
+        elif link_established:
+            self.logger.info("Device link established")
+            self.connected = True
+            if self.reconnection_callback is not None:
+                self.reconnection_callback()
+
+
+class _SyncBridge:
+    """
+    ConnectedDevice-like facade handed to the feature classes, which run in the loop
+    executor: blocking calls are forwarded to the event loop
+    """
+
+    def __init__(self, device: AsyncConnectedDevice):
+        self._device = device
+        self.logger = device.logger
+
+    @property
+    def connected(self):
+        return self._device.connected
+
+    @property
+    def device_info(self):
+        return self._device.device_info
+
+    def next_sw_id(self):
+        return self._device.next_sw_id()
+
+    def register_notif(self, feature_id, notif_id, callback):
+        self._device.loop.call_soon_threadsafe(
+            self._device.register_notif, feature_id, notif_id, callback
+        )
+
+    def unregister_notif(self, feature_id, notif_id):
+        self._device.loop.call_soon_threadsafe(
+            self._device.unregister_notif, feature_id, notif_id
+        )
+
+    def enumerate_feature(self, f_id):
+        # already in an executor thread: enumerate from here rather than through a
+        # new executor job, which could starve the executor
+        if not self.connected:
+            return False
+
+        if self.device_info.is_enumerated(f_id):
+            return True
+
+        f = self._device.features.sync_features.x0000.get_feature(f_id)
+        if f.idx == 0:  # idx 0 means not found
+            return False
+
+        self.device_info.add_feature(f)
+        return True
+
+    def send_req_and_wait_response(self, req, timeout=0.2):
+        return self._run(self._device.request(req, timeout), timeout)
+
+    def send_reqs_and_wait_responses(self, reqs, timeout=1, window=PIPELINE_WINDOW):
+        # each window of requests waits up to timeout
+        rounds = -(-len(reqs) // max(1, min(window, len(PIPELINE_SW_IDS))))
+        return self._run(
+            self._device.requests(reqs, timeout, window), timeout * max(1, rounds)
+        )
+
+    def send_custom_request(self, feature_id, function_nb, params):
+        return self._run(
+            self._device.send_custom_request(feature_id, function_nb, params), 1
+        )
+
+    def _run(self, coro, timeout):
+        """
+        run coro on the event loop and wait for its result, at most timeout (of the
+        requests) + BRIDGE_TIMEOUT_MARGIN_S not to pin an executor thread when the
+        loop is stuck. None on timeout
+        """
+        loop = self._device.loop
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            coro.close()
+            raise RuntimeError("blocking feature call from the event loop thread")
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        try:
+            return future.result(timeout + BRIDGE_TIMEOUT_MARGIN_S)
+        except FutureTimeoutError:  # not the builtin TimeoutError before python 3.11
+            future.cancel()
+            self.logger.warning("Feature call timed out waiting for the event loop")
+            return None
+
+
+class AsyncFeatures:
+    """
+    coroutine version of Features: dev.features.x9402.read_measurement(0) returns an
+    awaitable, the blocking feature method runs in the executor of the device
+    """
+
+    def __init__(self, bridge: _SyncBridge):
+        self.sync_features = Features(bridge)
+        self._bridge = bridge
+
+    def __getattr__(self, name):
+        feature = getattr(self.sync_features, name)
+        proxy = _AsyncFeature(feature, self._bridge)
+        setattr(self, name, proxy)  # cache the proxy
+        return proxy
+
+
+class _AsyncFeature:
+    def __init__(self, feature, bridge: _SyncBridge):
+        self._feature = feature
+        self._bridge = bridge
+
+    def __getattr__(self, name):
+        attr = getattr(self._feature, name)
+        if not callable(attr) or isinstance(attr, type):
+            return attr  # feature_id, enums...
+
+        async def call(*args, **kwargs):
+            device = self._bridge._device
+            if device.executor is None:
+                device.logger.warning("ERROR: device is not connected")
+                return None
+            return await device.loop.run_in_executor(
+                device.executor, functools.partial(attr, *args, **kwargs)
+            )
+
+        return call
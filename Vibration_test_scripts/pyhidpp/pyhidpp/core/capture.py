@@ -0,0 +1,139 @@
+"""
+HID traffic capture
+
+binary capture of the raw reports read and written by a ConnectedDevice:
+
+    header: magic, version, wall clock ns, monotonic ns, metadata length
+            followed by the metadata (json: device name, vid, pid, sub_idx)
+    record: monotonic ns, direction, report length, followed by the report
+
+all integers little endian, see HEADER and RECORD. A capture is replayed with
+pyhidpp.simulator.ReplayHid
+"""
+
+import json
+import queue
+import struct
+import time
+from threading import Thread
+
+MAGIC = b"HIDPPCAP"
+VERSION = 1
+HEADER = struct.Struct("<8sHQQH")
+RECORD = struct.Struct("<QBB")
+
+CAPTURE_IN = 0  # read from the device
+CAPTURE_OUT = 1  # written to the device
+
+# records packed and written at once by the writer thread (at most)
+WRITE_BATCH_SIZE = 1024
+
+
+class CaptureWriter:
+    """
+    record reports to a capture file
+
+    record() only timestamps and queues the report, packing and writing is done by
+    a background thread through a buffered file
+    """
+
+    def __init__(self, path, metadata: dict = None, buffering=1 << 16):
+        self.path = path
+        self.records_count = 0
+        self._queue = queue.SimpleQueue()
+        self._file = open(path, "wb", buffering=buffering)
+
+        meta = json.dumps(metadata or {}).encode()
+        self._file.write(
+            HEADER.pack(MAGIC, VERSION, time.time_ns(), time.monotonic_ns(), len(meta))
+        )
+        self._file.write(meta)
+
+        self._thread = Thread(target=self.__writer, daemon=True)
+        self._thread.start()
+
+    def record(self, direction, report):
+        self._queue.put((time.monotonic_ns(), direction, bytes(report)))
+
+    def close(self):
+        """
+        write the pending records and close the file
+        """
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __writer(self):
+        pack = RECORD.pack
+        running = True
+        while running:
+            batch = [self._queue.get()]  # blocks until something to write
+            while len(batch) < WRITE_BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            chunks = []
+            for record in batch:
+                if record is None:
+                    running = False
+                    break
+                t_ns, direction, report = record
+                chunks.append(pack(t_ns, direction, len(report)))
+                chunks.append(report)
+            self._file.write(b"".join(chunks))
+            self.records_count += len(chunks) // 2
+        self._file.flush()
+
+
+class CaptureReader:
+    """
+    iterate over the (monotonic ns, direction, report) records of a capture file
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        header = self._file.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError("{}: not a capture file".format(path))
+        magic, version, wall_ns, start_ns, meta_length = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError("{}: not a capture file".format(path))
+        if version != VERSION:
+            raise ValueError("{}: unsupported capture version {}".format(path, version))
+        self.wall_ns = wall_ns
+        self.start_ns = start_ns
+        self.metadata = json.loads(self._file.read(meta_length))
+
+    def __iter__(self):
+        read = self._file.read
+        unpack = RECORD.unpack
+        while True:
+            record = read(RECORD.size)
+            if len(record) < RECORD.size:
+                return  # end of file (or truncated last record)
+            t_ns, direction, length = unpack(record)
+            report = read(length)
+            if len(report) < length:
+                return
+            yield t_ns, direction, report
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
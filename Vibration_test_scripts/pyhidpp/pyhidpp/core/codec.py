@@ -0,0 +1,111 @@
+"""
+HIDPP payload codecs
+
+declarative layout of the params of a request, response or notification: a list
+of (name, struct format) fields compiled once to a struct.Struct, so that decoding
+a report is a single unpack_from on its params (no slicing, no byte arithmetic).
+padding fields have no name: (None, "3x").
+
+usage:
+    MEASUREMENT = Codec([(None, "B"), ("value", "H"), ("baseline", "H")], "<")
+    value, baseline = MEASUREMENT.decode(res.params)
+    values = MEASUREMENT.decode_batch(reports, stride=20, offset=4)  # numpy
+"""
+
+import struct
+
+# struct format -> numpy type (without byte order)
+_NUMPY_TYPES = {
+    "b": "i1",
+    "B": "u1",
+    "?": "?",
+    "h": "i2",
+    "H": "u2",
+    "i": "i4",
+    "I": "u4",
+    "l": "i4",
+    "L": "u4",
+    "q": "i8",
+    "Q": "u8",
+    "e": "f2",
+    "f": "f4",
+    "d": "f8",
+}
+
+
+class Codec:
+    """
+    compiled layout of a payload, byte_order ">" (big endian) or "<" (little
+    endian). decode() returns the named fields as a tuple, in order
+    """
+
+    __slots__ = ("fields", "names", "byte_order", "struct", "size", "_dtypes")
+
+    def __init__(self, fields: list[tuple[str | None, str]], byte_order=">"):
+        for name, fmt in fields:
+            if name is None and not fmt.endswith("x"):
+                raise ValueError("unnamed field {!r} is not padding".format(fmt))
+        self.fields = fields
+        self.names = tuple(name for name, _ in fields if name is not None)
+        self.byte_order = byte_order
+        self.struct = struct.Struct(byte_order + "".join(fmt for _, fmt in fields))
+        self.size = self.struct.size
+        self._dtypes = {}
+
+    def decode(self, params, offset=0) -> tuple:
+        """
+        params: buffer (report params view, bytes) or list of ints
+        raise struct.error when params is shorter than size
+        """
+        try:
+            return self.struct.unpack_from(params, offset)
+        except TypeError:
+            return self.struct.unpack_from(bytes(params), offset)
+
+    def decode_dict(self, params, offset=0) -> dict:
+        return dict(zip(self.names, self.decode(params, offset)))
+
+    def encode(self, *values) -> bytes:
+        """
+        params of a request, padding fields set to 0
+        """
+        return self.struct.pack(*values)
+
+    def dtype(self, stride=None, offset=0):
+        """
+        numpy structured dtype of the named fields, for records of stride bytes
+        (size by default) holding the payload at offset
+        """
+        key = (stride, offset)
+        dtype = self._dtypes.get(key)
+        if dtype is None:
+            import numpy as np
+
+            names, formats, offsets = [], [], []
+            position = offset
+            for name, fmt in self.fields:
+                if name is not None:
+                    count, code = fmt[:-1], fmt[-1]
+                    numpy_type = self.byte_order + _NUMPY_TYPES[code]
+                    names.append(name)
+                    formats.append((numpy_type, int(count)) if count else numpy_type)
+                    offsets.append(position)
+                position += struct.calcsize(self.byte_order + fmt)
+            dtype = self._dtypes[key] = np.dtype(
+                {
+                    "names": names,
+                    "formats": formats,
+                    "offsets": offsets,
+                    "itemsize": stride or offset + self.size,
+                }
+            )
+        return dtype
+
+    def decode_batch(self, buffer, stride=None, offset=0):
+        """
+        decode the records of buffer (bytes of count * stride) in one numpy call
+        return a structured array, one column per named field
+        """
+        import numpy as np
+
+        return np.frombuffer(buffer, dtype=self.dtype(stride, offset))
@@ -4,24 +4,69 @@ Simple HIDPP implementation based on Jerome Amiguet's tiresias software
 
 import sys
 from typing import Callable
-import hid
-import time
+import itertools
 import logging
 
 from threading import Thread, Event
+from concurrent.futures import CancelledError, FIRST_COMPLETED, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
 import queue
 
 import platform
+import time
 
-from .request import HIDPPRequest
+from . import hid_backend
+from .capture import CAPTURE_IN, CAPTURE_OUT, CaptureWriter
+from .feature_cache import FeatureCache, cache_key, default_feature_cache
+from .notification_dispatcher import NotificationDispatcher
+from .request import HIDPPRequest, REPORT_IDS, REPORT_LENGTHS, request_type
+from .response_router import ResponseRouter
+from .transport_stats import TransportStats
 from ..features.features import Features
 from .device_info import DeviceInfo
-from datetime import datetime
 
 HIDPP_RESPONSE_LENGTH = 20
+# blocking read/queue timeout of the listener and commander threads, only bounds the
+# time needed to stop them
+READ_TIMEOUT_MS = 50
+# software ids used to tag pipelined requests (0 is reserved for notifications)
+PIPELINE_SW_IDS = range(0x01, 0x10)
+# default number of requests kept in flight by send_reqs_and_wait_responses
+PIPELINE_WINDOW = 8
+# unrouted reports (ie unregistered notifications) kept for wait_notif/get_buffer_in_req
+BUFFER_IN_MAX_SIZE = 256
 SUPPORTED_OS = ["macOS", "Windows"]
 
 
+def build_output_report(req: HIDPPRequest, is_using_very_long=False, out=None):
+    """
+    build the report to write on the long endpoint for req, into the reusable out
+    buffer if given (64 bytes at least)
+    important: all command are send to the long endpoint (short are converted)
+    """
+    # short are sent on the long endpoint (need convertion)
+    # both long and very long are sent on the same endpoint
+    # but we need to transform long request into very long ones
+    if is_using_very_long or req.report_id == REPORT_IDS["VERY LONG"]:
+        report_id = REPORT_IDS["VERY LONG"]
+    else:
+        report_id = REPORT_IDS["LONG"]
+
+    if out is None:
+        out = bytearray(REPORT_LENGTHS[REPORT_IDS["VERY LONG"]])
+    return req.write_into(out, report_id)
+
+
+def get_link_state(req: HIDPPRequest, sub_idx):
+    """
+    connection notif (0x41) of the device sub_idx: return True if link established,
+    False if link lost, None for any other report
+    """
+    if req.feature != 0x41 or req.dev_idx != sub_idx:
+        return None
+    return (req.params[0] >> 6) & 0x01 == 0
+
+
 class ConnectedDevice:
     """
     HIDPP module implementation
@@ -45,8 +90,11 @@ class ConnectedDevice:
 
         self.connected = True
         self.device_info = device_info
+        self.router = ResponseRouter()
+        self.stats = TransportStats()
 
         self.sw_id = software_id
+        self.__sw_ids = itertools.cycle(PIPELINE_SW_IDS)
         self.features = Features(self)
         self.system = platform.platform().split("-")[0]
         self.dev = not (getattr(sys, "frozen", False) and hasattr(sys, "_MEIPASS"))
@@ -58,9 +106,18 @@ class ConnectedDevice:
 
         self.listener_stop_signal = Event()
         self.commander_stop_signal = Event()
-        self.registered_notif = {}
+        self.notifications = NotificationDispatcher()
         self.deconnection_callback: Callable | None = None
         self.reconnection_callback: Callable | None = None
+        self.capture: CaptureWriter | None = None
+        # feature tables of known firmwares, None not to use any. Simulated and
+        # replayed devices (hid_backend other than hidapi) do not use the user cache
+        self.feature_cache: FeatureCache | None = (
+            default_feature_cache() if hid_backend.is_hidapi() else None
+        )
+        self.__feature_cache_key = None
+        self.__feature_cache_checked = False
+        self.__features_from_cache = False
 
         if self.system == "macOS":
             self.__start_communication_thread(device_info)
@@ -71,34 +128,85 @@ class ConnectedDevice:
     def disconnect(self):
         self.stop_listener_thread()
         self.stop_commander_thread()
+        self.router.cancel_all()
+        self.notifications.stop()
+        self.stats.stop_periodic_dump()
+        self.stop_capture()
         if self.connected:
             self.logger.info(
                 "Disconnected from device: {}".format(self.device_info.name)
             )
             self.hidpp_response_length = 20
-            self.registered_notif = {}
+            self.notifications.clear()
+
+    def start_capture(self, path):
+        """
+        record every report read and written to the capture file path (see
+        core.capture), until stop_capture
+        """
+        self.stop_capture()
+        self.capture = CaptureWriter(
+            path,
+            {
+                "name": self.device_info.name,
+                "vid": self.device_info.vid,
+                "pid": self.device_info.pid,
+                "sub_idx": self.device_info.sub_idx,
+            },
+        )
+
+    def stop_capture(self):
+        capture = self.capture
+        if capture is not None:
+            self.capture = None
+            capture.close()
+            self.logger.info(
+                "{} reports captured to {}".format(capture.records_count, capture.path)
+            )
+
+    def transport_stats(self):
+        """
+        snapshot of the transport statistics (see TransportStats): round trip times
+        per feature id/function, timeouts and transport events
+        """
+        return self.stats.snapshot(self.__feature_ids())
+
+    def print_transport_stats(self):
+        print(self.stats.summary(self.__feature_ids()))
+
+    def start_stats_dump(self, period_s=60):
+        """
+        log the transport statistics summary every period_s, until disconnect
+        """
+        self.stats.start_periodic_dump(period_s, self.__feature_ids)
+
+    def __feature_ids(self):
+        feature_ids = {0: 0x0000}
+        for feature_id, info in self.device_info.features.items():
+            feature_ids[info.idx] = feature_id
+        return feature_ids
 
     def set_custom(self, custom):
         self.custom = custom(self)
 
     def register_notif(self, feature_id, notif_id, callback):
+        """
+        callback(req, timestamp) is called from the notification worker thread,
+        timestamp: datetime at reception, req.received_s: time.monotonic() at
+        reception (see NotificationDispatcher)
+        """
         if not self.device_info.is_enumerated(feature_id):
             self.logger.warning("Could not register notif. Feature is not enumerated")
             return
         f_idx = self.device_info.features[feature_id].idx
-
-        self.unregister_notif(feature_id, notif_id)
-
-        key = str(f_idx) + ":" + str(notif_id)
-        self.registered_notif.update({key: callback})
+        self.notifications.register(f_idx, notif_id, callback)
 
     def unregister_notif(self, feature_id, notif_id):
         if not self.device_info.is_enumerated(feature_id):
             self.logger.warning("Could not unregister notif. Feature is not enumerated")
             return
         f_idx = self.device_info.features[feature_id].idx
-        key = str(f_idx) + ":" + str(notif_id)
-        self.registered_notif.pop(key, None)
+        self.notifications.unregister(f_idx, notif_id)
 
     def get_buffer_in_req(self):
         """
@@ -114,15 +222,10 @@ class ConnectedDevice:
         """
         wait for an incoming notification
         """
-        delay = 0.001
-        max_attempt = int(timeout_s / delay)
-
-        res = self.get_buffer_in_req()
-        attempt = 1
-        while res is None and attempt < max_attempt:
-            res = self.get_buffer_in_req()
-            attempt += 1
-            time.sleep(delay)
+        try:
+            res = self.buffer_in.get(timeout=timeout_s)
+        except queue.Empty:
+            res = None
         self.clear_input_queue()
         return res
 
@@ -137,61 +240,107 @@ class ConnectedDevice:
     def send_req_and_wait_response(self, req, timeout=0.2) -> HIDPPRequest | None:
         """
         send a HIDpp request and wait for the response
-        """
-        # before sending anything, best to see if there is anything in the input queue
-        # already
-        res = self.get_buffer_in_req()
-        while res is not None:
-            self.logger.warning(
-                "unprocessed IN req: idx:{}, feature:{}, fct: {}, params:{}".format(
-                    res.dev_idx, res.feature, res.function, res.params
-                )
-            )
-            res = self.get_buffer_in_req()
 
+        the response is routed to this call by the listener thread (see
+        ResponseRouter), other threads can safely send requests at the same time.
+        req is tagged with the next free sw_id, not to get the late response of a
+        timed out request
+        """
+        self.__tag(req)
+        future = self.router.register(req)
+        start = time.perf_counter()
         self.buffer_out.put_nowait(req)
 
         try:
-            res = self.buffer_in.get(timeout=timeout)
-        except queue.Empty:
-            # still empty after timeout
+            res = future.result(timeout=timeout)
+        except FutureTimeoutError:  # not the builtin TimeoutError before python 3.11
+            self.router.unregister(req, future, lost=True)
+            self.stats.record_timeout(req.feature, req.function)
+            return None
+        except CancelledError:
+            # disconnected
+            self.router.unregister(req, future)
             return None
+        self.stats.record_rtt(req.feature, req.function, time.perf_counter() - start)
+        return res
 
-        # workaround when notif are sended between request and response
-        # (ie the response we get is a notification, that was sent inbetween,
-        # and not the response of the request)
-        if self.__isTheResponse(req, res):
-            return res
-        else:
-            max_attempt = 10
-            attempt = 0
-            while attempt < max_attempt:
-                attempt += 1
-                # the response we get is not the answer. A notification was received
-                # just before. Thus we swap the 2 last request
-                self.logger.warning(
-                    "a notif was received before the request's response"
-                )
-                if res is not None:
-                    self.logger.warning(
-                        f"unprocessed IN req: idx:{res.dev_idx}, feature:{res.feature},"
-                        f" fct: {res.function}, params:{res.params}"
-                    )
+    def send_reqs_and_wait_responses(
+        self, reqs: list[HIDPPRequest], timeout=1, window=PIPELINE_WINDOW
+    ) -> list[HIDPPRequest | None]:
+        """
+        send several HIDpp requests back to back and wait for all the responses
 
-                # temp = res
+        up to window requests are kept in flight, each one tagged with its own sw_id
+        so that responses can be routed back whatever order they arrive in.
+        timeout applies to each request, a lost request only holds its slot of the
+        window until then.
+        return the responses in the order of reqs (None when no response)
+        """
+        window = max(1, min(window, len(PIPELINE_SW_IDS)))
+        responses: list[HIDPPRequest | None] = [None] * len(reqs)
+        pending = {}  # future -> (index in reqs, sending time, deadline)
+        missing = 0
+
+        next_req = 0
+        while next_req < len(reqs) or pending:
+            while next_req < len(reqs) and len(pending) < window:
+                req = reqs[next_req]
+                self.__tag(req)
+                future = self.router.register(req)
+                start = time.perf_counter()
+                pending[future] = (next_req, start, start + timeout)
+                self.buffer_out.put_nowait(req)
+                next_req += 1
+
+            first_deadline = min(deadline for _, _, deadline in pending.values())
+            done, _ = wait(
+                pending,
+                timeout=max(0, first_deadline - time.perf_counter()),
+                return_when=FIRST_COMPLETED,
+            )
+            now = time.perf_counter()
+            for future in done:
+                idx, start, _ = pending.pop(future)
+                if not future.cancelled():
+                    responses[idx] = future.result()
+                    req = reqs[idx]
+                    self.stats.record_rtt(req.feature, req.function, now - start)
+
+            for future, (idx, _, deadline) in list(pending.items()):
+                if deadline <= now:
+                    del pending[future]
+                    req = reqs[idx]
+                    self.router.unregister(req, future, lost=True)
+                    self.stats.record_timeout(req.feature, req.function)
+                    missing += 1
+
+        if missing:
+            self.logger.warning(
+                "{} pipelined request(s) without response".format(missing)
+            )
+        return responses
 
-                try:
-                    res = self.buffer_in.get(timeout=timeout)
-                except queue.Empty:
-                    res = None
+    def __tag(self, req):
+        """
+        give req the next sw_id not used by a request still waiting for its response
+        (or a lost one), not to get its response routed to the wrong request.
+        When all of them are, a lost one is reused rather than a waiting one
+        """
+        for _ in PIPELINE_SW_IDS:
+            req.sw_id = self.next_sw_id()
+            if not self.router.is_waiting(req):
+                return
+            self.stats.retagged += 1
+        for _ in PIPELINE_SW_IDS:
+            req.sw_id = self.next_sw_id()
+            if not self.router.is_pending(req):
+                return
 
-                if self.__isTheResponse(req, res):
-                    # discard the unwanted notif, don't put back in buffer
-                    """# put back the notif in the buffer for further process
-                    self.buffer_in.put_nowait(temp)"""
-                    self.clear_input_queue()
-                    return res
-        return res
+    def next_sw_id(self):
+        """
+        rotating software id for the requests
+        """
+        return next(self.__sw_ids)
 
     def send_raw(self, req_list):
         req = HIDPPRequest(from_list=req_list)
@@ -216,18 +365,12 @@ class ConnectedDevice:
             self.logger.warning("Feature id:{} is not enumerated".format(feature_id))
             return None
 
-        if len(params) > 20:
-            req_type = "VERY LONG"
-        elif len(params) > 3:
-            req_type = "LONG"
-        else:
-            req_type = "SHORT"
-
         req = HIDPPRequest(
             dev_idx=dev_idx,
             feature=feature_idx,
             function=function_nb,
-            req_type=req_type,
+            sw_id=self.next_sw_id(),
+            req_type=request_type(len(params)),
             params=params,
         )
         res = self.send_req_and_wait_response(req, timeout=1)
@@ -246,18 +389,11 @@ class ConnectedDevice:
             self.logger.warning("Feature id:{} is not enumerated".format(feature_id))
             return None
 
-        if len(params) > 20:
-            req_type = "VERY LONG"
-        elif len(params) > 3:
-            req_type = "LONG"
-        else:
-            req_type = "SHORT"
-
         req = HIDPPRequest(
             dev_idx=dev_idx,
             feature=feature_idx,
             function=function_nb,
-            req_type=req_type,
+            req_type=request_type(len(params)),
             params=params,
         )
         #res = self.send_req_and_wait_response(req, timeout=1)
@@ -270,6 +406,8 @@ class ConnectedDevice:
 
         if self.device_info.is_enumerated(f_id):
             return True
+        if self.__load_cached_features() and self.device_info.is_enumerated(f_id):
+            return True
 
         f = self.features.x0000.get_feature(f_id)
         if f.idx == 0:  # idx 0 means not found
@@ -278,23 +416,112 @@ class ConnectedDevice:
         self.device_info.add_feature(f)
         return True
 
-    def enumerate_all(self):
+    def enumerate_all(self, use_cache=True, pipelined=True):
+        """
+        enumerate all the features of the device (x0001), the feature table is
+        taken from the feature cache for known firmwares
+
+        pipelined: all the x0001 requests are sent back to back, the indexes left
+        without response (device not supporting queued requests) are enumerated
+        again one by one
+        """
         if not self.connected:
             return False
 
+        if use_cache and self.__load_cached_features():
+            self.device_info.print_features_set()
+            return True
+
         if not self.device_info.is_enumerated(0x0001):
             if not self.enumerate_feature(0x0001):
                 return False
 
         cnt = self.features.x0001.get_count()
-
-        for idx in range(2, cnt + 1):
-            f_info = self.features.x0001.get_feature_id(idx)
+        indexes = range(2, cnt + 1)
+
+        if pipelined:
+            f_infos = self.features.x0001.get_feature_ids(indexes)
+            missing = f_infos.count(None)
+            if missing:
+                self.logger.info(
+                    "{} feature(s) not enumerated by pipelined requests,"
+                    " retrying one by one".format(missing)
+                )
+        else:
+            f_infos = [None] * len(indexes)
+
+        complete = True
+        for idx, f_info in zip(indexes, f_infos):
+            if f_info is None:
+                f_info = self.features.x0001.get_feature_id(idx)
+            if f_info.id == 0:
+                # no response: id 0 would overwrite the root feature entry
+                complete = False
+                continue
             self.device_info.add_feature(f_info)
 
+        if not complete:
+            self.logger.warning("Incomplete feature table, not cached")
+        elif use_cache and self.feature_cache is not None:
+            key = self.__get_feature_cache_key()
+            if key is not None:
+                self.feature_cache.store(key, list(self.device_info.features.values()))
+
         self.device_info.print_features_set()
         return True
 
+    def __get_feature_cache_key(self):
+        """
+        pid, main firmware name, build and transport pid (x0003 entity 0)
+        """
+        if self.__feature_cache_key is None:
+            fw_info = self.features.x0003.get_fw_info(0)
+            if fw_info is not None:
+                self.__feature_cache_key = cache_key(self.device_info.pid, fw_info)
+        return self.__feature_cache_key
+
+    def __load_cached_features(self):
+        """
+        fill the feature table from the feature cache, once per connection
+        return True if the feature table comes from the cache
+        """
+        if not self.__feature_cache_checked:
+            self.__feature_cache_checked = True
+            self.__features_from_cache = self.__try_feature_cache()
+        return self.__features_from_cache
+
+    def __try_feature_cache(self):
+        cache = self.feature_cache
+        if cache is None or not cache.has_pid(self.device_info.pid):
+            return False
+        key = self.__get_feature_cache_key()
+        if key is None:
+            return False
+        features = cache.load(key)
+        if not features:
+            return False
+        if any(f_info.id == 0 for f_info in features):
+            # written by an older version from an incomplete enumeration
+            self.logger.warning("Corrupted feature cache entry {}, ignored".format(key))
+            cache.remove(key)
+            return False
+
+        known = dict(self.device_info.features)
+        for f_info in features:
+            if f_info.id not in known:
+                self.device_info.add_feature(f_info)
+
+        # one probe: the last feature index must still hold the same feature
+        last = max(features, key=lambda f: f.idx)
+        if self.features.x0001.get_feature_id(last.idx).id != last.id:
+            self.logger.warning("Stale feature cache entry {}, ignored".format(key))
+            self.device_info.features = known
+            cache.remove(key)
+            return False
+
+        self.logger.info("Feature table loaded from cache ({})".format(key))
+        return True
+
     def stop_listener_thread(self):
         self.listener_stop_signal.set()
         try:
@@ -305,6 +532,7 @@ class ConnectedDevice:
 
     def stop_commander_thread(self):
         self.commander_stop_signal.set()
+        self.buffer_out.put_nowait(None)  # wake up the commander
         try:
             self.thread_out.join()
         except AttributeError:
@@ -322,65 +550,54 @@ class ConnectedDevice:
         h_in_long,
         h_in_short=None,
         h_in_extra_long=None,
-        sleep=0.0002,
+        timeout_ms=READ_TIMEOUT_MS,
     ):
         """
         listen to HIDpp request from the connected device
 
         to run in dedicated thread (see connect call)
         when a IN hid request is received, it is put in the input queue
-        """
 
-        while not stop_event.is_set():
-            if h_in_short is not None:  # no short endpoint for ble
-                ret = h_in_short.read(10)
-                if len(ret) > 0:
-                    self.logger.debug(
-                        "SHORT R: [{}]".format(", ".join(hex(x) for x in ret))
-                    )
-                    req = HIDPPRequest(from_list=ret)
-                    # req.print_request_props()
-                    # connection notif: link unestablished
-                    if (
-                        req.feature == 0x41
-                        and req.dev_idx == dev.sub_idx
-                        and (req.params[0] >> 6) & 0x01 == 1
-                    ):
-                        self.logger.info("Device link lost")
-                        self.connected = False
-                        if self.deconnection_callback is not None:
-                            self.deconnection_callback()
-                    elif (
-                        req.feature == 0x41
-                        and req.dev_idx == dev.sub_idx
-                        and (req.params[0] >> 6) & 0x01 == 0
-                    ):
-                        # connection notif: link established
-                        self.logger.info("Device link established")
-                        self.connected = True
-                        if self.reconnection_callback is not None:
-                            self.reconnection_callback()
-
-            ret = h_in_long.read(self.hidpp_response_length)
-            if len(ret) > 0:
-                self.logger.debug("LONG R: [{}]".format(", ".join(hex(x) for x in ret)))
-                req = HIDPPRequest(from_list=ret)
-
-                if not self.__processNotif(req):
-                    self.buffer_in.put_nowait(req)
-
-            if h_in_extra_long is not None:
-                ret = h_in_extra_long.read(self.hidpp_response_length)
-                if len(ret) > 0:
-                    self.logger.debug(
-                        "EXTRA LONG R: [{}]".format(", ".join(hex(x) for x in ret))
-                    )
-                    req = HIDPPRequest(from_list=ret)
-
-                    if not self.__processNotif(req):
-                        self.buffer_in.put_nowait(req)
+        the long endpoint is read with blocking reads on this thread, short and extra
+        long endpoints (if any) get their own reader thread, as hidapi cannot wait on
+        several handles at once. The read timeout only bounds the stop latency.
+        """
+        readers = []
+        if h_in_short is not None:  # no short endpoint for ble
+            readers.append(
+                Thread(
+                    target=self.__read_endpoint,
+                    args=(stop_event, h_in_short, lambda: 10, timeout_ms, "SHORT", dev),
+                )
+            )
+        if h_in_extra_long is not None:
+            readers.append(
+                Thread(
+                    target=self.__read_endpoint,
+                    args=(
+                        stop_event,
+                        h_in_extra_long,
+                        lambda: self.hidpp_response_length,
+                        timeout_ms,
+                        "EXTRA LONG",
+                        dev,
+                    ),
+                )
+            )
+        for reader in readers:
+            reader.start()
+
+        self.__read_endpoint(
+            stop_event,
+            h_in_long,
+            lambda: self.hidpp_response_length,
+            timeout_ms,
+            "LONG",
+            dev,
+        )
 
-            time.sleep(sleep)
+        for reader in readers:
+            reader.join()
 
         if h_in_short is not None:  # no short endpoint for ble
             h_in_short.close()
@@ -388,80 +605,122 @@ class ConnectedDevice:
         if h_in_extra_long is not None:
             h_in_extra_long.close()
 
-    def __commander(self, dev, stop_event, h_out_long, sleep=0.0002):
+    def __read_endpoint(self, stop_event, handle, get_length, timeout_ms, name, dev):
+        """
+        blocking read loop on a single endpoint, until stop_event is set
+        """
+        while not stop_event.is_set():
+            ret = handle.read(get_length(), timeout_ms)
+            if len(ret) == 0:
+                continue  # timeout, check stop_event again
+            capture = self.capture
+            if capture is not None:
+                capture.record(CAPTURE_IN, ret)
+
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(
+                    "{} R: [{}]".format(name, ", ".join(hex(x) for x in ret))
+                )
+            req = HIDPPRequest.from_report(ret)
+
+            if name == "SHORT":
+                self.__process_link_notif(dev, req)
+            elif not self.router.dispatch(req):
+                if req.sw_id == 0 and req.feature != 0xFF:
+                    if self.router.has_pending():
+                        self.stats.interleaved_notifs += 1
+                else:
+                    # response to a request which is not waiting anymore
+                    self.stats.unmatched += 1
+                if not self.notifications.dispatch(req):
+                    self.__put_buffer_in(req)
+
+    def __put_buffer_in(self, req):
+        """
+        keep an unrouted report for get_buffer_in_req/wait_notif, dropping the oldest
+        one when nobody is reading them
+        """
+        while self.buffer_in.qsize() >= BUFFER_IN_MAX_SIZE:
+            try:
+                self.buffer_in.get_nowait()
+            except queue.Empty:
+                break
+        self.buffer_in.put_nowait(req)
+
+    def __process_link_notif(self, dev, req):
+        # req.print_request_props()
+        link_established = get_link_state(req, dev.sub_idx)
+        if link_established is False:
+            # connection notif: link unestablished
+            self.logger.info("Device link lost")
+            self.connected = False
+            if self.deconnection_callback is not None:
+                self.deconnection_callback()
+        elif link_established:
+            # connection notif: link established
+            self.logger.info("Device link established")
+            self.connected = True
+            if self.reconnection_callback is not None:
+                self.reconnection_callback()
+
+    def __commander(self, dev, stop_event, h_out_long, timeout_ms=READ_TIMEOUT_MS):
         """
         send HIDpp request to the connected device
 
         to run in dedicated thread (see connect call)
         when a OUT hid request/command is in the output queue, it is sent to the device
         important: all command are send to the long endpoint (short are converted)
+
+        blocks on the output queue: woken up as soon as a request is put, or by the
+        None sentinel pushed by stop_commander_thread
         """
 
-        # h_out_short = hid.device()
+        # h_out_short = hid_backend.device()
         # h_out_short.open_path(dev.interface.endpoint_short['path'])
         # h_out_short.set_nonblocking(1)
 
+        # reused for every write, the report is serialised in place
+        out_report = bytearray(REPORT_LENGTHS[REPORT_IDS["VERY LONG"]])
+
         while not stop_event.is_set():
-            if not self.buffer_out.empty():
-                req = self.buffer_out.get_nowait()
-                req_list = req.build_request()  # build_request
-
-                # short are sent on the long endpoint (need convertion)
-                if req.req_type == "SHORT":
-                    req.req_type = "LONG"
-                    req_list[0] = 0x11
-                    req_list.extend([0] * (20 - len(req_list)))
-                    req.length = 20
-
-                # both long and very long are sent on the same endpoint
-                # but we need to transform long request into very long ones
-                if req.req_type == "LONG" and self.is_using_very_long:
-                    req.req_type = "VERY LONG"
-                    req_list[0] = 0x12
-                    req_list.extend([0] * (64 - len(req_list)))
-                    req.length = 64
+            try:
+                req = self.buffer_out.get(timeout=timeout_ms / 1000)
+            except queue.Empty:
+                continue
+            if req is None:
+                continue  # wake up sentinel
+
+            report = build_output_report(req, self.is_using_very_long, out_report)
 
+            if self.logger.isEnabledFor(logging.DEBUG):
                 self.logger.debug(
-                    "LONG W: [{}]".format(", ".join(hex(x) for x in req_list))
+                    "LONG W: [{}]".format(", ".join(hex(x) for x in report))
                 )
-                if req.req_type == "LONG" or req.req_type == "VERY LONG":
-                    h_out_long.write(req_list)
-                else:
-                    # h_out_short.write(req_list)
-                    pass
-            time.sleep(sleep)
+            capture = self.capture
+            if capture is not None:
+                # recorded before the write to stay ahead of the response
+                capture.record(CAPTURE_OUT, report)
+            h_out_long.write(report)
 
         # h_out_short.close()
         h_out_long.close()
 
-    def __processNotif(self, req):
-        ts = datetime.now()
-        notif_id = req.function
-        f_idx = req.feature
-        key = str(f_idx) + ":" + str(notif_id)
-        if req.sw_id == 0 and notif_id <= 0x0F:  # is a notif
-            if key in self.registered_notif.keys():
-                # call the specific registered callback linked to this notif
-                self.registered_notif[key](req, ts)
-                return True
-        return False
-
     def __start_listener_thread(self, dev: DeviceInfo):
         h_in_short = None
         if dev.interface.has_short():  # no short endpoint for ble
-            h_in_short = hid.device()
+            h_in_short = hid_backend.device()
             h_in_short.open_path(dev.interface.short["path"])
-            h_in_short.set_nonblocking(1)
+            h_in_short.set_nonblocking(0)
 
-        h_in_long = hid.device()
+        h_in_long = hid_backend.device()
         h_in_long.open_path(dev.interface.long["path"])
-        h_in_long.set_nonblocking(1)
+        h_in_long.set_nonblocking(0)
 
         h_in_extra_long = None
         if dev.interface.has_xl():
-            h_in_extra_long = hid.device()
+            h_in_extra_long = hid_backend.device()
             h_in_extra_long.open_path(dev.interface.extra_long["path"])
-            h_in_extra_long.set_nonblocking(1)
+            h_in_extra_long.set_nonblocking(0)
 
         self.clear_input_queue()
         self.thread_in = Thread(
@@ -477,9 +736,9 @@ class ConnectedDevice:
         self.thread_in.start()
 
     def __start_commander_thread(self, dev):
-        h_out_long = hid.device()
+        h_out_long = hid_backend.device()
         h_out_long.open_path(dev.interface.long["path"])
-        h_out_long.set_nonblocking(1)
+        h_out_long.set_nonblocking(0)
 
         self.clear_output_queue()
         self.thread_out = Thread(
@@ -488,9 +747,9 @@ class ConnectedDevice:
         self.thread_out.start()
 
     def __start_communication_thread(self, dev):
-        h_out_long = hid.device()
+        h_out_long = hid_backend.device()
         h_out_long.open_path(dev.interface.endpoint_long["path"])
-        h_out_long.set_nonblocking(1)
+        h_out_long.set_nonblocking(0)
 
         self.clear_output_queue()
         self.thread_out = Thread(
@@ -503,28 +762,6 @@ class ConnectedDevice:
         )
         self.thread_in.start()
 
-    def __isTheResponse(self, req, res: HIDPPRequest):
-        """
-        check if res is the response of the request req
-        """
-        if req is None or res is None:
-            return False
-
-        # error handling
-        if res.feature == 0xFF:
-            rebuilt_feature = res.function << 4 | res.sw_id
-            if req.feature == rebuilt_feature:
-                return True
-
-        if (
-            req.feature == res.feature
-            and req.function == res.function
-            and req.sw_id == res.sw_id
-        ):
-            return True
-        else:
-            return False
-
     def __get_response_length(self):
         """routine to test with what report length the device is sending back
         default is hidpp long request, but could be hidpp very long as well"""
@@ -1,13 +1,30 @@
 from .logger import get_pyhidpp_logger
-from .discovery import get_interfaces_list, list_devices
+from . import hid_backend
+from .discovery import get_interfaces_list, interface_key, is_receiver, list_devices
 from .device_info import DeviceInfo
 from .connected_device import ConnectedDevice
+from .probe_session import device_type_key
+from .probe_session import get_devices_type as probe_devices_type
 
 import platform
 import logging
+from threading import Event, Lock, Thread
+from typing import Callable
 
 
 class DevicesManager:
+    """
+    discovery of the HIDPP devices
+
+    the manager is meant to be long lived: refresh() only re-enumerates the hid
+    endpoints, and discovers (ie probes the receivers of) the interfaces which
+    appeared since the last refresh. The DeviceInfo of the devices still present
+    are kept, with their enumerated features.
+
+    lazy: no discovery at construction, the devices are looked up on demand
+    (find_device, connect_with_name/pid), discovering only what is needed
+    """
+
     devices: list[DeviceInfo]
 
     def __init__(
@@ -18,67 +35,263 @@ class DevicesManager:
         log_to_file=True,
         log_to_console=False,
         display_devices=False,
+        lazy=False,
     ):
         self.system = platform.platform().split("-")[0]
+        self.vid = vid
+        self.dev_type = dev_type
 
         self.logger = get_pyhidpp_logger(log_level, log_to_file, log_to_console)
+
+        # called with the DeviceInfo of each device found/gone by refresh()
+        self.device_added_callback: Callable[[DeviceInfo], None] | None = None
+        self.device_removed_callback: Callable[[DeviceInfo], None] | None = None
+
+        self.interfaces_list = []
+        self.devices = []
+        self.__paths = None
+        self.__refreshed = False
+        self.__devices_by_interface: dict[tuple, list[DeviceInfo]] = {}
+        # probed device types (see get_devices_type) and the interface of each
+        # probed device: the types are dropped when their interface is unplugged
+        self.__device_types: dict[tuple, str | None] = {}
+        self.__device_type_interfaces: dict[tuple, tuple] = {}
+        self.__refresh_lock = Lock()
+        self.__hotplug_stop = Event()
+        self.__hotplug_thread = None
+
         # build endpoints and devices
-        self.interfaces_list = get_interfaces_list(vid)
-        self.devices = list_devices(self.interfaces_list)
-        self.print_discovered()
-        if dev_type is not None:
-            self.devices = self.get_devices_type(dev_type)
+        if not lazy:
+            self.refresh()
+            self.print_discovered()
         # self.devices = self.__sort_ble_devices(self.devices)
 
         # print discovered devices
         if display_devices:
             self.print_discovered()
 
+    def refresh(self):
+        """
+        update the devices list with the hid endpoints plugged/unplugged since the
+        last refresh: only the new interfaces are discovered
+        return the lists of (added, removed) devices
+        """
+        with self.__refresh_lock:
+            raw_devs = hid_backend.enumerate(vendor_id=self.vid)
+            paths = frozenset(d["path"] for d in raw_devs)
+            if paths == self.__paths:
+                return [], []
+            initial = not self.__refreshed
+            self.__paths = paths
+            self.__refreshed = True
+
+            interfaces = get_interfaces_list(self.vid, raw_devs=raw_devs)
+            known = self.__devices_by_interface
+            new_interfaces = [i for i in interfaces if interface_key(i) not in known]
+
+            discovered = {interface_key(i): [] for i in new_interfaces}
+            for dev in self.__discover(new_interfaces):
+                discovered[interface_key(dev.interface)].append(dev)
+            added, removed = self.__update_devices(interfaces, discovered)
+
+        self.__notify(added, removed, log_added=not initial)
+        return added, removed
+
+    def __discover(self, interfaces):
+        devices = list_devices(interfaces)
+        if self.dev_type is not None:
+            devices = self.get_devices_type(self.dev_type, devices)
+        return devices
+
+    def __update_devices(self, interfaces, discovered):
+        """
+        keep the devices of the interfaces still present, known or just discovered
+        (discovered: interface key -> devices), drop the others
+        return the lists of (added, removed) devices, refresh lock held
+        """
+        known = self.__devices_by_interface
+        devices_by_interface = {}
+        for interface in interfaces:
+            key = interface_key(interface)
+            if key in discovered:
+                devices_by_interface[key] = discovered[key]
+            elif key in known:
+                devices_by_interface[key] = known[key]
+        added = [dev for devices in discovered.values() for dev in devices]
+        removed = [
+            dev
+            for key, devices in known.items()
+            if key not in devices_by_interface
+            for dev in devices
+        ]
+
+        for type_key, key in list(self.__device_type_interfaces.items()):
+            if key not in devices_by_interface:
+                del self.__device_type_interfaces[type_key]
+                self.__device_types.pop(type_key, None)
+
+        self.interfaces_list = interfaces
+        self.__devices_by_interface = devices_by_interface
+        self.devices = [
+            dev for devices in devices_by_interface.values() for dev in devices
+        ]
+        return added, removed
+
+    def __notify(self, added, removed, log_added=True):
+        for dev in removed:
+            self.logger.info("Device removed: {}".format(dev.name))
+            if self.device_removed_callback is not None:
+                self.device_removed_callback(dev)
+        for dev in added:
+            if log_added:
+                self.logger.info("Device added: {}".format(dev.name))
+            if self.device_added_callback is not None:
+                self.device_added_callback(dev)
+
+    def find_device(self, name=None, pid=None, serial=None, predicate=None):
+        """
+        targeted lookup of the first device matching all the given criteria
+        (serial: serial number of a directly connected device, predicate: callable
+        taking a DeviceInfo)
+
+        discovery stops at the first match: direct interfaces are checked first
+        (no I/O needed), then the receivers already probed, and only then the new
+        receivers one by one. The devices found gone or discovered on the way are
+        reported like refresh() does. Return the DeviceInfo or None
+        """
+
+        def match(dev: DeviceInfo):
+            return (
+                (name is None or dev.name == name)
+                and (pid is None or dev.pid == pid)
+                and (
+                    serial is None
+                    or (
+                        dev.sub_idx == 0xFF
+                        and dev.interface.long.get("serial_number") == serial
+                    )
+                )
+                and (predicate is None or predicate(dev))
+            )
+
+        with self.__refresh_lock:
+            interfaces = get_interfaces_list(
+                self.vid, raw_devs=hid_backend.enumerate(vendor_id=self.vid)
+            )
+            known = self.__devices_by_interface
+            direct = [i for i in interfaces if not is_receiver(i)]
+            receivers = [i for i in interfaces if is_receiver(i)]
+            ordered = (
+                direct
+                + [i for i in receivers if interface_key(i) in known]
+                + [i for i in receivers if interface_key(i) not in known]
+            )
+
+            discovered = {}
+            found = None
+            for interface in ordered:
+                key = interface_key(interface)
+                devices = known.get(key)
+                if devices is None:
+                    devices = discovered[key] = self.__discover([interface])
+                found = next((dev for dev in devices if match(dev)), None)
+                if found is not None:
+                    break
+
+            added, removed = self.__update_devices(interfaces, discovered)
+            if added or removed:
+                # the receivers not probed yet are left to the next refresh
+                self.__paths = None
+
+        self.__notify(added, removed, log_added=self.__refreshed)
+        return found
+
+    def start_hotplug_monitor(self, period_s=1.0):
+        """
+        refresh the devices every period_s from a background thread, the
+        device_added_callback/device_removed_callback are called from this thread
+        """
+        self.stop_hotplug_monitor()
+        self.__hotplug_stop.clear()
+        self.__hotplug_thread = Thread(
+            target=self.__hotplug_monitor, args=(period_s,), daemon=True
+        )
+        self.__hotplug_thread.start()
+
+    def stop_hotplug_monitor(self):
+        if self.__hotplug_thread is not None:
+            self.__hotplug_stop.set()
+            self.__hotplug_thread.join()
+            self.__hotplug_thread = None
+
+    def __hotplug_monitor(self, period_s):
+        while not self.__hotplug_stop.wait(period_s):
+            try:
+                self.refresh()
+            except Exception as e:
+                self.logger.warning("Devices refresh failed: {}".format(e))
+
     def print_discovered(self):
         """pretty print the discovered device"""
         for dev in self.devices:
             self.logger.info(dev)
 
     def connect_with_name(self, dev_name: str):
-        for dev in self.devices:
-            if dev_name == dev.name:
-                return ConnectedDevice(dev)
+        dev = self.find_device(name=dev_name)
+        if dev is not None:
+            return ConnectedDevice(dev)
         self.logger.info("Device not found")
         return None
 
     def connect_with_pid(self, pid):
-        for dev in self.devices:
-            if dev.pid == pid:
-                return ConnectedDevice(dev)
+        dev = self.find_device(pid=pid)
+        if dev is not None:
+            return ConnectedDevice(dev)
         self.logger.info("Device not found")
         return False
 
     def connect_with_pid_tid(self, pid, tid):
-        for dev in self.devices:
-            if dev.pid == pid:
-                connected_dev = ConnectedDevice(dev)
-                if connected_dev.device_info.tid == tid:
-                    return connected_dev
-                connected_dev.disconnect()
+        connected = []
+
+        def has_tid(dev: DeviceInfo):
+            # the transport id is read from the device (x0003), kept in dev
+            connected_dev = ConnectedDevice(dev)
+            if dev.tid is None:
+                connected_dev.get_device_info(print_res=False)
+            if dev.tid == tid:
+                connected.append(connected_dev)
+                return True
+            connected_dev.disconnect()
+            return False
+
+        if self.find_device(pid=pid, predicate=has_tid) is not None:
+            return connected[0]
         self.logger.info("Device not found")
         return None
 
     def get_devices_list(self):
         return self.devices
 
-    def get_devices_type(self, type):
-        devices = []
-        for devInfo in self.devices:
-            if devInfo.dev_type is not None:
-                if devInfo.dev_type == type:
-                    devices.append(devInfo)
-            else:
-                dev = ConnectedDevice(devInfo)
-                dev_type = dev.features.x0005.get_device_type()
-                if dev_type == type:
-                    devices.append(devInfo)
-                dev.disconnect()
-        return devices
+    def get_devices_type(self, type, devices_list=None):
+        """
+        devices (of devices_list, all by default) of the given type, the devices
+        with an unknown type are probed all at once (see probe_session), once per
+        plugged device
+        """
+        devices = self.devices if devices_list is None else devices_list
+        unknown = [dev for dev in devices if dev.dev_type is None]
+        probed = {}
+        if unknown:
+            probed = probe_devices_type(unknown, cache=self.__device_types)
+            for dev in unknown:
+                self.__device_type_interfaces[device_type_key(dev)] = interface_key(
+                    dev.interface
+                )
+        return [
+            dev
+            for dev in devices
+            if (dev.dev_type if dev.dev_type is not None else probed.get(dev)) == type
+        ]
 
     def get_devices_list_str(self):
         devices_list = []
@@ -110,7 +110,7 @@ class DFUController:
 
                 else:
                     # most probably an error
-                    self.__dfu_error(line_nb, res.params, error_callback)
+                    self.__dfu_error(line_nb, list(res.params), error_callback)
                     return
 
             # self.logger.info("DFU Progress: {} %".format(int(100*line_nb/self.dfu_data.tot_line)))
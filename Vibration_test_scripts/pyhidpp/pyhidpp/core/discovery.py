@@ -1,7 +1,8 @@
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 import time
-import hid
 
+from . import hid_backend
 from .utils import (
     BLE_PRO_RECEIVER_PID,
     BOLT_DEVICE_TYPE,
@@ -17,6 +18,10 @@ from .request import HIDPPRequest
 legacy = 0xFF00
 modern = 0xFF43
 
+# receiver slots probing: shared deadline of all the slot queries, and read polling
+PROBE_TIMEOUT_S = 0.1
+PROBE_POLL_MS = 5
+
 
 @dataclass
 class Capabilities:
@@ -42,8 +47,13 @@ def get_capabilities(ord: int):
     )
 
 
-def get_interfaces_list(vid=0x46D, pid=0):
-    raw_devs = hid.enumerate(vendor_id=vid, product_id=pid)
+def get_interfaces_list(vid=0x46D, pid=0, raw_devs=None):
+    """
+    group the hid endpoints in HIDPP interfaces
+    raw_devs: result of hid enumerate, enumerated here if None
+    """
+    if raw_devs is None:
+        raw_devs = hid_backend.enumerate(vendor_id=vid, product_id=pid)
 
     vendor_devs = [
         d
@@ -129,135 +139,151 @@ def get_interfaces_list(vid=0x46D, pid=0):
     return interfaces
 
 
+def interface_key(interface: HIDPPInterface):
+    """
+    identify an interface by the paths of its endpoints
+    """
+    return tuple(
+        None if endpoint is None else endpoint["path"]
+        for endpoint in (interface.short, interface.long, interface.extra_long)
+    )
+
+
+def is_receiver(interface: HIDPPInterface):
+    return interface.long["product_id"] in BLE_PRO_RECEIVER_PID + UNIFYING_RECEIVER_PID
+
+
 def list_devices(interfaces_list: list[HIDPPInterface]) -> list[DeviceInfo]:
+    """
+    list the devices of the interfaces: the interfaces themselves, and the devices
+    paired to the receivers (their slots are probed, all the receivers at once)
+    """
+    receivers = [interface for interface in interfaces_list if is_receiver(interface)]
+    probes = {}
+    if receivers:
+        with ThreadPoolExecutor(max_workers=len(receivers)) as pool:
+            for interface in receivers:
+                probes[id(interface)] = pool.submit(probe_receiver, interface)
+
     devices = []
-    # get names
     for interface in interfaces_list:
-        # dealing with BLE interface
-
-        endpoint_short = interface.short
         endpoint_long = interface.long
-
         product_string = endpoint_long["product_string"].replace("_", " ")
         vid = endpoint_long["vendor_id"]
         pid = endpoint_long["product_id"]
 
         devices.append(DeviceInfo(vid, pid, interface, product_string, 0xFF))
+        if id(interface) in probes:
+            devices.extend(probes[id(interface)].result())
 
-        if pid in BLE_PRO_RECEIVER_PID:
-            h_long = hid.device()
-            h_long.open_path(endpoint_long["path"])
-            h_long.set_nonblocking(1)
-
-            h_short = hid.device()
-            h_short.open_path(endpoint_short["path"])
-            h_short.set_nonblocking(1)
-
-            for dev_id in range(1, 7):
-                h_short.write([0x10, 0xFF, 0x83, 0xB5, 0x50 + dev_id, 0, 0])
-                res = h_long.read(20, 100)
-                if len(res) > 0:
-                    dev_info = res[5]
-                    dev_type = dev_info & 0b1111
-                    link = dev_info >> 6 & 0b1
-                    ble_pid = res[7] << 8 | res[6]
-                    h_short.write([0x10, 0xFF, 0x83, 0xB5, 0x60 + dev_id, 1, 0])
-                    ret = h_long.read(20, 100)
-                    if len(ret) > 0:
-                        req = HIDPPRequest(from_list=ret)
-                        # params = ret[4:]
-                        name_length = req.params[2]
-                        name = "".join(
-                            [str(chr(x)) for x in req.params[3 : 3 + name_length]]
-                        )
-                        devices.append(
-                            DeviceInfo(
-                                vid,
-                                ble_pid,
-                                interface,
-                                name,
-                                dev_id,
-                                BOLT_DEVICE_TYPE[dev_type],
-                                link,
-                            )
-                        )
-            h_long.close()
-            h_short.close()
-        elif pid in UNIFYING_RECEIVER_PID:
-    
-            
-            h_short = hid.device()
-            h_short.open_path(endpoint_short["path"])
-            h_short.set_nonblocking(1)
-
-            h_long = hid.device()
-            h_long.open_path(endpoint_long["path"])
-            h_long.set_nonblocking(1)
-            
-            for dev_id in range(0, 6): 
-                # get name request / UFY
-                h_short.write([0x10, 0xFF, 0x83, 0xB5, 0x40 + dev_id, 0, 0])
-                time.sleep(0.002)
-                # read hidpp long (expected from unifying)
-                ret = h_long.read(20)
-                if len(ret) > 0:
-                    req = HIDPPRequest(from_list=ret)
-                    # params = ret[4:]
-                    name_length = req.params[1]
-                    name = "".join(
-                        [str(chr(x)) for x in req.params[2 : 2 + name_length]]
-                    )
-                    devices.append(DeviceInfo(vid, pid, interface, name, dev_id+1))
-                
-            """
-            # enable notifications on receiver
-            h_short.write([0x10, 0xFF, 0x80, 0x80, 0x00, 0x01, 0x00])
-            res = h_short.read(7, 100)
-            # read various registers (inspired by bazinga)
-            h_short.write([0x10, 0xFF, 0x81, 0x00, 0x00, 0x00, 0x00])
-            res = h_short.read(7, 100)
-            h_short.write([0x10, 0xFF, 0x80, 0x00, 0x00, 0x01, 0x00])
-            res = h_short.read(7, 100)
-            # get number of devices
-            h_short.write([0x10, 0xFF, 0x81, 0x02, 0x00, 0x00, 0x00])
-            res = h_short.read(7, 100)
-            n_devices = res[5]
-            # simulate sync attempt
-            h_short.write([0x10, 0xFF, 0x80, 0x02, 0x02, 0x00, 0x00])
-            res_41 = []
-            for i in range(n_devices):
-                i = 0
-                res = h_short.read(7, 100)
-                # flush any response present before the notifications
-                while i < 3 and res[2] != 0x41:
-                    res = h_short.read(7, 100)
-                    i += 1
-                if res[2] == 0x41:
-                    res_41.append(res)
-            for i in range(n_devices):
-                dev_info = res_41[i]
-                dev_id = dev_info[1]
-                dev_pid = dev_info[6] << 8 | dev_info[5]
-                dev_type = BOLT_DEVICE_TYPE[dev_info[4] & 0b1111]
-                link = dev_info[4] >> 6 & 0b1
-                h_short.write([0x10, 0xFF, 0x83, 0xB5, 0x40 + dev_id - 1, 0, 0])
-                # read hidpp long (expected from unifying)
-                ret = h_long.read(20, 100)
-                if len(ret) > 0:
-                    req = HIDPPRequest(from_list=ret)
-                    # params = ret[4:]
-                    name_length = req.params[1]
-                    name = "".join(
-                        [str(chr(x)) for x in req.params[2 : 2 + name_length]]
-                    )
-                    devices.append(
-                        DeviceInfo(
-                            vid, dev_pid, interface, name, dev_id, dev_type, link
-                        )
-                    )
-            """
+    return devices
+
+
+def probe_receiver(interface: HIDPPInterface) -> list[DeviceInfo]:
+    """
+    devices paired to the receiver of interface
+    """
+    h_short = hid_backend.device()
+    h_short.open_path(interface.short["path"])
+    h_short.set_nonblocking(1)
+
+    h_long = hid_backend.device()
+    h_long.open_path(interface.long["path"])
+    h_long.set_nonblocking(1)
+
+    try:
+        if interface.long["product_id"] in BLE_PRO_RECEIVER_PID:
+            return _probe_bolt_slots(interface, h_short, h_long)
+        return _probe_unifying_slots(interface, h_short, h_long)
+    finally:
+        h_short.close()
+        h_long.close()
+
+
+def read_receiver_registers(
+    h_short, h_long, sub_registers, params=(0, 0), timeout_s=PROBE_TIMEOUT_S
+):
+    """
+    read the long register 0xB5 of the receiver for all the sub_registers at once:
+    all the queries are written first, then the replies are matched by
+    sub-register within a single deadline (empty slots answer with an error, or
+    not at all).
+    return {sub_register: reply report}
+    """
+    for sub_register in sub_registers:
+        h_short.write([0x10, 0xFF, 0x83, 0xB5, sub_register, *params])
+
+    pending = set(sub_registers)
+    replies = {}
+    errors = 0
+    deadline = time.monotonic() + timeout_s
+    while len(pending) > errors:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        ret = h_long.read(20, max(1, min(PROBE_POLL_MS, int(remaining * 1000))))
+        if len(ret) > 4 and ret[2] == 0x83 and ret[3] == 0xB5 and ret[4] in pending:
+            pending.discard(ret[4])
+            replies[ret[4]] = ret
+        # hidpp 1.0 errors: [0x10, 0xFF, 0x8F, 0x83, 0xB5, err, 0], one per query
+        while True:
+            err = h_short.read(7)
+            if len(err) == 0:
+                break
+            if err[2] == 0x8F and err[3] == 0x83 and err[4] == 0xB5:
+                errors += 1
+    return replies
+
+
+def _probe_bolt_slots(interface, h_short, h_long):
+    vid = interface.long["vendor_id"]
+    slots = range(1, 7)
+
+    # pairing info, then names of the paired slots
+    pairing = read_receiver_registers(h_short, h_long, [0x50 + s for s in slots])
+    paired = [s for s in slots if 0x50 + s in pairing]
+    names = read_receiver_registers(
+        h_short, h_long, [0x60 + s for s in paired], params=(1, 0)
+    )
 
-            h_short.close()
-            h_long.close()
+    devices = []
+    for dev_id in paired:
+        res = pairing[0x50 + dev_id]
+        ret = names.get(0x60 + dev_id)
+        if ret is None:
+            continue
+        dev_info = res[5]
+        dev_type = dev_info & 0b1111
+        link = dev_info >> 6 & 0b1
+        ble_pid = res[7] << 8 | res[6]
+        req = HIDPPRequest.from_report(ret)
+        # params = ret[4:]
+        name_length = req.params[2]
+        name = "".join([str(chr(x)) for x in req.params[3 : 3 + name_length]])
+        devices.append(
+            DeviceInfo(
+                vid, ble_pid, interface, name, dev_id, BOLT_DEVICE_TYPE[dev_type], link
+            )
+        )
+    return devices
+
+
+def _probe_unifying_slots(interface, h_short, h_long):
+    vid = interface.long["vendor_id"]
+    pid = interface.long["product_id"]
+
+    # get name requests / UFY
+    names = read_receiver_registers(h_short, h_long, [0x40 + i for i in range(6)])
+
+    devices = []
+    for dev_id in range(6):
+        ret = names.get(0x40 + dev_id)
+        if ret is None:
+            continue
+        req = HIDPPRequest.from_report(ret)
+        # params = ret[4:]
+        name_length = req.params[1]
+        name = "".join([str(chr(x)) for x in req.params[2 : 2 + name_length]])
+        devices.append(DeviceInfo(vid, pid, interface, name, dev_id + 1))
 
     return devices
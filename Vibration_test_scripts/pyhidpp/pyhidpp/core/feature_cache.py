@@ -0,0 +1,114 @@
+"""
+HIDPP feature table cache
+
+the feature index table of a device only changes with its firmware: it is kept on
+disk (json), keyed by pid and the main firmware name, build and transport pid (see
+x0003.get_fw_info), so that known devices do not need to be enumerated again.
+
+default location: ~/.cache/pyhidpp/feature_tables.json, or the PYHIDPP_FEATURE_CACHE
+environment variable. Only used with hidapi devices, not with the simulator or
+replay backends
+"""
+
+import json
+import logging
+import os
+from threading import Lock
+
+from .feature_info import FeatureInfo
+from .fw_info import FirmwareInfo
+
+DEFAULT_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "pyhidpp", "feature_tables.json"
+)
+
+
+def cache_key(pid, fw_info: FirmwareInfo):
+    return "{:04X}:{}:{}:{:04X}".format(
+        pid, fw_info.fw_name, fw_info.build, fw_info.trPid
+    )
+
+
+class FeatureCache:
+    """
+    on-disk feature tables, loaded once and rewritten on each store
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get("PYHIDPP_FEATURE_CACHE") or DEFAULT_PATH
+        self.logger = logging.getLogger("hidpp")
+        self._lock = Lock()
+        self._tables: dict[str, list] | None = None
+
+    def __tables(self):
+        if self._tables is None:
+            try:
+                with open(self.path) as f:
+                    self._tables = json.load(f)
+            except FileNotFoundError:
+                self._tables = {}
+            except (OSError, ValueError) as e:
+                self.logger.warning(
+                    "Ignoring feature cache {}: {}".format(self.path, e)
+                )
+                self._tables = {}
+        return self._tables
+
+    def has_pid(self, pid) -> bool:
+        prefix = "{:04X}:".format(pid)
+        with self._lock:
+            return any(key.startswith(prefix) for key in self.__tables())
+
+    def load(self, key) -> list[FeatureInfo] | None:
+        with self._lock:
+            table = self.__tables().get(key)
+        if table is None:
+            return None
+        return [FeatureInfo(*entry) for entry in table]
+
+    def store(self, key, features: list[FeatureInfo]):
+        """
+        features: complete feature table of the firmware. The root feature (id 0,
+        always at index 0) is not stored
+        """
+        table = [
+            [f.id, f.idx, f.obsolete, f.eng, f.version]
+            for f in sorted(features, key=lambda f: f.idx)
+            if f.id != 0
+        ]
+        with self._lock:
+            tables = self.__tables()
+            if tables.get(key) == table:
+                return
+            tables[key] = table
+            self.__save()
+
+    def remove(self, key):
+        """
+        forget a stale table
+        """
+        with self._lock:
+            if self.__tables().pop(key, None) is not None:
+                self.__save()
+
+    def __save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._tables, f, indent=1)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self.logger.warning(
+                "Could not write feature cache {}: {}".format(self.path, e)
+            )
+
+
+_default_cache: FeatureCache | None = None
+
+
+def default_feature_cache() -> FeatureCache:
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = FeatureCache()
+    return _default_cache
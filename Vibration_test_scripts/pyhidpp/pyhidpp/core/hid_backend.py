@@ -0,0 +1,36 @@
+"""
+HID backend
+
+the discovery and the connected devices reach the hid devices through this module:
+hidapi by default, or any module-like object providing the same enumerate() and
+device() API (ie pyhidpp.simulator.VirtualHid)
+"""
+
+import hid
+
+_backend = hid
+
+
+def set_backend(backend=None):
+    """
+    select the hid backend used from now on, None restores hidapi
+    to be called before the discovery, opened devices keep their backend
+    """
+    global _backend
+    _backend = hid if backend is None else backend
+
+
+def get_backend():
+    return _backend
+
+
+def is_hidapi():
+    return _backend is hid
+
+
+def enumerate(vendor_id=0, product_id=0):
+    return _backend.enumerate(vendor_id=vendor_id, product_id=product_id)
+
+
+def device():
+    return _backend.device()
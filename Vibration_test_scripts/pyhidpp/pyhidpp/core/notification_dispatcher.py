@@ -0,0 +1,138 @@
+"""
+HIDPP notification dispatcher
+
+calls the callbacks registered per (feature idx, notif id) for the incoming
+notifications. The listener thread only looks the handler up and queues the call:
+the callbacks run in worker thread(s), a slow callback can not delay the responses.
+"""
+
+import logging
+import queue
+import time
+from datetime import datetime
+from threading import Lock, Thread
+from typing import Callable
+
+from .request import HIDPPRequest
+
+# notifications waiting for a worker, newer ones are dropped when full
+DISPATCH_QUEUE_SIZE = 4096
+
+# handler table index: feature idx << 4 | notif id
+_TABLE_SIZE = 256 << 4
+
+
+class NotificationDispatcher:
+    """
+    handler table of the registered notifications, indexed by
+    feature idx << 4 | notif id.
+
+    dispatch() is called by the listener with every unrouted report, callbacks are
+    called as callback(req, timestamp), timestamp: datetime.now() at reception.
+    req.received_s is set from clock (time.monotonic, in s) at reception as well,
+    for the callbacks needing a monotonic time base.
+    workers=0 calls them inline, from the dispatching thread.
+
+    counters: dispatched, dropped (queue full), max_queue_depth
+    """
+
+    def __init__(
+        self,
+        workers=1,
+        queue_size=DISPATCH_QUEUE_SIZE,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.workers = workers
+        self.clock = clock
+        self.logger = logging.getLogger("hidpp")
+
+        self.dispatched = 0
+        self.dropped = 0
+        self.max_queue_depth = 0
+
+        self._handlers: list[Callable | None] = [None] * _TABLE_SIZE
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._threads: list[Thread] = []
+        self._lock = Lock()
+
+    def register(self, f_idx, notif_id, callback: Callable):
+        self._handlers[f_idx << 4 | notif_id] = callback
+        if self.workers:
+            self.__start_workers()
+
+    def unregister(self, f_idx, notif_id):
+        self._handlers[f_idx << 4 | notif_id] = None
+
+    def clear(self):
+        self._handlers = [None] * _TABLE_SIZE
+
+    def dispatch(self, req: HIDPPRequest):
+        """
+        hand req over to its registered callback, return False if req is not a
+        registered notification
+        """
+        if req.sw_id != 0:
+            return False
+        callback = self._handlers[req.feature << 4 | req.function]
+        if callback is None:
+            return False
+
+        req.received_s = self.clock()
+        if not self.workers:
+            self.dispatched += 1
+            self.__call(callback, req, datetime.now())
+            return True
+
+        try:
+            self._queue.put_nowait((callback, req, datetime.now()))
+        except queue.Full:
+            self.dropped += 1
+            return True
+        self.dispatched += 1
+        depth = self._queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+        return True
+
+    def stats(self):
+        return {
+            "dispatched": self.dispatched,
+            "dropped": self.dropped,
+            "max_queue_depth": self.max_queue_depth,
+            "queue_depth": self._queue.qsize(),
+        }
+
+    def stop(self):
+        """
+        call the queued notifications and stop the workers
+        """
+        with self._lock:
+            threads = self._threads
+            self._threads = []
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join()
+
+    def __start_workers(self):
+        with self._lock:
+            if self._threads:
+                return
+            self._threads = [
+                Thread(target=self.__worker, daemon=True) for _ in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def __worker(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            self.__call(*item)
+
+    def __call(self, callback, req, timestamp):
+        try:
+            callback(req, timestamp)
+        except Exception:
+            self.logger.exception("Notification callback {} failed".format(callback))
@@ -0,0 +1,179 @@
+"""
+HIDPP probe session
+
+short request/response exchanges with several devices at once, without the
+listener/commander threads of a ConnectedDevice: each round writes one request to
+every device, then collects the replies, so a round costs one round trip whatever
+the number of devices.
+"""
+
+import time
+
+from . import hid_backend
+from .device_info import DeviceInfo
+from .feature_info import FeatureInfo
+from .request import HIDPPRequest, REPORT_LENGTHS, REPORT_IDS
+from .utils import DEVICE_TYPE, list_to_u32_le
+
+PROBE_SW_ID = 0x0E
+PROBE_TIMEOUT_S = 0.5
+PROBE_POLL_MS = 5
+
+
+class ProbeSession:
+    """
+    usage:
+        with ProbeSession(devices) as session:
+            responses = session.round({dev: request, ...})
+
+    the long endpoint of each interface is opened once, shared by the devices
+    behind the same receiver (replies matched on dev_idx)
+    """
+
+    def __init__(self, devices: list[DeviceInfo], timeout_s=PROBE_TIMEOUT_S):
+        self.devices = devices
+        self.timeout_s = timeout_s
+        self._handles = {}
+
+    def open(self):
+        for dev in self.devices:
+            path = dev.interface.long["path"]
+            if path not in self._handles:
+                handle = hid_backend.device()
+                handle.open_path(path)
+                handle.set_nonblocking(1)
+                self._handles[path] = handle
+        return self
+
+    def close(self):
+        for handle in self._handles.values():
+            handle.close()
+        self._handles = {}
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def round(
+        self, requests: dict[DeviceInfo, HIDPPRequest]
+    ) -> dict[DeviceInfo, HIDPPRequest | None]:
+        """
+        send all the requests, then wait for their responses (or error reports)
+        within one shared deadline. None for the devices without response
+        """
+        waiting = {}  # (path, dev_idx) -> device
+        for dev, req in requests.items():
+            path = dev.interface.long["path"]
+            req.sw_id = PROBE_SW_ID
+            report = req.write_into(bytearray(REPORT_LENGTHS[REPORT_IDS["LONG"]]))
+            self._handles[path].write(report)
+            waiting[(path, req.dev_idx)] = dev
+
+        responses = dict.fromkeys(requests)
+        deadline = time.monotonic() + self.timeout_s
+        while waiting:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            got_reply = False
+            for path, handle in self._handles.items():
+                ret = handle.read(64)
+                if len(ret) == 0:
+                    continue
+                got_reply = True
+                res = HIDPPRequest.from_report(ret)
+                dev = waiting.get((path, res.dev_idx))
+                if dev is not None and self.__is_response(requests[dev], res):
+                    responses[dev] = res
+                    del waiting[(path, res.dev_idx)]
+            if not got_reply:
+                time.sleep(min(PROBE_POLL_MS / 1000, remaining))
+        return responses
+
+    @staticmethod
+    def __is_response(req: HIDPPRequest, res: HIDPPRequest):
+        if res.feature == 0xFF:
+            # error: [0xFF, feature idx, function | sw_id, error code]
+            return (
+                res.function << 4 | res.sw_id == req.feature
+                and res.params[0] == req.function << 4 | req.sw_id
+            )
+        return (
+            res.feature == req.feature
+            and res.function == req.function
+            and res.sw_id == req.sw_id
+        )
+
+
+def device_type_key(dev: DeviceInfo):
+    return (dev.pid, dev.sub_idx, dev.interface.long.get("serial_number"))
+
+
+def get_devices_type(
+    devices: list[DeviceInfo],
+    timeout_s=PROBE_TIMEOUT_S,
+    cache: dict[tuple, str | None] = None,
+):
+    """
+    device type (x0005, see DEVICE_TYPE) of all the devices, probed concurrently
+    in a ProbeSession: two rounds (x0000 lookup of x0005 when not enumerated yet,
+    then getDeviceType).
+    cache: types already probed, keyed by device_type_key, updated with the new
+    results (owned by the caller, see DevicesManager)
+    return {device: type or None}
+    """
+    if cache is None:
+        cache = {}
+    types = {}
+    to_probe = []
+    for dev in devices:
+        key = device_type_key(dev)
+        if key in cache:
+            types[dev] = cache[key]
+        else:
+            to_probe.append(dev)
+    if not to_probe:
+        return types
+
+    with ProbeSession(to_probe, timeout_s) as session:
+        # x0005 feature index
+        lookups = {
+            dev: HIDPPRequest(dev.sub_idx, 0x00, 0, params=[0x00, 0x05, 0x00])
+            for dev in to_probe
+            if not dev.is_enumerated(0x0005)
+        }
+        feature_idx = {
+            dev: dev.features[0x0005].idx
+            for dev in to_probe
+            if dev.is_enumerated(0x0005)
+        }
+        for dev, res in session.round(lookups).items():
+            if res is not None and res.feature != 0xFF and res.params[0] != 0:
+                feature_idx[dev] = res.params[0]
+                dev.add_feature(
+                    FeatureInfo(
+                        0x0005,
+                        res.params[0],
+                        bool((res.params[1] >> 7) & 0x01),
+                        bool((res.params[1] >> 5) & 0x01),
+                        res.params[2],
+                    )
+                )
+
+        # getDeviceType
+        requests = {
+            dev: HIDPPRequest(dev.sub_idx, idx, 2) for dev, idx in feature_idx.items()
+        }
+        responses = session.round(requests)
+
+    for dev in to_probe:
+        res = responses.get(dev)
+        if res is None or res.feature == 0xFF:
+            types[dev] = None  # not cached, could be asleep
+            continue
+        dev_type = DEVICE_TYPE.get(list_to_u32_le(res.params[:4]))
+        cache[device_type_key(dev)] = dev_type
+        types[dev] = dev_type
+    return types
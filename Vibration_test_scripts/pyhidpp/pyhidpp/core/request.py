@@ -3,9 +3,54 @@ HIDPP request class
 """
 
 import logging
+from operator import itemgetter
 
+HEADER_LENGTH = 4
+REPORT_IDS = {"SHORT": 0x10, "LONG": 0x11, "VERY LONG": 0x12}
+REPORT_TYPES = {report_id: req_type for req_type, report_id in REPORT_IDS.items()}
+REPORT_LENGTHS = {0x10: 7, 0x11: 20, 0x12: 64}
+# params of a very long report
+MAX_PARAMS_LENGTH = REPORT_LENGTHS[REPORT_IDS["VERY LONG"]] - HEADER_LENGTH
+
+# zero padding by length, preallocated so that padding a report allocates nothing
+_PADDING = [bytes(length) for length in range(max(REPORT_LENGTHS.values()) + 1)]
+
+logger = logging.getLogger("hidpp")
+
+
+def request_type(params_length):
+    """
+    shortest report type carrying params_length params
+    raise ValueError above MAX_PARAMS_LENGTH
+    """
+    if params_length > MAX_PARAMS_LENGTH:
+        raise ValueError(
+            "{} params do not fit in a report (max {})".format(
+                params_length, MAX_PARAMS_LENGTH
+            )
+        )
+    if params_length > REPORT_LENGTHS[REPORT_IDS["LONG"]] - HEADER_LENGTH:
+        return "VERY LONG"
+    if params_length > REPORT_LENGTHS[REPORT_IDS["SHORT"]] - HEADER_LENGTH:
+        return "LONG"
+    return "SHORT"
+
+
+class HIDPPRequest(bytearray):
+    """
+    HIDPP report (request, response or notification) stored as its raw bytes:
+    [report id, dev_idx, feature, function << 4 | sw_id, params...]
+
+    header fields are decoded on access and params is a memoryview on the report,
+    so parsing a received report is a single copy of the hid.read result and the
+    payload is never sliced
+
+    received_s: time.monotonic() at reception of a dispatched notification (see
+    NotificationDispatcher), None otherwise
+    """
+
+    __slots__ = ("_params", "received_s")
 
-class HIDPPRequest:
     def __init__(
             self,
             dev_idx=0xFF,
@@ -19,82 +64,143 @@ class HIDPPRequest:
         """
         HIDPP_request constructor used to construct the hidpp request.
         construction can be done from a list (ex: from_list=[0x10 0x01 ... ])
-        or can be done the different parameters (dev_idx, feature, function, sw_id, 
+        or can be done the different parameters (dev_idx, feature, function, sw_id,
         params, req_type)
         """
-        self.logger = logging.getLogger("hidpp")
+        self._params = None
+        self.received_s = None
         if from_list is not None:
-            if from_list[0] == 0x10:
-                # auto append '0' if needed
-                from_list.extend([0] * (7 - len(from_list)))
-                self.req_type = "SHORT"
-                self.length = 7
-
-            elif from_list[0] == 0x11:
-                # auto append '0' if needed
-                from_list.extend([0] * (20 - len(from_list)))
-                self.req_type = "LONG"
-                self.length = 20
-
-            elif from_list[0] == 0x12:
-                # auto append '0' if needed
-                from_list.extend([0] * (64 - len(from_list)))
-                self.req_type = "VERY LONG"
-                self.length = 64
-
-            else:
-                self.logger.warning("ERROR: BAD REQUEST LIST FORMATTING")
-
-            self.dev_idx = from_list[1]
-            self.feature = from_list[2]
-            self.function = from_list[3] >> 4
-            self.sw_id = from_list[3] & 0x0F
-            self.params = from_list[4:]
+            bytearray.__init__(self, from_list)
+            self.__pad()
+            return
 
-        else:
-            self.req_type = req_type
-            if req_type == "VERY LONG":
-                self.length = 64
-            elif req_type == "LONG":
-                self.length = 20
-            elif req_type == "SHORT":
-                self.length = 7
-            else:
-                self.logger.warning("ERROR: BAD REQUEST TYPE")
-
-            self.dev_idx = dev_idx
-            self.feature = feature
-            self.function = function
-            self.sw_id = sw_id
-            self.params = params
-            while len(self.params) < self.length - 4:
-                self.params.append(0)
+        report_id = REPORT_IDS.get(req_type)
+        if report_id is None:
+            logger.warning("ERROR: BAD REQUEST TYPE")
+            report_id = REPORT_IDS["LONG"]
+
+        header = (report_id, dev_idx, feature, function << 4 | sw_id)
+        bytearray.__init__(self, header + tuple(params) if params else header)
+        self.__pad()
+
+    @classmethod
+    def from_report(cls, report):
+        """
+        parse a report read from the device (hid.read list or hidraw bytes)
+        """
+        req = bytearray.__new__(cls)
+        bytearray.__init__(req, report)
+        req._params = None
+        req.received_s = None
+        if len(req) < REPORT_LENGTHS.get(req[0], 0):
+            req.__pad()
+        return req
+
+    def __pad(self):
+        # auto append '0' if needed
+        length = REPORT_LENGTHS.get(self[0])
+        if length is None:
+            logger.warning("ERROR: BAD REQUEST LIST FORMATTING")
+        elif len(self) < length:
+            self.extend(_PADDING[length - len(self)])
+
+    def __release_params(self):
+        # the buffer can not be resized while exported
+        if self._params is not None:
+            self._params.release()
+            self._params = None
+
+    """ HEADER ACCESSORS
+    """
+
+    report_id = property(itemgetter(0))
+    dev_idx = property(itemgetter(1), lambda self, value: self.__setitem__(1, value))
+    feature = property(itemgetter(2), lambda self, value: self.__setitem__(2, value))
+
+    @property
+    def function(self):
+        return self[3] >> 4
+
+    @function.setter
+    def function(self, function):
+        self[3] = function << 4 | self[3] & 0x0F
+
+    @property
+    def sw_id(self):
+        return self[3] & 0x0F
+
+    @sw_id.setter
+    def sw_id(self, sw_id):
+        self[3] = self[3] & 0xF0 | sw_id
+
+    @property
+    def req_type(self):
+        return REPORT_TYPES.get(self[0])
+
+    @req_type.setter
+    def req_type(self, req_type):
+        self.__release_params()
+        self[0] = REPORT_IDS[req_type]
+        del self[REPORT_LENGTHS[self[0]]:]
+        self.__pad()
+
+    @property
+    def length(self):
+        return REPORT_LENGTHS.get(self[0], len(self))
+
+    @property
+    def params(self):
+        """
+        payload of the report, as a view on the report: released when req_type or
+        params is set. Keep a copy (bytes() / list()), never return it from an API
+        """
+        params = self._params
+        if params is None:
+            params = self._params = memoryview(self)[HEADER_LENGTH:]
+        return params
+
+    @params.setter
+    def params(self, params):
+        self.__release_params()
+        self[HEADER_LENGTH:] = params
+        self.__pad()
+
+    """ SERIALISATION
+    """
 
     def build_request(self):
         """
         return the request in the form a of list ex: [0x10 0x01 ... ]
         """
-        req = [0x00] * self.length
-        if self.req_type == "VERY LONG":
-            req[0] = 0x12
-        elif self.req_type == "LONG":
-            req[0] = 0x11
-        elif self.req_type == "SHORT":
-            req[0] = 0x10
-        else:
-            self.logger.warning("ERROR: BAD REQUEST TYPE")
+        return list(self)
 
-        req[1] = self.dev_idx
-        req[2] = self.feature
-        req[3] = self.function << 4 | self.sw_id
-        req[4:] = self.params
-
-        return req
+    def write_into(self, out: bytearray, report_id=None) -> memoryview:
+        """
+        serialise the request into the preallocated out buffer (at least 64 bytes),
+        optionally as another report type (ie short request sent as a long one)
+        return the view on out holding the report to write
+        """
+        if report_id is None:
+            report_id = self[0]
+        length = REPORT_LENGTHS[report_id]
+        used = len(self)
+        if used <= length:
+            out[:used] = self
+            out[used:length] = _PADDING[length - used]
+        else:
+            out[:length] = memoryview(self)[:length]
+        out[0] = report_id
+        return memoryview(out)[:length]
 
     def print_request_props(self):
-        self.logger.info(
+        logger.info(
             "Dev idx : {}; Feature : {}; Fonction: {}; SW id : {}.".format(
                 self.dev_idx, self.feature, self.function, self.sw_id
             )
         )
-        self.logger.info("Params : {}.".format(self.params))
+        logger.info("Params : {}.".format(list(self.params)))
+
+    def __repr__(self):
+        return "HIDPPRequest([{}])".format(", ".join(hex(x) for x in self))
+
+    __str__ = __repr__
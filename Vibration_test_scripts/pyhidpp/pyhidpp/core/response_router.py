@@ -0,0 +1,171 @@
+"""
+HIDPP response router
+
+route incoming responses to the request waiting for them
+"""
+
+import time
+from collections import deque
+from concurrent.futures import Future
+from threading import Lock
+
+from .request import HIDPPRequest
+
+# how long the late response of a timed out request is waited for and dropped
+LATE_RESPONSE_S = 2
+
+
+class ResponseRouter:
+    """
+    routing table of the requests waiting for a response, keyed by
+    (dev_idx, feature idx, function, sw_id).
+
+    each request registers a Future, resolved by the listener thread as soon as the
+    matching response (or error report) is received. requests sharing the same key
+    are served in FIFO order, the device answering them in sequence.
+
+    the key of a timed out request is kept as lost for LATE_RESPONSE_S: its late
+    response is dropped while no other request uses the key. Requests should be
+    tagged not to reuse a lost key (see is_waiting), registering one on it anyway
+    forgets the lost request
+    """
+
+    def __init__(self, future_factory=Future):
+        # asyncio users pass loop.create_future, futures are then resolved from the
+        # event loop thread
+        self._future_factory = future_factory
+        self._lock = Lock()
+        self._pending: dict[tuple, deque[Future]] = {}
+        # key -> deadlines of the responses still expected for timed out requests
+        self._lost: dict[tuple, deque[float]] = {}
+        self.late_responses = 0  # dropped, see LATE_RESPONSE_S
+
+    @staticmethod
+    def request_key(req: HIDPPRequest):
+        return (req.dev_idx, req.feature, req.function, req.sw_id)
+
+    @staticmethod
+    def response_key(res: HIDPPRequest):
+        """
+        key of the request res is answering, see request_key
+        """
+        if res.feature == 0xFF:
+            # error: [0xFF, feature idx, function | sw_id, error code]
+            return (
+                res.dev_idx,
+                res.function << 4 | res.sw_id,
+                res.params[0] >> 4,
+                res.params[0] & 0x0F,
+            )
+        return (res.dev_idx, res.feature, res.function, res.sw_id)
+
+    def register(self, req: HIDPPRequest) -> Future:
+        """
+        register req as waiting for a response, to be called before sending it
+        """
+        future = self._future_factory()
+        key = self.request_key(req)
+        with self._lock:
+            self._lost.pop(key, None)
+            self._pending.setdefault(key, deque()).append(future)
+        return future
+
+    def unregister(self, req: HIDPPRequest, future: Future, lost=False):
+        """
+        give up waiting for the response of req. lost: req timed out, its response
+        may still come, see LATE_RESPONSE_S
+        """
+        key = self.request_key(req)
+        with self._lock:
+            if lost:
+                self._lost.setdefault(key, deque()).append(
+                    time.monotonic() + LATE_RESPONSE_S
+                )
+            waiting = self._pending.get(key)
+            if waiting is None:
+                return
+            try:
+                waiting.remove(future)
+            except ValueError:
+                pass
+            if not waiting:
+                del self._pending[key]
+
+    def is_waiting(self, req: HIDPPRequest) -> bool:
+        """
+        True if a request with the same key as req is waiting for its response,
+        or timed out less than LATE_RESPONSE_S ago
+        """
+        key = self.request_key(req)
+        with self._lock:
+            return key in self._pending or self.__is_lost(key)
+
+    def is_pending(self, req: HIDPPRequest) -> bool:
+        """
+        True if a request with the same key as req is waiting for its response
+        (lost requests excluded)
+        """
+        with self._lock:
+            return self.request_key(req) in self._pending
+
+    def __is_lost(self, key):
+        # to be called with the lock held
+        deadlines = self._lost.get(key)
+        if deadlines is None:
+            return False
+        now = time.monotonic()
+        while deadlines and deadlines[0] <= now:
+            deadlines.popleft()
+        if not deadlines:
+            del self._lost[key]
+            return False
+        return True
+
+    def dispatch(self, res: HIDPPRequest) -> bool:
+        """
+        resolve the future waiting for res
+        return False if no request is waiting for it (ie notification)
+        """
+        if res.sw_id == 0 and res.feature != 0xFF:
+            return False  # notification
+
+        key = self.response_key(res)
+        with self._lock:
+            waiting = self._pending.get(key)
+            if waiting is None:
+                if self.__is_lost(key):
+                    # late response of a timed out request
+                    self._lost[key].popleft()
+                    if not self._lost[key]:
+                        del self._lost[key]
+                    self.late_responses += 1
+                    return True
+                return False
+            future = waiting.popleft()
+            if not waiting:
+                del self._pending[key]
+        if not future.done():  # could have been cancelled meanwhile
+            future.set_result(res)
+        return True
+
+    def cancel_all(self):
+        """
+        cancel all the pending requests (ie on disconnection)
+        """
+        with self._lock:
+            pending = self._pending
+            self._pending = {}
+            self._lost = {}
+        for waiting in pending.values():
+            for future in waiting:
+                future.cancel()
+
+    def has_pending(self) -> bool:
+        """
+        True if any request is waiting for its response (lock free, indicative)
+        """
+        return bool(self._pending)
+
+    def pending_count(self):
+        with self._lock:
+            return sum(len(waiting) for waiting in self._pending.values())
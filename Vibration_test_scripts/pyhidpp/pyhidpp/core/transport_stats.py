@@ -0,0 +1,201 @@
+"""
+HIDPP transport statistics
+
+round trip time histograms per (feature, function) and transport event counters,
+always on: recording a request is a couple of integer operations under a lock.
+
+histograms are HDR-style (log-linear): 16 linear sub-buckets per power of two of
+microseconds, ie a relative precision of ~6% from 1us to minutes, in a fixed
+table of counters.
+"""
+
+import logging
+from threading import Event, Lock, Thread
+
+SUB_BUCKET_BITS = 4
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+# covers up to 2**27us (~2 min), longer round trips fall in the last bucket
+HISTOGRAM_BUCKETS = 24 * SUB_BUCKETS
+
+# table index: feature idx << 4 | function (see NotificationDispatcher)
+_TABLE_SIZE = 256 << 4
+
+
+def bucket_index(value_us: int) -> int:
+    exp = max(value_us.bit_length() - SUB_BUCKET_BITS - 1, 0)
+    return min((exp << SUB_BUCKET_BITS) + (value_us >> exp), HISTOGRAM_BUCKETS - 1)
+
+
+def bucket_value(index: int) -> int:
+    """
+    lowest value (us) of the bucket index
+    """
+    exp = max((index >> SUB_BUCKET_BITS) - 1, 0)
+    return (index - (exp << SUB_BUCKET_BITS)) << exp
+
+
+class LatencyHistogram:
+    """
+    HDR-style histogram of durations
+    """
+
+    __slots__ = ("counts", "count", "total_us", "min_us", "max_us", "timeouts")
+
+    def __init__(self):
+        self.counts = [0] * HISTOGRAM_BUCKETS
+        self.count = 0
+        self.total_us = 0
+        self.min_us = None
+        self.max_us = 0
+        self.timeouts = 0
+
+    def record(self, duration_s: float):
+        value = int(duration_s * 1e6)
+        self.counts[bucket_index(value)] += 1
+        self.count += 1
+        self.total_us += value
+        if self.min_us is None or value < self.min_us:
+            self.min_us = value
+        if value > self.max_us:
+            self.max_us = value
+
+    def percentile(self, q: float) -> int:
+        """
+        value (us) below which q percent of the recorded durations are, within the
+        bucket precision
+        """
+        if self.count == 0:
+            return 0
+        threshold = self.count * q / 100
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= threshold:
+                return min(max(bucket_value(index), self.min_us), self.max_us)
+        return self.max_us
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "timeouts": self.timeouts,
+            "mean_ms": self.total_us / self.count / 1000 if self.count else 0.0,
+            "min_ms": (self.min_us or 0) / 1000,
+            "p50_ms": self.percentile(50) / 1000,
+            "p90_ms": self.percentile(90) / 1000,
+            "p99_ms": self.percentile(99) / 1000,
+            "max_ms": self.max_us / 1000,
+        }
+
+
+class TransportStats:
+    """
+    transport instrumentation of a ConnectedDevice:
+        - round trip time histogram and timeouts per (feature idx, function)
+        - unmatched: responses no request was waiting for (late, after a timeout)
+        - retagged: sw_ids skipped as still used by a lost request
+        - interleaved_notifs: notifications received while requests are in flight
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger("hidpp")
+        self._lock = Lock()
+        self.reset()
+        self._dump_stop = Event()
+        self._dump_thread = None
+
+    def reset(self):
+        with self._lock:
+            self._histograms: list[LatencyHistogram | None] = [None] * _TABLE_SIZE
+            self.unmatched = 0
+            self.retagged = 0
+            self.interleaved_notifs = 0
+
+    def __histogram(self, f_idx, function) -> LatencyHistogram:
+        index = f_idx << 4 | function
+        histogram = self._histograms[index]
+        if histogram is None:
+            histogram = self._histograms[index] = LatencyHistogram()
+        return histogram
+
+    def record_rtt(self, f_idx, function, duration_s):
+        with self._lock:
+            self.__histogram(f_idx, function).record(duration_s)
+
+    def record_timeout(self, f_idx, function):
+        with self._lock:
+            self.__histogram(f_idx, function).timeouts += 1
+
+    def snapshot(self, feature_ids: dict[int, int] = None):
+        """
+        return the statistics as a dict, functions keyed by "0x<feature id>/<fct>"
+        feature_ids: feature idx -> feature id (feature idx shown otherwise)
+        """
+        feature_ids = feature_ids or {}
+        functions = {}
+        with self._lock:
+            for index, histogram in enumerate(self._histograms):
+                if histogram is None:
+                    continue
+                f_idx, function = index >> 4, index & 0x0F
+                if f_idx in feature_ids:
+                    key = "0x{:04X}/{}".format(feature_ids[f_idx], function)
+                else:
+                    key = "idx{}/{}".format(f_idx, function)
+                functions[key] = histogram.snapshot()
+            return {
+                "functions": functions,
+                "unmatched": self.unmatched,
+                "retagged": self.retagged,
+                "interleaved_notifs": self.interleaved_notifs,
+            }
+
+    def summary(self, feature_ids: dict[int, int] = None) -> str:
+        snapshot = self.snapshot(feature_ids)
+        lines = [
+            "{:<12} {:>7} {:>5} {:>8} {:>8} {:>8} {:>8}".format(
+                "function", "count", "t/o", "p50 ms", "p90 ms", "p99 ms", "max ms"
+            )
+        ]
+        for key, h in sorted(snapshot["functions"].items()):
+            lines.append(
+                "{:<12} {:>7} {:>5} {:>8.2f} {:>8.2f} {:>8.2f} {:>8.2f}".format(
+                    key,
+                    h["count"],
+                    h["timeouts"],
+                    h["p50_ms"],
+                    h["p90_ms"],
+                    h["p99_ms"],
+                    h["max_ms"],
+                )
+            )
+        lines.append(
+            "unmatched: {}, retagged: {}, interleaved notifs: {}".format(
+                snapshot["unmatched"],
+                snapshot["retagged"],
+                snapshot["interleaved_notifs"],
+            )
+        )
+        return "\n".join(lines)
+
+    def start_periodic_dump(self, period_s=60, feature_ids=None):
+        """
+        log the summary every period_s (INFO), until stop_periodic_dump
+        feature_ids: callable returning the feature idx -> feature id mapping
+        """
+        self.stop_periodic_dump()
+        self._dump_stop.clear()
+        self._dump_thread = Thread(
+            target=self.__dump, args=(period_s, feature_ids), daemon=True
+        )
+        self._dump_thread.start()
+
+    def stop_periodic_dump(self):
+        if self._dump_thread is not None:
+            self._dump_stop.set()
+            self._dump_thread.join()
+            self._dump_thread = None
+
+    def __dump(self, period_s, feature_ids):
+        while not self._dump_stop.wait(period_s):
+            ids = feature_ids() if feature_ids is not None else None
+            self.logger.info("Transport statistics:\n" + self.summary(ids))
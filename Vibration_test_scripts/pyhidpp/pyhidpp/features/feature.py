@@ -2,7 +2,14 @@ import logging
 from abc import ABC
 from typing import TYPE_CHECKING
 
-from ..core.request import HIDPPRequest
+from ..core.feature_info import FeatureInfo
+from ..core.request import (
+    HEADER_LENGTH,
+    MAX_PARAMS_LENGTH,
+    REPORT_IDS,
+    HIDPPRequest,
+    request_type,
+)
 if TYPE_CHECKING:
     from ..core.connected_device import ConnectedDevice
 
@@ -14,71 +21,169 @@ class Feature(ABC):
     def __init__(self, hidpp: "ConnectedDevice") -> None:
         self.hidpp = hidpp
         self.logger = logging.getLogger("hidpp")
+        self._stubs: dict[int, FeatureCall] = {}
 
     def construct_and_process_request(self, function_nb, params):
         """
         used to construct and process (send) a custom hidpp request
         defined by feature_id, function_nb, params
         """
-        print(f"🔧 construct_and_process_request called for feature 0x{self.feature_id:04X}, function {function_nb}")
-        
+        return self.call_stub(function_nb)(params)
+
+    def call_stub(self, function_nb) -> "FeatureCall":
+        """
+        bound request of function_nb, to call as stub(params) in tight loops
+        (same result as construct_and_process_request)
+        """
+        stub = self._stubs.get(function_nb)
+        if stub is None:
+            stub = self._stubs[function_nb] = FeatureCall(self, function_nb)
+        return stub
+
+    def construct_and_process_requests(self, function_nb, params_list):
+        """
+        pipelined version of construct_and_process_request: send one request of
+        function_nb per entry of params_list back to back, without waiting for each
+        response. return the validated responses in the order of params_list
+        (None for a missing or invalid response)
+        """
         if not self.hidpp.connected:
-            print(f"  ❌ Device not connected")
             self.logger.warning("ERROR: device is not connected")
-            return None
-            
+            return [None] * len(params_list)
+
         dev_idx = self.hidpp.device_info.sub_idx
-        print(f"  Device index: {dev_idx}")
-        
-        if self.hidpp.enumerate_feature(self.feature_id):
-            feature_idx = self.hidpp.device_info.features[self.feature_id].idx
-            print(f"  ✅ Feature enumerated, index: {feature_idx}")
-        else:
-            print(f"  ❌ Feature enumeration failed")
+
+        if not self.hidpp.enumerate_feature(self.feature_id):
             self.logger.warning(
                 "Feature id: 0x{:04X} is not available".format(self.feature_id)
             )
-            return None
-            
-        if len(params) > 20:
-            req_type = "VERY LONG"
-        elif len(params) > 3:
-            req_type = "LONG"
-        else:
-            req_type = "SHORT"
-        print(f"  Request type: {req_type}, params: {params}")
-            
-        req = HIDPPRequest(
+            return [None] * len(params_list)
+        feature_idx = self.hidpp.device_info.features[self.feature_id].idx
+
+        reqs = [
+            self.build_request(dev_idx, feature_idx, function_nb, params)
+            for params in params_list
+        ]
+        responses = self.hidpp.send_reqs_and_wait_responses(reqs)
+
+        for i, (req, res) in enumerate(zip(reqs, responses)):
+            if res is None:
+                self.logger.warning(
+                    f"No response received for feature 0x{self.feature_id:04X}"
+                )
+            elif res.feature == 0xFF:
+                self.logger.warning(
+                    f"Device returned error response for feature 0x{self.feature_id:04X}"
+                    f" - error code: {res.params[1]}"
+                )
+                responses[i] = None
+        return responses
+
+    def build_request(self, dev_idx, feature_idx, function_nb, params) -> HIDPPRequest:
+        return HIDPPRequest(
             dev_idx=dev_idx,
             feature=feature_idx,
             function=function_nb,
-            req_type=req_type,
+            sw_id=self.hidpp.next_sw_id(),
+            req_type=request_type(len(params)),
             params=params,
         )
-        print(f"  Sending request...")
-        res = self.hidpp.send_req_and_wait_response(req, timeout=1)  # Reduced from 2 to 1 second
-        print(f"  Response received: {res}")
-        
-        if res is not None:
-            print(f"    Response details: feature={res.feature}, dev_idx={res.dev_idx}, sw_id={res.sw_id}")
-            print(f"    Expected: feature={feature_idx}, dev_idx={dev_idx}, sw_id={self.hidpp.sw_id}")
-            
-            # Check for error responses
-            if res.feature == 255:  # 0xFF indicates error response
-                print(f"  ❌ Device error response - code: {res.sw_id}")
-                self.logger.warning(f"Device returned error response for feature 0x{self.feature_id:04X} - error code: {res.sw_id}")
-                return None
-                
-            if (res.dev_idx == dev_idx
-                and res.feature == feature_idx
-                and res.sw_id == self.hidpp.sw_id):
-                print(f"  ✅ Response validation passed")
-                return res
-            else:
-                print(f"  ❌ Response validation failed")
-                self.logger.warning(f"Response validation failed for feature 0x{self.feature_id:04X}")
+
+
+# report id by params length, up to a very long report payload
+_REPORT_ID_BY_LENGTH = [
+    REPORT_IDS[request_type(length)] for length in range(MAX_PARAMS_LENGTH + 1)
+]
+
+
+class FeatureCall:
+    """
+    precompiled request of one (feature, function) of a device
+
+    the feature index is resolved (enumerated) on the first call only, the padded
+    reports are then built once per report type: a call copies the template,
+    writes the params, sends it (tagged with a sw_id by the device) and checks the
+    response header [dev_idx, feature idx, function << 4 | sw_id] in one compare.
+    the resolution is redone when the feature table of the device changes
+    """
+
+    __slots__ = ("feature", "function_nb", "_info", "_templates", "_send")
+
+    def __init__(self, feature: Feature, function_nb):
+        self.feature = feature
+        self.function_nb = function_nb
+        self._info: FeatureInfo | None = None
+        self._templates: dict[int, bytes] = {}
+        self._send = feature.hidpp.send_req_and_wait_response
+
+    def __resolve(self):
+        feature = self.feature
+        hidpp = feature.hidpp
+        if not hidpp.enumerate_feature(feature.feature_id):
+            feature.logger.warning(
+                "Feature id: 0x{:04X} is not available".format(feature.feature_id)
+            )
+            return None
+        device_info = hidpp.device_info
+        info = device_info.features[feature.feature_id]
+        self._templates = {
+            report_id: bytes(
+                HIDPPRequest(
+                    dev_idx=device_info.sub_idx,
+                    feature=info.idx,
+                    function=self.function_nb,
+                    sw_id=0,
+                    req_type=req_type,
+                )
+            )
+            for req_type, report_id in REPORT_IDS.items()
+        }
+        self._info = info
+        return info
+
+    def __call__(self, params) -> HIDPPRequest | None:
+        hidpp = self.feature.hidpp
+        if not hidpp.connected:
+            self.feature.logger.warning("ERROR: device is not connected")
+            return None
+
+        info = self._info
+        if info is None or hidpp.device_info.features.get(info.id) is not info:
+            info = self.__resolve()
+            if info is None:
                 return None
+
+        try:
+            report_id = _REPORT_ID_BY_LENGTH[len(params)]
+        except IndexError:
+            raise ValueError(
+                "{} params do not fit in a report (max {})".format(
+                    len(params), MAX_PARAMS_LENGTH
+                )
+            ) from None
+        req = HIDPPRequest.from_report(self._templates[report_id])
+        req[HEADER_LENGTH : HEADER_LENGTH + len(params)] = params
+
+        res = self._send(req, timeout=1)
+        if res is not None and res[1:4] == req[1:4]:
+            return res
+        self.__warn(req, res)
+        return None
+
+    def __warn(self, req, res):
+        feature_id = self.feature.feature_id
+        if res is None:
+            self.feature.logger.warning(
+                "No response received for feature 0x{:04X}".format(feature_id)
+            )
+        elif res.feature == 0xFF:
+            self.feature.logger.warning(
+                "Device returned error response for feature 0x{:04X}"
+                " - error code: {}".format(feature_id, res.params[1])
+            )
         else:
-            print(f"  ❌ No response received (timeout)")
-            self.logger.warning(f"No response received for feature 0x{self.feature_id:04X}")
-            return None
+            self.feature.logger.warning(
+                "Response validation failed for feature 0x{:04X}: {} to {}".format(
+                    feature_id, res, req
+                )
+            )
@@ -17,7 +17,25 @@ class X0001(Feature):
         res = self.construct_and_process_request(
             function_nb=1, params=[feature_idx, 0, 0]
         )
+        if res is None:
+            self.logger.warning("No response for Feature index {}d".format(feature_idx))
+        return self.__feature_info(feature_idx, res)
 
+    def get_feature_ids(self, feature_indexes) -> list[FeatureInfo | None]:
+        """
+        pipelined get_feature_id: the requests of all the feature_indexes are sent
+        back to back, None for the indexes without a response
+        """
+        responses = self.construct_and_process_requests(
+            function_nb=1, params_list=[[idx, 0, 0] for idx in feature_indexes]
+        )
+        return [
+            None if res is None else self.__feature_info(idx, res)
+            for idx, res in zip(feature_indexes, responses)
+        ]
+
+    @staticmethod
+    def __feature_info(feature_idx, res) -> FeatureInfo:
         f_id = 0
         obsolete = False
         eng = False
@@ -27,6 +45,4 @@ class X0001(Feature):
             obsolete = bool((res.params[2] >> 7) & 0x01)
             eng = bool((res.params[2] >> 5) & 0x01)
             version = res.params[3]
-        else:
-            self.logger.warning("No response for Feature index {}d".format(f_id))
         return FeatureInfo(f_id, feature_idx, obsolete, eng, version)
@@ -17,7 +17,7 @@ class X0003(Feature):
         entityCnt = res.params[0]
         unitId = list_to_u32_be(res.params[1:5])
         transport = list_to_u16_be(res.params[5:7])
-        modeId = res.params[7:13]
+        modeId = list(res.params[7:13])
         capabilities = res.params[14]
 
         return DeviceInfoStruct(entityCnt, unitId, transport, modeId, capabilities)
@@ -16,7 +16,7 @@ class X1891(Feature):
         nbmsg_byte1 = (nbmsg >> 8) & 0xFF  # Most significant byte
         nbmsg_byte2 = nbmsg & 0xFF  # Least significant bytenbMsg_bytes = [nbMsg_byte1, nbMsg_byte2]
         
-        return self.construct_and_process_request(0, [address_byte1, 
+        res = self.construct_and_process_request(0, [address_byte1, 
                                                       address_byte2, 
                                                       address_byte3, 
                                                       address_byte4, 
@@ -28,7 +28,9 @@ class X1891(Feature):
                                                       nbmsg_byte1, 
                                                       nbmsg_byte2, 
                                                       radiomode, 
-                                                      payloadSize]).params
+                                                      payloadSize])
+        # copy: res.params is a view on the response
+        return list(res.params) if res is not None else None
 
     def RFTxCW(self, channel, power, timeout, condition, radiomode):
         timeout_MSB = (timeout >> 8) & 0xFF  # Extract the most significant byte
@@ -1,4 +1,5 @@
 from .feature import Feature
+from ..core.codec import Codec
 
 class X19C0(Feature):
     """Force Sensing Button feature (0x19C0)
@@ -8,6 +9,17 @@ class X19C0(Feature):
     """
     feature_id = 0x19C0
 
+    # big endian layouts of the function params
+    BUTTON_CAPABILITIES = Codec([
+        ("capabilities", "H"),
+        ("default_force", "H"),
+        ("max_force", "H"),
+        ("min_force", "H"),
+        ("num_of_thresholds", "B"),
+    ])
+    THRESHOLDS = Codec([("l1_threshold", "H"), ("l2_threshold", "H")])
+    BUTTON_CONFIG = Codec([("button_id", "B"), ("l1_threshold", "H"), ("l2_threshold", "H")])
+
     def get_capabilities(self):
         """Get device general capabilities
         
@@ -18,17 +30,13 @@ class X19C0(Feature):
         if res is None:
             return None
             
-        if not hasattr(res, 'params') or len(res.params) < 1:
-            print(f"ERROR: Invalid capabilities response - expected 1+ params, got {len(res.params) if hasattr(res, 'params') else 0}")
-            return None
-            
-        try:
-            num_buttons = res.params[0]
-            return num_buttons
-        except (IndexError, TypeError) as e:
-            print(f"ERROR: Failed to parse capabilities data: {e}")
+        if len(res.params) < 1:
+            self.logger.warning(f"Invalid capabilities response - expected 1+ params, got {len(res.params)}")
             return None
 
+        num_buttons = res.params[0]
+        return num_buttons
+
     def get_button_capabilities(self, button_id):
         """Returns the supported sensing button capabilities
         
@@ -42,27 +50,12 @@ class X19C0(Feature):
         if res is None:
             return None
             
-        if not hasattr(res, 'params') or len(res.params) < 9:
-            print(f"ERROR: Invalid button capabilities response - expected 9+ params, got {len(res.params) if hasattr(res, 'params') else 0}")
-            return None
-            
-        try:
-            # Parse capabilities (2 bytes)
-            capabilities = (res.params[0] << 8) | res.params[1]
-            
-            # Parse force values (2 bytes each)
-            default_force = (res.params[2] << 8) | res.params[3]
-            max_force = (res.params[4] << 8) | res.params[5]
-            min_force = (res.params[6] << 8) | res.params[7]
-            
-            # Parse number of thresholds
-            num_of_thresholds = res.params[8]
-            
-            return (capabilities, default_force, max_force, min_force, num_of_thresholds)
-        except (IndexError, TypeError) as e:
-            print(f"ERROR: Failed to parse button capabilities data: {e}")
+        if len(res.params) < self.BUTTON_CAPABILITIES.size:
+            self.logger.warning(f"Invalid button capabilities response - expected {self.BUTTON_CAPABILITIES.size}+ params, got {len(res.params)}")
             return None
 
+        return self.BUTTON_CAPABILITIES.decode(res.params)
+
     def get_button_config(self, button_id):
         """Returns the current button configuration
         
@@ -76,22 +69,12 @@ class X19C0(Feature):
         if res is None:
             return None
             
-        if not hasattr(res, 'params') or len(res.params) < 4:
-            print(f"ERROR: Invalid button config response - expected 4+ params, got {len(res.params) if hasattr(res, 'params') else 0}")
-            return None
-            
-        try:
-            # Parse L1 threshold (2 bytes, MSB first)
-            l1_threshold = (res.params[0] << 8) | res.params[1]
-            
-            # Parse L2 threshold (2 bytes, MSB first)  
-            l2_threshold = (res.params[2] << 8) | res.params[3]
-            
-            return (l1_threshold, l2_threshold)
-        except (IndexError, TypeError) as e:
-            print(f"ERROR: Failed to parse button config data: {e}")
+        if len(res.params) < self.THRESHOLDS.size:
+            self.logger.warning(f"Invalid button config response - expected {self.THRESHOLDS.size}+ params, got {len(res.params)}")
             return None
 
+        return self.THRESHOLDS.decode(res.params)
+
     def set_button_config(self, button_id, l1_threshold, l2_threshold):
         """Set the button configuration
         
@@ -103,31 +86,17 @@ class X19C0(Feature):
         Returns:
             tuple: (button_id, l1_threshold, l2_threshold) - Echo of applied values
         """
-        # Split 16-bit values into MSB and LSB
-        l1_msb = (l1_threshold >> 8) & 0xFF
-        l1_lsb = l1_threshold & 0xFF
-        l2_msb = (l2_threshold >> 8) & 0xFF
-        l2_lsb = l2_threshold & 0xFF
-        
-        res = self.construct_and_process_request(3, [button_id, l1_msb, l1_lsb, l2_msb, l2_lsb])
+        params = self.BUTTON_CONFIG.encode(button_id, l1_threshold & 0xFFFF, l2_threshold & 0xFFFF)
+        res = self.construct_and_process_request(3, params)
         if res is None:
             return None
             
-        if not hasattr(res, 'params') or len(res.params) < 5:
-            print(f"ERROR: Invalid set config response - expected 5+ params, got {len(res.params) if hasattr(res, 'params') else 0}")
-            return None
-            
-        try:
-            # Parse response
-            echo_button_id = res.params[0]
-            echo_l1 = (res.params[1] << 8) | res.params[2]
-            echo_l2 = (res.params[3] << 8) | res.params[4]
-            
-            return (echo_button_id, echo_l1, echo_l2)
-        except (IndexError, TypeError) as e:
-            print(f"ERROR: Failed to parse set config response: {e}")
+        if len(res.params) < self.BUTTON_CONFIG.size:
+            self.logger.warning(f"Invalid set config response - expected {self.BUTTON_CONFIG.size}+ params, got {len(res.params)}")
             return None
 
+        return self.BUTTON_CONFIG.decode(res.params)
+
     def reset_button_config(self, button_id):
         """Reset button configuration to default values
         
@@ -141,16 +110,8 @@ class X19C0(Feature):
         if res is None:
             return None
             
-        if not hasattr(res, 'params') or len(res.params) < 4:
-            print(f"ERROR: Invalid reset config response - expected 4+ params, got {len(res.params) if hasattr(res, 'params') else 0}")
+        if len(res.params) < self.THRESHOLDS.size:
+            self.logger.warning(f"Invalid reset config response - expected {self.THRESHOLDS.size}+ params, got {len(res.params)}")
             return None
-            
-        try:
-            # Parse default thresholds
-            l1_threshold = (res.params[0] << 8) | res.params[1]
-            l2_threshold = (res.params[2] << 8) | res.params[3]
-            
-            return (l1_threshold, l2_threshold)
-        except (IndexError, TypeError) as e:
-            print(f"ERROR: Failed to parse reset config response: {e}")
-            return None
\ No newline at end of file
+
+        return self.THRESHOLDS.decode(res.params)
\ No newline at end of file
@@ -32,6 +32,18 @@ class X8129(Feature):
         Int8            = 7
         UInt8           = 8
 
+    # big endian encoding of the values, by curve type
+    VALUE_STRUCTS = {
+        CurveType.Int16:    struct.Struct('>h'),
+        CurveType.UInt16:   struct.Struct('>H'),
+        CurveType.Int32:    struct.Struct('>l'),
+        CurveType.UInt32:   struct.Struct('>L'),
+        CurveType.Float:    struct.Struct('>f'),
+        CurveType.Bool:     struct.Struct('>?'),
+        CurveType.Int8:     struct.Struct('>b'),
+        CurveType.UInt8:    struct.Struct('>B'),
+    }
+
     class FunctionAttributeIndex(Enum):
         ArgCount        = 0
         Name            = 1
@@ -49,45 +61,17 @@ class X8129(Feature):
     # read and write private functions
     
     def _read_attribute_value(self, res, type, offset=0):
-        if type == self.CurveType.TNone:
+        value_struct = self.VALUE_STRUCTS.get(type)
+        if value_struct is None:
             return None
-        elif type == self.CurveType.Int16:
-            return struct.unpack('>h', bytes(res.params[offset:offset+2]))[0]   # int16
-        elif type == self.CurveType.UInt16:
-            return struct.unpack('>H', bytes(res.params[offset:offset+2]))[0]   # uint16
-        elif type == self.CurveType.Int32:
-            return struct.unpack('>l', bytes(res.params[offset:offset+4]))[0]   # int32
-        elif type == self.CurveType.UInt32:
-            return struct.unpack('>L', bytes(res.params[offset:offset+4]))[0]   # uint32
-        elif type == self.CurveType.Float:
-            return struct.unpack('>f', bytes(res.params[offset:offset+4]))[0]   # float32
-        elif type == self.CurveType.Bool:
-            return struct.unpack('>?', bytes(res.params[offset:offset+1]))[0]   # bool
-        elif type == self.CurveType.Int8:
-            return struct.unpack('>b', bytes(res.params[offset:offset+1]))[0]   # int8
-        elif type == self.CurveType.UInt8:
-            return struct.unpack('>B', bytes(res.params[offset:offset+1]))[0]   # uint8
-        
+        return value_struct.unpack_from(res.params, offset)[0]
+
     def _write_attribute_value(self, value, type):
-        if type == self.CurveType.TNone:
+        value_struct = self.VALUE_STRUCTS.get(type)
+        if value_struct is None:
             return None
-        elif type == self.CurveType.Int16:
-            return list(struct.pack('>h', value))   # int16
-        elif type == self.CurveType.UInt16:
-            return list(struct.pack('>H', value))   # uint16
-        elif type == self.CurveType.Int32:
-            return list(struct.pack('>l', value))   # int32
-        elif type == self.CurveType.UInt32:
-            return list(struct.pack('>L', value))   # uint32
-        elif type == self.CurveType.Float:
-            return list(struct.pack('>f', value))   # float32
-        elif type == self.CurveType.Bool:
-            return list(struct.pack('>?', value))   # bool
-        elif type == self.CurveType.Int8:
-            return list(struct.pack('>b', value))   # int8
-        elif type == self.CurveType.UInt8:
-            return list(struct.pack('>B', value))   # uint8
-        
+        return list(value_struct.pack(value))
+
     # protocol functions
 
     def get_info(self):
@@ -148,6 +132,25 @@ class X8129(Feature):
         timestamp = self._read_attribute_value(res, self.CurveType.UInt32, 4)
         return point_value, timestamp
     
+    def get_curve_points(self, driver_index, curve_index, point_indexes, curve_type):
+        """pipelined get_curve_point, return a list of (point_value, timestamp)"""
+        if driver_index is None or curve_index is None or point_indexes is None:
+            self.logger.warning("invalid parameter")
+            return None
+        params_list = [
+            [driver_index, curve_index] + self._write_attribute_value(point_index, self.CurveType.UInt32)
+            for point_index in point_indexes
+        ]
+        points = []
+        for res in self.construct_and_process_requests(function_nb=3, params_list=params_list):
+            if res is None:
+                points.append((None, None))
+                continue
+            point_value = self._read_attribute_value(res, curve_type)
+            timestamp = self._read_attribute_value(res, self.CurveType.UInt32, 4)
+            points.append((point_value, timestamp))
+        return points
+
     def set_curve_point(self, driver_index, curve_index, point_index, point_value, curve_type):
         if driver_index is None or curve_index is None or point_index is None or point_value is None:
             self.logger.warning("invalid parameter")
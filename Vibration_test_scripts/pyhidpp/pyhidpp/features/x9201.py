@@ -1,4 +1,5 @@
 from .feature import Feature
+from ..core.codec import Codec
 from ..core.utils import (
     list_to_u16_be,
     list_to_u32_be,
@@ -103,22 +104,20 @@ class X9201(Feature):
     # [event0] monitorReport() → monitorData
     monitor_report_event = 0
 
+    MONITOR_DATA = Codec(
+        [
+            ("angle", "H"),
+            ("interval", "H"),
+            ("rotation", "B"),
+            ("slot", "B"),
+            ("ratchet", "B"),
+            ("proxi_touch", "B"),
+            ("prox_fusion", "H"),
+            (None, "4x"),
+            ("counter", "H"),
+        ]
+    )
+
     def decode_monitor_data(self, monitor_data):
-        angle = list_to_u16_be(monitor_data[0:2])
-        internval = list_to_u16_be(monitor_data[2:4])
-        rotation = monitor_data[4]
-        slot = monitor_data[5]
-        ratchet = monitor_data[6]
-        proxiTouch = monitor_data[7]
-        proxFusion = list_to_u16_be(monitor_data[8:10])
-        counter = list_to_u16_be(monitor_data[14:])
-        return (
-            angle,
-            internval,
-            rotation,
-            slot,
-            ratchet,
-            proxiTouch,
-            proxFusion,
-            counter,
-        )
+        # angle, interval, rotation, slot, ratchet, proxiTouch, proxFusion, counter
+        return self.MONITOR_DATA.decode(monitor_data)
@@ -1,5 +1,6 @@
 from .feature import Feature
-from ..core.utils import list_to_i16_be, list_to_u16_be, list_to_i8, list_to_u8, u16_to_list_be
+from ..core.codec import Codec
+from ..core.utils import list_to_u16_be, u16_to_list_be
 
 class X9205(Feature):
     feature_id = 0x9205
@@ -99,15 +100,21 @@ class X9205(Feature):
     # [event0] monitorReport() → monitorData
     monitor_report_event = 0
 
+    MONITOR_DATA = Codec(
+        [
+            ("field_x", "h"),
+            ("field_y", "h"),
+            ("field_z", "h"),
+            ("temp", "H"),
+            ("angle", "H"),
+            ("slot", "b"),
+            ("ratchet", "b"),
+            ("angle_offset", "b"),
+            ("angle_ratchet_nbr", "B"),
+            ("count", "H"),
+        ]
+    )
+
     def decode_monitor_data(self, monitor_data):
-        field_x = list_to_i16_be(monitor_data[0:2])   # signed
-        field_y = list_to_i16_be(monitor_data[2:4])   # signed
-        field_z = list_to_i16_be(monitor_data[4:6])   # signed
-        temp = list_to_u16_be(monitor_data[6:8])   # unsigned
-        angle = list_to_u16_be(monitor_data[8:10])   # unsigned
-        slot = list_to_i8(monitor_data[10:11])   # signed
-        ratchet = list_to_i8(monitor_data[11:12])   # signed
-        angle_offset = list_to_i8(monitor_data[12:13])   # signed
-        angle_ratchet_nbr = list_to_u8(monitor_data[13:14])   # unsigned
-        count = list_to_u16_be(monitor_data[14:16])   # unsigned
-        return field_x, field_y, field_z, temp, angle, slot, ratchet, angle_offset, angle_ratchet_nbr, count
+        # field_x, field_y, field_z, temp, angle, slot, ratchet, angle_offset, angle_ratchet_nbr, count
+        return self.MONITOR_DATA.decode(monitor_data)
@@ -1,5 +1,6 @@
 from .feature import Feature
-from ..core.utils import list_to_i16_be, list_to_u16_be, u16_to_list_be
+from ..core.codec import Codec
+from ..core.utils import list_to_u16_be, u16_to_list_be
 
 class X9209(Feature):
     feature_id = 0x9209
@@ -113,12 +114,19 @@ class X9209(Feature):
     # [event0] monitorReport() → monitorData
     monitor_report_event = 0
 
+    MONITOR_DATA = Codec(
+        [
+            ("sensor_idx", "B"),
+            ("field_x", "h"),
+            ("field_y", "h"),
+            ("field_z", "h"),
+            ("temp", "H"),
+            ("atan", "H"),
+            (None, "3x"),
+            ("count", "H"),
+        ]
+    )
+
     def decode_monitor_data(self, monitor_data):
-        sensor_idx = monitor_data[0]
-        field_x = list_to_i16_be(monitor_data[1:3])   # signed
-        field_y = list_to_i16_be(monitor_data[3:5])   # signed
-        field_z = list_to_i16_be(monitor_data[5:7])   # signed
-        temp = list_to_u16_be(monitor_data[7:9])   # unsigned
-        atan = list_to_u16_be(monitor_data[9:11])   # unsigned
-        count = list_to_u16_be(monitor_data[14:16])   # unsigned
-        return sensor_idx, field_x, field_y, field_z, temp, atan, count
+        # sensor_idx, field_x, field_y, field_z, temp, atan, count
+        return self.MONITOR_DATA.decode(monitor_data)
@@ -1,51 +1,103 @@
 from .feature import Feature
+from ..core.codec import Codec
+from ..core.request import HEADER_LENGTH, REPORT_IDS, REPORT_LENGTHS
 from enum import Enum
 
+
+# measurement / baseline: u16 two's complement, values above COUNT_MAX are negative
+COUNT_MAX = 2048
+COUNT_RANGE = 1 << 16
+# preload: values above PRELOAD_MAX are negative, offset by PRELOAD_OFFSET
+PRELOAD_MAX = 128
+PRELOAD_OFFSET = 256 - 16
+
+# decoded measurements, field names and types of acquisition.SAMPLE_DTYPE
+MEASUREMENT_DTYPE = [("adc", "<i4"), ("baseline", "<i4"), ("preload", "<i2")]
+
+
+def signed_count(value):
+    """
+    measurement / baseline count (u16) to signed
+    """
+    return value - COUNT_RANGE if value > COUNT_MAX else value
+
+
+def signed_preload(value):
+    """
+    preload (u8) to signed
+    """
+    return PRELOAD_OFFSET - value if value > PRELOAD_MAX else value
+
+
 class X9402(Feature):
     feature_id = 0x9402
 
+    # readMeasurement response: value and baseline as u16 little endian
+    MEASUREMENT = Codec([(None, "x"), ("value", "H"), ("baseline", "H"), ("preload", "B")], "<")
+    # readCalData response: 8 bit thresholds
+    CAL_DATA = Codec([(None, "x"), ("nominal", "B"), (None, "x"), ("low", "B"), (None, "x"), ("high", "B")])
+    # monitorTest request, count 0: abort, MONITOR_INFINITE: endless test
+    MONITOR_MODE = Codec([("sensor_idx", "B"), ("count", "H")], "<")
+    MONITOR_INFINITE = 0xFFFF
+    # [event0] monitorReport: MONITOR_SAMPLES measurements per notification
+    monitor_report_event = 0
+    MONITOR_SAMPLES = 5
+    MONITOR_REPORT = Codec(
+        [("sensor_idx", "B"), ("packet_idx", "H"), ("measurement", "5H"), ("rest_position", "H")], "<"
+    )
+
     def read_measurement(self, custom_param: int=0):
-        # Enhanced debugging for reconnection issues
-        print(f"🔍 X9402.read_measurement called with param: {custom_param}")
-        print(f"  Device connected: {self.hidpp.connected}")
-        print(f"  Feature 0x9402 enumerated: {self.hidpp.device_info.is_enumerated(0x9402)}")
-        
-        if self.hidpp.device_info.is_enumerated(0x9402):
-            feature_info = self.hidpp.device_info.features[0x9402]
-            print(f"  Feature index: {feature_info.idx}")
-        
-        res = self.construct_and_process_request(2, [custom_param])
-        print(f"  construct_and_process_request result: {res}")
-        
+        res = self.call_stub(2)([custom_param])
         if res is None:
-            print("ERROR: Feature 0x9402 not available on this device (sensor not supported)")
+            self.logger.warning("Feature 0x9402 not available on this device (sensor not supported)")
             return None
         
-        if not hasattr(res, 'params') or len(res.params) < 6:
-            print(f"ERROR: Invalid sensor response - expected 6+ params, got {len(res.params) if hasattr(res, 'params') else 0}")
-            return None
-            
-        try:
-            val = res.params[1] + res.params[2]*2**8
-            if val > 2048:
-                val = val - 65535
-            bl = res.params[3] + res.params[4]*2**8
-            if bl > 2048:
-                bl = bl - 65535
-            preload = res.params[5]
-
-            if preload > 128:
-                preload = (preload - 256 + 16)*-1
-
-            return (val,bl,preload)
-        except (IndexError, TypeError) as e:
-            print(f"ERROR: Failed to parse sensor data: {e}")
+        return self._decode_measurement(res)
+
+    def read_measurements(self, count: int, custom_param: int=0):
+        """
+        pipelined read_measurement: issue count readMeasurement requests back to back
+        return a list of (val, bl, preload), None for a failed reading
+        """
+        responses = self.construct_and_process_requests(2, [[custom_param] for _ in range(count)])
+        return [self._decode_measurement(res) if res is not None else None for res in responses]
+
+    def _decode_measurement(self, res):
+        if len(res.params) < self.MEASUREMENT.size:
+            self.logger.warning(f"Invalid sensor response - expected {self.MEASUREMENT.size}+ params, got {len(res.params)}")
             return None
 
-    def monitor_mode(self, custom_param: int):
-        hi_byte= (0xFF00 & custom_param)>>8
-        lo_byte= (0x00FF & custom_param)
-        res = self.construct_and_process_request(5, [0,lo_byte,hi_byte])
+        val, bl, preload = self.MEASUREMENT.decode(res.params)
+        return (signed_count(val), signed_count(bl), signed_preload(preload))
+
+    @classmethod
+    def decode_measurements(cls, reports):
+        """
+        batch _decode_measurement of raw readMeasurement responses (long reports)
+        reports: (N, 20) uint8 array, or bytes of N reports
+        return a structured array of N (adc, baseline, preload), MEASUREMENT_DTYPE
+        """
+        import numpy as np
+
+        if isinstance(reports, np.ndarray):
+            reports = np.ascontiguousarray(reports, dtype=np.uint8)
+        raw = cls.MEASUREMENT.decode_batch(
+            reports, stride=REPORT_LENGTHS[REPORT_IDS["LONG"]], offset=HEADER_LENGTH
+        )
+        decoded = np.empty(len(raw), dtype=MEASUREMENT_DTYPE)
+        for name, field in (("adc", "value"), ("baseline", "baseline")):
+            values = raw[field].astype(np.int32)
+            decoded[name] = np.where(values > COUNT_MAX, values - COUNT_RANGE, values)
+        preload = raw["preload"].astype(np.int16)
+        decoded["preload"] = np.where(preload > PRELOAD_MAX, PRELOAD_OFFSET - preload, preload)
+        return decoded
+
+    def monitor_mode(self, custom_param: int, sensor_idx: int=0):
+        """
+        monitorTest: the device sends custom_param monitorReport events (see
+        monitor_report_event, MONITOR_REPORT), 0 aborts the test
+        """
+        res = self.construct_and_process_request(5, self.MONITOR_MODE.encode(sensor_idx, custom_param & 0xFFFF))
         #val = res.params[1] + res.params[2]*2**8
         return res
     def write_cal_data(self, th):
@@ -67,23 +119,15 @@ class X9402(Feature):
     def read_cal_data(self, custom_param: int):
         res = self.construct_and_process_request(4,[custom_param])
         if res is None:
-            print("ERROR: Feature 0x9402 calibration not available on this device")
+            self.logger.warning("Feature 0x9402 calibration not available on this device")
             return None
             
-        if not hasattr(res, 'params') or len(res.params) < 7:
-            print(f"ERROR: Invalid calibration response - expected 7+ params, got {len(res.params) if hasattr(res, 'params') else 0}")
-            return None
-            
-        try:
-            nom_th = (res.params[2]>>8) + res.params[1]
-            low_th = (res.params[4]>>8) + res.params[3]
-            high_th = (res.params[6]>>8) + res.params[5]
-
-            return (nom_th,low_th,high_th)
-        except (IndexError, TypeError) as e:
-            print(f"ERROR: Failed to parse calibration data: {e}")
+        if len(res.params) < self.CAL_DATA.size:
+            self.logger.warning(f"Invalid calibration response - expected {self.CAL_DATA.size}+ params, got {len(res.params)}")
             return None
 
+        return self.CAL_DATA.decode(res.params)
+
 # %%
 # Test
 if __name__ == '__main__':    # called as a script
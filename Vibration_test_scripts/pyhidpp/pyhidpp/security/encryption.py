@@ -1,5 +1,4 @@
 import base64
-from Crypto.Cipher import AES
 import configparser
 
 from ..core.logger import get_pyhidpp_logger
@@ -8,6 +7,9 @@ import pathlib
 
 class AESCipher(object):
     def __init__(self, tdeOffuscatedFileName: str):
+        # imported on use: pycryptodome is only needed to unlock devices
+        from Crypto.Cipher import AES
+
         self.logger = get_pyhidpp_logger()
         config = configparser.ConfigParser()
         config.read(pathlib.Path(__file__).parent / "x1602.ini")
@@ -19,6 +21,8 @@ class AESCipher(object):
         self.passwords.read(tdeOffuscatedFileName)
 
     def decrypt(self, fw, session_name):
+        from Crypto.Cipher import AES
+
         password = self.passwords[fw][session_name]
         enc = base64.b64decode(password)
         cipher = AES.new(self.key, AES.MODE_CBC, self.iv)
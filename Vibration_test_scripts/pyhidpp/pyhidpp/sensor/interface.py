@@ -107,4 +107,4 @@ class SensorInterface(ConnectedDevice):
         #         if sdi
         #         else "No answer"
         #     )
-        return sdi.params[1 : len(sdo) + 1] if sdi else None
+        return list(sdi.params[1 : len(sdo) + 1]) if sdi else None
@@ -0,0 +1,4 @@
+from .virtual_device import VirtualDevice, HidppError
+from .virtual_hid import VirtualHid, LinkModel
+from .virtual_receiver import VirtualReceiver
+from .replay_hid import ReplayHid, CapturedDevice
@@ -0,0 +1,121 @@
+"""
+Replay hid backend
+
+serves a capture file (see core.capture) as a virtual device: the captured input
+reports are delivered with their original timing, so that a session can be
+re-run deterministically without the device:
+
+    backend = ReplayHid("session.hidcap")
+    backend.install()  # the discovery now sees the captured device
+    ...
+    backend.uninstall()
+
+the replay starts at the first report written by the host (or start()). With
+wait_writes, each captured output report waits for the corresponding host write
+before the replay goes on, the timing restarts from there: the replay follows the
+pace of the host instead of drifting from it. Host writes differing from the
+captured ones are counted in divergences
+"""
+
+import time
+from collections import deque
+from dataclasses import dataclass
+from threading import Condition, Event, Thread
+
+from ..core.capture import CAPTURE_OUT, CaptureReader
+from .virtual_hid import VirtualBackend
+
+
+@dataclass
+class CapturedDevice:
+    name: str
+    vid: int
+    pid: int
+    serial_number: str = ""
+
+
+class ReplayHid(VirtualBackend):
+    """
+    VirtualBackend replaying a capture file
+
+    speed: replay speed factor (2.0 twice as fast), None to deliver the input
+    reports as fast as possible
+    """
+
+    def __init__(self, path, speed=1.0, wait_writes=True, write_timeout_s=1.0):
+        super().__init__()
+        self.path = path
+        self.speed = speed
+        self.wait_writes = wait_writes
+        self.write_timeout_s = write_timeout_s
+
+        self.replayed_count = 0
+        self.divergences = 0
+        self.finished = Event()
+
+        with CaptureReader(path) as reader:
+            meta = reader.metadata
+        self.captured_device = CapturedDevice(
+            meta.get("name", "Replay"), meta.get("vid", 0x046D), meta.get("pid", 0)
+        )
+        self._add_endpoints(self.captured_device)
+
+        self._writes = deque()
+        self._writes_cond = Condition()
+        self._stop = Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = Thread(target=self.__replay, daemon=True)
+            self._thread.start()
+
+    def uninstall(self):
+        super().uninstall()
+        self._stop.set()
+        with self._writes_cond:
+            self._writes_cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _write(self, device, data: bytes):
+        with self._writes_cond:
+            self._writes.append(data)
+            self._writes_cond.notify()
+        self.start()
+
+    def __next_write(self):
+        with self._writes_cond:
+            self._writes_cond.wait_for(
+                lambda: self._writes or self._stop.is_set(), self.write_timeout_s
+            )
+            return self._writes.popleft() if self._writes else None
+
+    def __replay(self):
+        base = time.monotonic()
+        t_ref = None
+        with CaptureReader(self.path) as reader:
+            for t_ns, direction, report in reader:
+                if self._stop.is_set():
+                    return
+                if t_ref is None:
+                    t_ref = t_ns
+
+                if direction == CAPTURE_OUT:
+                    if self.wait_writes:
+                        written = self.__next_write()
+                        if written is None or written != report:
+                            self.divergences += 1
+                        base = time.monotonic()
+                        t_ref = t_ns
+                    continue
+
+                if self.speed:
+                    delay = base + (t_ns - t_ref) / 1e9 / self.speed - time.monotonic()
+                    if delay > 0 and self._stop.wait(delay):
+                        return
+                self._endpoint_for(self.captured_device, report[0]).deliver(report)
+                self.replayed_count += 1
+        self.finished.set()
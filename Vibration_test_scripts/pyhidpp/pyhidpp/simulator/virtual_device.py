@@ -0,0 +1,464 @@
+"""
+Virtual HIDPP 2.0 device
+
+in-process model of a device answering the features used by the sensor viewers
+(x0000, x0001, x0003, x0005, x1E00, x1E02, x1602, x1E22, x9402, x19C0), see
+VirtualHid to plug it under the discovery and ConnectedDevice
+"""
+
+import math
+import random
+import time
+from threading import Event, Lock, Thread
+from typing import Callable
+
+from ..core.request import HIDPPRequest, REPORT_IDS
+
+# HIDPP 2.0 error codes
+ERR_INVALID_ARGUMENT = 0x02
+ERR_OUT_OF_RANGE = 0x03
+ERR_NOT_ALLOWED = 0x05
+ERR_INVALID_FEATURE_INDEX = 0x06
+ERR_INVALID_FUNCTION_ID = 0x07
+
+# feature type flags (x0000/x0001)
+FEATURE_OBSOLETE = 0x80
+FEATURE_ENGINEERING = 0x20
+
+LINK_NOTIF = 0x41
+
+# x9402 monitorReport: measurements per notification, count of an endless test
+MONITOR_SAMPLES = 5
+MONITOR_INFINITE = 0xFFFF
+
+DEFAULT_FEATURES = [
+    0x0000,
+    0x0001,
+    0x0003,
+    0x0005,
+    0x1E00,
+    0x1E02,
+    0x1602,
+    0x1E22,
+    0x9402,
+    0x19C0,
+]
+
+
+class HidppError(Exception):
+    def __init__(self, code):
+        super().__init__("HIDPP error 0x{:02X}".format(code))
+        self.code = code
+
+
+def default_sensor(t):
+    """
+    force sensor model: a press every 2 seconds over a steady baseline
+    return (adc, baseline, preload)
+    """
+    press = max(0.0, math.sin(math.pi * t)) ** 2
+    return int(600 * press + random.gauss(0, 3)), 250, 12
+
+
+def default_spi(data_in):
+    """
+    SPI slave model of x1E22 spi_direct_access: nothing connected, reads 0
+    """
+    return [0] * len(data_in)
+
+
+class VirtualDevice:
+    """
+    HIDPP 2.0 device answering requests written to it (see handle_report)
+
+    notifications are sent through the emit(report, delay_s) callback set by the
+    backend (see attach), short reports going to the short endpoint
+    """
+
+    def __init__(
+        self,
+        name="Bravo",
+        pid=0xB0A0,
+        vid=0x046D,
+        features: list[int] = None,
+        hidden_features=(0x1E22,),
+        serial_number="VIRT00000001",
+        fw_name="BRV",
+        fw_version=(1, 2),
+        fw_build=0x0042,  # BCD, build 42
+        unit_id=0x12345678,
+        device_type=3,  # Mouse, see DEVICE_TYPE
+        protected=False,
+        password=None,
+        sensor: Callable[[float], tuple[int, int, int]] = default_sensor,
+        spi: Callable[[list[int]], list[int]] = default_spi,
+        monitor_period_s=0.01,
+    ):
+        self.name = name
+        self.pid = pid
+        self.vid = vid
+        self.features = list(DEFAULT_FEATURES if features is None else features)
+        self.hidden_features = set(hidden_features)
+        self.serial_number = serial_number
+        self.fw_name = fw_name
+        self.fw_version = fw_version
+        self.fw_build = fw_build
+        self.unit_id = unit_id
+        self.device_type = device_type
+        self.protected = protected
+        self.password = password
+        self.sensor = sensor
+        self.spi = spi
+        self.monitor_period_s = monitor_period_s
+
+        # device state
+        self.hidden_enabled = False
+        self.session_open = False
+        self.deactivatable_state = 0
+        self.calibration = [300, 240, 360]  # nominal, low, high thresholds
+        self.buttons = [[400, 800]]  # l1, l2 thresholds per button
+        self.button_defaults = [[400, 800]]
+        self.selected_spi_device = (0, 0)
+        self.requests_count = 0
+
+        self._lock = Lock()
+        self._emit = None
+        self._t0 = time.monotonic()
+        self._monitor_stop = Event()
+        self._monitor_thread = None
+        self._monitor_remaining = 0
+        self._monitor_sensor = 0
+
+        self._handlers = {
+            0x0000: self._x0000,
+            0x0001: self._x0001,
+            0x0003: self._x0003,
+            0x0005: self._x0005,
+            0x1E00: self._x1E00,
+            0x1E02: self._x1E02,
+            0x1602: self._x1602,
+            0x1E22: self._x1E22,
+            0x9402: self._x9402,
+            0x19C0: self._x19C0,
+        }
+
+    def attach(self, emit: Callable):
+        self._emit = emit
+
+    def detach(self):
+        self.stop_monitor()
+        self._emit = None
+
+    def feature_idx(self, feature_id):
+        return self.features.index(feature_id)
+
+    """ HOST SIDE
+    """
+
+    def handle_report(self, report) -> HIDPPRequest:
+        """
+        process a request written by the host, return the response (or error) report
+        """
+        req = HIDPPRequest.from_report(report)
+        with self._lock:
+            self.requests_count += 1
+            try:
+                params = self.__call(req)
+            except HidppError as e:
+                return self.__error(req, e.code)
+        return HIDPPRequest(
+            req.dev_idx,
+            req.feature,
+            req.function,
+            req.sw_id,
+            params,
+            "VERY LONG" if req.report_id == REPORT_IDS["VERY LONG"] else "LONG",
+        )
+
+    def __call(self, req):
+        if req.feature >= len(self.features):
+            raise HidppError(ERR_INVALID_FEATURE_INDEX)
+        feature_id = self.features[req.feature]
+        if feature_id in self.hidden_features and not self.hidden_enabled:
+            raise HidppError(ERR_INVALID_FEATURE_INDEX)
+        handler = self._handlers.get(feature_id)
+        if handler is None:
+            raise HidppError(ERR_INVALID_FUNCTION_ID)
+        return handler(req.function, req.params)
+
+    @staticmethod
+    def __error(req, code):
+        return HIDPPRequest(
+            req.dev_idx,
+            0xFF,
+            req.feature >> 4,
+            req.feature & 0x0F,
+            [req.function << 4 | req.sw_id, code],
+        )
+
+    """ DEVICE SIDE
+    """
+
+    def notify(self, feature_id, function, params=(), delay_s=0.0):
+        """
+        send a notification (sw_id 0) of feature_id
+        """
+        if self._emit is None:
+            return
+        feature_idx = self.feature_idx(feature_id)
+        self._emit(HIDPPRequest(0xFF, feature_idx, function, 0, list(params)), delay_s)
+
+    def notify_burst(self, feature_id, function, count, interval_s=0.0, params=None):
+        """
+        send count notifications of feature_id, interval_s apart
+        params: None, a list of params, or a callable(i) returning the params of the
+        i-th notification
+        """
+        for i in range(count):
+            if callable(params):
+                notif_params = params(i)
+            else:
+                notif_params = params or [i & 0xFF]
+            self.notify(feature_id, function, notif_params, i * interval_s)
+
+    def set_link(self, established: bool):
+        """
+        send the connection notif (0x41) on the short endpoint
+        """
+        if self._emit is None:
+            return
+        notif = HIDPPRequest(
+            0xFF, LINK_NOTIF, 0, 0, [0x00 if established else 0x40], "SHORT"
+        )
+        self._emit(notif, 0.0)
+
+    def start_monitor(self, count=MONITOR_INFINITE, sensor_idx=0):
+        """
+        count: number of monitorReport to send (MONITOR_INFINITE: endless), a
+        running test is re-armed with the new count
+        """
+        self._monitor_remaining = count
+        self._monitor_sensor = sensor_idx
+        if self._monitor_thread is not None:
+            return
+        # one stop event per test: an aborted test can not be resumed by the next
+        self._monitor_stop = Event()
+        self._monitor_thread = Thread(
+            target=self.__monitor, args=(self._monitor_stop,), daemon=True
+        )
+        self._monitor_thread.start()
+
+    def stop_monitor(self):
+        if self._monitor_thread is None:
+            return
+        self._monitor_stop.set()
+        self._monitor_thread.join()
+        self._monitor_thread = None
+
+    def __monitor(self, stop: Event):
+        """
+        x9402 monitorTest: one monitorReport notification (event 0) every
+        monitor_period_s, holding the last MONITOR_SAMPLES measurements
+        [sensorIdx, packetIdx, measurement[5], rest_position] (LSB first)
+        """
+        packet_idx = 0
+        period_s = self.monitor_period_s / MONITOR_SAMPLES
+        samples = []
+        while not stop.wait(period_s):
+            samples.append(self.sensor(time.monotonic() - self._t0))
+            if len(samples) < MONITOR_SAMPLES:
+                continue
+            report = [self._monitor_sensor, packet_idx & 0xFF, packet_idx >> 8 & 0xFF]
+            for adc, _, _ in samples:
+                report += [adc & 0xFF, adc >> 8 & 0xFF]
+            baseline = samples[0][1]
+            report += [baseline & 0xFF, baseline >> 8 & 0xFF]
+            samples = []
+            self.notify(0x9402, 0, report)
+            packet_idx = (packet_idx + 1) & 0xFFFF
+
+            if self._monitor_remaining != MONITOR_INFINITE:
+                self._monitor_remaining -= 1
+                if self._monitor_remaining <= 0:
+                    stop.set()
+                    if self._monitor_stop is stop:
+                        self._monitor_thread = None
+                    return
+
+    def __measurement(self, param):
+        adc, baseline, preload = self.sensor(time.monotonic() - self._t0)
+        return [
+            param,
+            adc & 0xFF,
+            adc >> 8 & 0xFF,
+            baseline & 0xFF,
+            baseline >> 8 & 0xFF,
+            preload & 0xFF,
+        ]
+
+    """ FEATURES
+        handler(function, params) return the response params or raise HidppError
+    """
+
+    def _x0000(self, function, params):
+        if function == 0:  # getFeature
+            feature_id = params[0] << 8 | params[1]
+            if feature_id not in self.features or (
+                feature_id in self.hidden_features and not self.hidden_enabled
+            ):
+                return [0, 0, 0]
+            return [self.feature_idx(feature_id), self.__feature_type(feature_id), 0]
+        if function == 1:  # getProtocolVersion
+            return [4, 2, params[2]]
+        raise HidppError(ERR_INVALID_FUNCTION_ID)
+
+    def _x0001(self, function, params):
+        if function == 0:  # getCount, root excluded
+            return [len(self.features) - 1]
+        if function == 1:  # getFeatureId
+            idx = params[0]
+            if idx >= len(self.features):
+                raise HidppError(ERR_OUT_OF_RANGE)
+            feature_id = self.features[idx]
+            return [feature_id >> 8, feature_id & 0xFF, self.__feature_type(feature_id), 0]
+        raise HidppError(ERR_INVALID_FUNCTION_ID)
+
+    def __feature_type(self, feature_id):
+        return FEATURE_ENGINEERING if feature_id in self.hidden_features else 0
+
+    def _x0003(self, function, params):
+        if function == 0:  # getDeviceInfo
+            return (
+                [1]
+                + list(self.unit_id.to_bytes(4, "big"))
+                + [0x00, 0x04]  # transport: usb
+                + list(self.pid.to_bytes(2, "big"))
+                + [0] * 4
+                + [0, 0x01]  # capabilities: serial number
+            )
+        if function == 1:  # getFwInfo
+            if params[0] != 0:
+                raise HidppError(ERR_OUT_OF_RANGE)
+            major, minor = self.fw_version
+            return (
+                [0]  # main application
+                + [ord(c) for c in self.fw_name[:3]]
+                + [major << 4 | minor, 0]
+                + list(self.fw_build.to_bytes(2, "big"))  # BCD
+                + [0x01]  # active
+                + list(self.pid.to_bytes(2, "big"))
+            )
+        if function == 2:  # getDeviceSerialNumber
+            return [ord(c) for c in self.serial_number[:12]]
+        raise HidppError(ERR_INVALID_FUNCTION_ID)
+
+    def _x0005(self, function, params):
+        if function == 0:  # getDeviceNameCount
+            return [len(self.name)]
+        if function == 1:  # getDeviceName
+            return [ord(c) for c in self.name[params[0] : params[0] + 16]]
+        if function == 2:  # getDeviceType
+            return list(self.device_type.to_bytes(4, "little"))
+        raise HidppError(ERR_INVALID_FUNCTION_ID)
+
+    def _x1E00(self, function, params):
+        if function == 0:  # getEnableHiddenFeatures
+            return [int(self.hidden_enabled)]
+        if function == 1:  # setEnableHiddenFeatures
+            self.hidden_enabled = bool(params[0])
+            return []
+        raise HidppError(ERR_INVALID_FUNCTION_ID)
+
+    def _x1E02(self, function, params):
+        if function == 0:  # getInfo
+            return [0b11, 0, self.deactivatable_state]
+        if function in (1, 2):  # disableFeatures, enableFeatures
+            if self.protected and not self.session_open:
+                raise HidppError(ERR_NOT_ALLOWED)
+            if function == 1:
+                self.deactivatable_state &= ~params[0] & 0xFF
+            else:
+                self.deactivatable_state |= params[0] & 0b11
+            return []
+        if function == 3:  # getReactInfo: authentication feature
+            return [0x16, 0x02]
+        raise HidppError(ERR_INVALID_FUNCTION_ID)
+
+    def _x1602(self, function, params):
+        if function == 0:  # startSession
+            return [0x01]
+        if function == 1:  # endSession
+            self.session_open = False
+            return [0x00]
+        if function in (2, 3):  # passwd0, passwd1
+            password = bytes(params).rstrip(b"\x00")
+            if self.password is not None and password != self.password:
+                raise HidppError(ERR_NOT_ALLOWED)
+            self.session_open = True
+            return [0x02]
+        raise HidppError(ERR_INVALID_FUNCTION_ID)
+
+    def _x1E22(self, function, params):
+        if function == 0:  # getNbDevices
+            return [1]
+        if function == 1:  # getSelectedDevice
+            device_id, access_config = self.selected_spi_device
+            return [device_id, access_config]
+        if function == 2:  # selectDevice
+            self.selected_spi_device = (params[0], params[1])
+            return []
+        if function == 3:  # spiDirectAccess
+            n_bytes = params[0]
+            if n_bytes > 15:
+                raise HidppError(ERR_INVALID_ARGUMENT)
+            return [n_bytes] + list(self.spi(list(params[1 : 1 + n_bytes])))
+        raise HidppError(ERR_INVALID_FUNCTION_ID)
+
+    def _x9402(self, function, params):
+        if function == 2:  # readMeasurement
+            return self.__measurement(params[0])
+        if function == 3:  # writeCalData: [0, nom, low, high] (LSB first)
+            self.calibration = [
+                params[1] | params[2] << 8,
+                params[3] | params[4] << 8,
+                params[5] | params[6] << 8,
+            ]
+            return []
+        if function == 4:  # readCalData
+            response = [params[0]]
+            for threshold in self.calibration:
+                response += [threshold & 0xFF, threshold >> 8 & 0xFF]
+            return response
+        if function == 5:  # monitorTest: [sensorIdx, count lo, hi], 0 stops the test
+            count = params[1] | params[2] << 8
+            if count:
+                self.start_monitor(count, params[0])
+            else:
+                # may be called from the monitor thread emitting, never joined there
+                self._monitor_stop.set()
+                self._monitor_thread = None
+            return []
+        raise HidppError(ERR_INVALID_FUNCTION_ID)
+
+    def _x19C0(self, function, params):
+        if function == 0:  # getCapabilities
+            return [len(self.buttons)]
+        button = params[0]
+        if button >= len(self.buttons):
+            raise HidppError(ERR_INVALID_ARGUMENT)
+        if function == 1:  # getButtonCapabilities
+            return [0x00, 0x03, 0x01, 0x90, 0x0F, 0xFF, 0x00, 0x10, 2]
+        if function == 2:  # getButtonConfig
+            return self.__thresholds(self.buttons[button])
+        if function == 3:  # setButtonConfig: MSB first
+            self.buttons[button] = [params[1] << 8 | params[2], params[3] << 8 | params[4]]
+            return [button] + self.__thresholds(self.buttons[button])
+        if function == 4:  # resetButtonConfig
+            self.buttons[button] = list(self.button_defaults[button])
+            return self.__thresholds(self.buttons[button])
+        raise HidppError(ERR_INVALID_FUNCTION_ID)
+
+    @staticmethod
+    def __thresholds(thresholds):
+        l1, l2 = thresholds
+        return [l1 >> 8, l1 & 0xFF, l2 >> 8, l2 & 0xFF]
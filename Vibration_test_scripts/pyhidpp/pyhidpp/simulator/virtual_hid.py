@@ -0,0 +1,336 @@
+"""
+Virtual hid backend
+
+drop-in replacement of the hidapi module serving VirtualDevice instances, over a
+link with configurable latency, jitter and packet loss:
+
+    backend = VirtualHid([VirtualDevice("Bravo")], LinkModel(latency_s=0.001))
+    backend.install()  # discovery and ConnectedDevice now see the virtual devices
+    ...
+    backend.uninstall()
+"""
+
+import heapq
+import itertools
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from threading import Condition, Lock, Thread
+
+from ..core import hid_backend
+from ..core.request import REPORT_IDS
+from .virtual_device import VirtualDevice
+
+LEGACY_USAGE_PAGE = 0xFF00
+SHORT_USAGE = 1
+LONG_USAGE = 2
+# input reports buffered per opened handle, newer reports are dropped when full
+# (as the hidraw kernel buffer)
+HANDLE_BUFFER_SIZE = 64
+
+
+@dataclass
+class LinkModel:
+    latency_s: float = 0.0
+    jitter_s: float = 0.0  # uniform, added to the latency
+    loss: float = 0.0  # probability for a report to be lost, in each direction
+    seed: int | None = None
+
+
+class _Endpoint:
+    """
+    short or long endpoint of a virtual device, fanning input reports out to all
+    the handles opened on it
+    """
+
+    def __init__(self, device: VirtualDevice, path: bytes, usage: int):
+        self.device = device
+        self.path = path
+        self.usage = usage
+        self.handles = set()
+        self.lock = Lock()
+        # due time of the last response, reports of the link are kept in order
+        self.last_due = 0.0
+
+    def deliver(self, data: bytes):
+        with self.lock:
+            handles = list(self.handles)
+        for handle in handles:
+            handle._push(data)
+
+    def info(self):
+        return {
+            "path": self.path,
+            "vendor_id": self.device.vid,
+            "product_id": self.device.pid,
+            "serial_number": self.device.serial_number,
+            "release_number": 0,
+            "manufacturer_string": "Logitech",
+            "product_string": self.device.name,
+            "usage_page": LEGACY_USAGE_PAGE,
+            "usage": self.usage,
+            "interface_number": 2,
+        }
+
+
+class VirtualHandle:
+    """
+    hid.device equivalent, opened on a virtual endpoint
+    """
+
+    def __init__(self, backend: "VirtualBackend"):
+        self._backend = backend
+        self._endpoint: _Endpoint | None = None
+        self._nonblocking = False
+        self._ready = deque()
+        self._cond = Condition()
+
+    def open_path(self, path):
+        endpoint = self._backend._endpoints.get(path)
+        if endpoint is None:
+            raise OSError("open failed")
+        self._endpoint = endpoint
+        with endpoint.lock:
+            endpoint.handles.add(self)
+        self._backend._opened(endpoint)
+
+    def set_nonblocking(self, v):
+        self._nonblocking = bool(v)
+        return 0
+
+    def read(self, max_length, timeout_ms=0):
+        if self._endpoint is None:
+            raise ValueError("not open")
+        if timeout_ms > 0:
+            timeout = timeout_ms / 1000
+        elif self._nonblocking:
+            timeout = 0
+        else:
+            timeout = None
+        with self._cond:
+            if not self._ready and timeout != 0:
+                self._cond.wait_for(lambda: self._ready, timeout)
+            if not self._ready:
+                return []
+            data = self._ready.popleft()
+        return list(data[:max_length])
+
+    def write(self, buff):
+        if self._endpoint is None:
+            raise ValueError("not open")
+        data = bytes(buff)
+        self._backend._write(self._endpoint.device, data)
+        return len(data)
+
+    def close(self):
+        endpoint = self._endpoint
+        if endpoint is None:
+            return
+        with endpoint.lock:
+            endpoint.handles.discard(self)
+        self._endpoint = None
+
+    def _push(self, data):
+        with self._cond:
+            if len(self._ready) < HANDLE_BUFFER_SIZE:
+                self._ready.append(data)
+                self._cond.notify()
+
+
+class VirtualBackend:
+    """
+    hid module equivalent (enumerate, device) serving the short and long endpoints
+    of virtual devices, to be selected with install() (see hid_backend)
+
+    a device only needs vid, pid, name and serial_number attributes, subclasses
+    handle the written reports (_write)
+    """
+
+    def __init__(self):
+        self.devices = []
+        self._endpoints: dict[bytes, _Endpoint] = {}
+        self._endpoints_by_device: dict[int, tuple[_Endpoint, _Endpoint]] = {}
+        self._installed = False
+        # unique in the endpoint paths, a path is never reused
+        self._device_ids = itertools.count()
+
+    def _add_endpoints(self, device):
+        idx = next(self._device_ids)
+        self.devices.append(device)
+        endpoints = tuple(
+            _Endpoint(
+                device,
+                "virtual#{:04x}#{}{}#{}".format(device.pid, idx, usage, kind).encode(),
+                usage,
+            )
+            for usage, kind in ((SHORT_USAGE, "short"), (LONG_USAGE, "long"))
+        )
+        for endpoint in endpoints:
+            self._endpoints[endpoint.path] = endpoint
+        self._endpoints_by_device[id(device)] = endpoints
+
+    def _remove_endpoints(self, device):
+        self.devices.remove(device)
+        for endpoint in self._endpoints_by_device.pop(id(device)):
+            del self._endpoints[endpoint.path]
+
+    def _endpoint_for(self, device, report_id) -> _Endpoint:
+        short, long = self._endpoints_by_device[id(device)]
+        return short if report_id == REPORT_IDS["SHORT"] else long
+
+    def _opened(self, endpoint: _Endpoint):
+        """
+        called when a handle is opened on endpoint
+        """
+
+    def _write(self, device, data: bytes):
+        raise NotImplementedError
+
+    def install(self):
+        self._installed = True
+        hid_backend.set_backend(self)
+        return self
+
+    def uninstall(self):
+        hid_backend.set_backend(None)
+        self._installed = False
+
+    def __enter__(self):
+        return self.install()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.uninstall()
+
+    """ HID MODULE API
+    """
+
+    def enumerate(self, vendor_id=0, product_id=0):
+        return [
+            endpoint.info()
+            for endpoint in self._endpoints.values()
+            if vendor_id in (0, endpoint.device.vid)
+            and product_id in (0, endpoint.device.pid)
+        ]
+
+    def device(self):
+        return VirtualHandle(self)
+
+
+class VirtualHid(VirtualBackend):
+    """
+    VirtualBackend serving VirtualDevice instances over a simulated link
+    """
+
+    def __init__(self, devices: list[VirtualDevice] = (), link: LinkModel = None):
+        super().__init__()
+        self.link = link or LinkModel()
+        self._random = random.Random(self.link.seed)
+
+        # reports to deliver later (latency), served by the scheduler thread
+        self._pending = []
+        self._seq = itertools.count()
+        self._cond = Condition()
+        self._scheduler = None
+        self._running = False
+
+        for device in devices:
+            self.add_device(device)
+
+    def add_device(self, device: VirtualDevice):
+        self._add_endpoints(device)
+        if self._installed:
+            device.attach(self.__emitter(device))
+
+    def remove_device(self, device: VirtualDevice):
+        """
+        unplug device: its endpoints are not enumerated anymore
+        """
+        self._remove_endpoints(device)
+        device.detach()
+
+    def install(self):
+        for device in self.devices:
+            device.attach(self.__emitter(device))
+        return super().install()
+
+    def uninstall(self):
+        super().uninstall()
+        for device in self.devices:
+            device.detach()
+        self.__stop_scheduler()
+
+    """ LINK
+    """
+
+    def _write(self, device: VirtualDevice, data: bytes):
+        if self.__lost():
+            return
+        report = device.handle_report(data)
+        if report is not None:  # not answered
+            self.__send(device, report, 0.0)
+
+    def __emitter(self, device):
+        def emit(report, delay_s):
+            self.__send(device, report, delay_s)
+
+        return emit
+
+    def __lost(self):
+        return self.link.loss > 0 and self._random.random() < self.link.loss
+
+    def __send(self, device, report, delay_s):
+        endpoint = self._endpoint_for(device, report.report_id)
+        data = bytes(report)
+
+        if self.__lost():
+            return
+
+        latency = self.link.latency_s
+        if self.link.jitter_s:
+            latency += self._random.uniform(0, self.link.jitter_s)
+        if latency == 0 and delay_s == 0:
+            endpoint.deliver(data)
+            return
+
+        due = time.monotonic() + latency + delay_s
+        if delay_s == 0:
+            # responses are not reordered by the jitter
+            with endpoint.lock:
+                due = max(due, endpoint.last_due)
+                endpoint.last_due = due
+        with self._cond:
+            heapq.heappush(self._pending, (due, next(self._seq), endpoint, data))
+            if self._scheduler is None:
+                self._running = True
+                self._scheduler = Thread(target=self.__schedule, daemon=True)
+                self._scheduler.start()
+            self._cond.notify()
+
+    def __schedule(self):
+        """
+        deliver the pending reports when due, to run in a dedicated thread
+        """
+        while True:
+            with self._cond:
+                while self._running and (
+                    not self._pending or self._pending[0][0] > time.monotonic()
+                ):
+                    timeout = (
+                        self._pending[0][0] - time.monotonic() if self._pending else None
+                    )
+                    self._cond.wait(timeout)
+                if not self._running:
+                    return
+                _, _, endpoint, data = heapq.heappop(self._pending)
+            endpoint.deliver(data)
+
+    def __stop_scheduler(self):
+        with self._cond:
+            self._running = False
+            self._pending = []
+            self._cond.notify()
+            scheduler = self._scheduler
+            self._scheduler = None
+        if scheduler is not None:
+            scheduler.join()
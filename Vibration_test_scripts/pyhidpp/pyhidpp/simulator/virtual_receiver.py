@@ -0,0 +1,126 @@
+"""
+Virtual receiver
+
+HIDPP 1.0 model of a Unifying or Bolt receiver answering the register reads of the
+discovery (see discovery.probe_receiver), to be served by VirtualHid:
+
+    receiver = VirtualReceiver("Bolt", pid=0xC548, paired={1: VirtualDevice("Bravo")})
+    backend = VirtualHid([receiver])
+"""
+
+from ..core.request import HIDPPRequest
+from ..core.utils import BLE_PRO_RECEIVER_PID, BOLT_DEVICE_TYPE, DEVICE_TYPE
+from .virtual_device import VirtualDevice
+
+# HIDPP 1.0 long register read and error report
+GET_LONG_REGISTER = 0x83
+ERROR_MSG = 0x8F
+PAIRING_INFO_REGISTER = 0xB5
+# sub-registers of PAIRING_INFO_REGISTER, + slot (Unifying: + slot - 1)
+UNIFYING_NAME = 0x40
+BOLT_PAIRING_INFO = 0x50
+BOLT_NAME = 0x60
+
+# HIDPP 1.0 error codes
+ERR_INVALID_ADDRESS = 0x02
+ERR_INVALID_PARAM_VALUE = 0x0B
+
+_BOLT_TYPE_BY_NAME = {name: code for code, name in BOLT_DEVICE_TYPE.items()}
+
+
+class VirtualReceiver:
+    """
+    receiver answering the pairing information and name reads of the paired slots,
+    the empty slots answer with an HIDPP 1.0 error (or not at all with
+    silent_errors). paired: slot (1 to 6) -> device, only described by the
+    receiver: requests to the paired devices are not forwarded
+    """
+
+    def __init__(
+        self,
+        name="Unifying",
+        pid=0xC52B,
+        vid=0x046D,
+        paired: dict[int, VirtualDevice] = None,
+        serial_number="",
+        silent_errors=False,
+    ):
+        self.name = name
+        self.pid = pid
+        self.vid = vid
+        self.paired = dict(paired or {})
+        self.serial_number = serial_number
+        self.silent_errors = silent_errors
+        self.requests_count = 0
+        self._emit = None
+
+    @property
+    def is_bolt(self):
+        return self.pid in BLE_PRO_RECEIVER_PID
+
+    def attach(self, emit):
+        self._emit = emit
+
+    def detach(self):
+        self._emit = None
+
+    def handle_report(self, report) -> HIDPPRequest | None:
+        """
+        process a request written by the host, return the response (or error)
+        report, None for a silent error
+        """
+        req = HIDPPRequest.from_report(report)
+        self.requests_count += 1
+        register = req.function << 4 | req.sw_id
+        if req.feature != GET_LONG_REGISTER or register != PAIRING_INFO_REGISTER:
+            return self.__error(req, ERR_INVALID_ADDRESS)
+
+        sub_register = req.params[0]
+        params = self.__read(sub_register)
+        if params is None:
+            if self.silent_errors:
+                return None
+            return self.__error(req, ERR_INVALID_PARAM_VALUE)
+        return HIDPPRequest(
+            req.dev_idx,
+            GET_LONG_REGISTER,
+            PAIRING_INFO_REGISTER >> 4,
+            PAIRING_INFO_REGISTER & 0x0F,
+            [sub_register, *params],
+        )
+
+    def __read(self, sub_register):
+        kind, slot = sub_register & 0xF0, sub_register & 0x0F
+        if self.is_bolt:
+            device = self.paired.get(slot)
+            if device is None:
+                return None
+            if kind == BOLT_PAIRING_INFO:
+                device_type = DEVICE_TYPE.get(device.device_type)
+                return [
+                    _BOLT_TYPE_BY_NAME.get(device_type, 0),
+                    device.pid & 0xFF,
+                    device.pid >> 8,
+                ]
+            if kind == BOLT_NAME:
+                name = device.name.encode()
+                return [1, len(name), *name]
+            return None
+
+        device = self.paired.get(slot + 1)
+        if device is None or kind != UNIFYING_NAME:
+            return None
+        name = device.name.encode()
+        return [len(name), *name]
+
+    @staticmethod
+    def __error(req, code):
+        # [0x10, dev_idx, 0x8F, sub id, address, error code, 0]
+        return HIDPPRequest(
+            req.dev_idx,
+            ERROR_MSG,
+            req.feature >> 4,
+            req.feature & 0x0F,
+            [req.function << 4 | req.sw_id, code, 0],
+            "SHORT",
+        )
@@ -18,14 +18,22 @@ import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
-from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QPushButton, QHBoxLayout, QLabel, QLineEdit, QGroupBox
+from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QPushButton, QHBoxLayout, QLabel, QLineEdit, QGroupBox, QFileDialog
 from PyQt5.QtCore import QTimer
 from PyQt5.QtGui import QFont
-from collections import deque
 from pyhidpp.core.devices_manager import DevicesManager
 from pyhidpp.security import SecurityManager
 from pyhidpp.features.x9402 import X9402
 from pyhidpp.features.x19c0 import X19C0
+from pyhidpp.acquisition import (
+    MinMaxPyramid,
+    SampleStatistics,
+    SampleStore,
+    StoreRecorder,
+    X9402MonitorStream,
+    X9402Sampler,
+)
+import datetime
 import logging
 import time
 
@@ -41,8 +49,6 @@ class MatplotlibCanvas(FigureCanvas):
         # Create figure with 3 subplots for comprehensive x9402 data display
         self.fig, self.axs = plt.subplots(3, 1, figsize=(width, height), dpi=dpi)
         super(MatplotlibCanvas, self).__init__(self.fig)
-        self.x_data_arr = []
-        self.y_data_arr = []
         self.lines = []
         self.max_points = 200
         
@@ -64,8 +70,6 @@ class MatplotlibCanvas(FigureCanvas):
         for i, ax in enumerate(self.axs):
             ax.set_xlim(0, 100)
             ax.set_ylim(-100, 600)
-            self.x_data_arr.append(deque(maxlen=self.max_points))
-            self.y_data_arr.append(deque(maxlen=self.max_points))
             line, = ax.plot([], [], '-', linewidth=1.5)
             self.lines.append(line)
 
@@ -83,8 +87,16 @@ class BravoSensorWindow(QMainWindow):
 
         # Initialize variables
         self.mouse = None
+        self.dev_manager = None
         self.sensing_feature = None
         self.force_sensing_feature = None
+        self.sampler = None  # background x9402 acquisition, the timer only redraws
+        # acquisition recorded on request (Record button) to a new store in
+        # record_dir, decimated for the history view
+        self.record_dir = None
+        self.store = None
+        self.recorder = None
+        self.pyramid = None
         self.counter = 0
         self.sensor_available = False
         
@@ -105,8 +117,12 @@ class BravoSensorWindow(QMainWindow):
         
         # Add matplotlib canvas
         self.canvas = MatplotlibCanvas(self)
+        # running statistics, window of the plotted points (autoscale, noise floor)
+        self.stats = SampleStatistics(window=self.canvas.max_points)
         layout.addWidget(self.canvas)
         
+        self.canvas.axs[0].callbacks.connect('xlim_changed', self.on_xlim_changed)
+
         # Add matplotlib toolbar
         toolbar = NavigationToolbar(self.canvas, self)
         layout.addWidget(toolbar)
@@ -134,17 +150,27 @@ class BravoSensorWindow(QMainWindow):
         self.stop_button = QPushButton("Stop")
         self.clear_button = QPushButton("Clear")
         self.connect_button = QPushButton("Reconnect")
+        self.record_button = QPushButton("Record")
+        self.record_button.setCheckable(True)
+        self.record_button.setToolTip("Record the acquisition to a folder (for the history view)")
+        self.history_button = QPushButton("History")
+        self.history_button.setCheckable(True)
+        self.history_button.setToolTip("Show the whole recorded acquisition (zoom/pan with the toolbar)")
         
         self.start_button.clicked.connect(self.start_data_acquisition)
         self.stop_button.clicked.connect(self.stop_data_acquisition)
         self.clear_button.clicked.connect(self.clear_data)
         self.connect_button.clicked.connect(self.connect_device)
+        self.record_button.toggled.connect(self.toggle_recording)
+        self.history_button.toggled.connect(self.toggle_history)
         
         button_layout.addWidget(self.status_label)
         button_layout.addWidget(self.connect_button)
         button_layout.addWidget(self.start_button)
         button_layout.addWidget(self.stop_button)
         button_layout.addWidget(self.clear_button)
+        button_layout.addWidget(self.record_button)
+        button_layout.addWidget(self.history_button)
         layout.addLayout(button_layout)
         
         # Add calibration group box
@@ -175,7 +201,19 @@ class BravoSensorWindow(QMainWindow):
         
         layout.addWidget(calibration_group)
         
-        # Setup timer for data updates
+        # Running statistics (noise floor, drift)
+        stats_group = QGroupBox("Statistics")
+        stats_layout = QHBoxLayout(stats_group)
+        self.stats_label = QLabel("No data")
+        self.stats_label.setToolTip(
+            "σ: standard deviation of the last plotted samples, drift: EWMA minus the mean "
+            "of the first samples"
+        )
+        stats_layout.addWidget(self.stats_label)
+        stats_layout.addStretch()
+        layout.addWidget(stats_group)
+        
+        # Setup timer for plot updates (samples are acquired by self.sampler)
         self.timer = QTimer(self)
         self.timer.timeout.connect(self.update_plot)
         self.update_interval = 100  # milliseconds
@@ -330,6 +368,7 @@ class BravoSensorWindow(QMainWindow):
         # Stop any running timers first
         if hasattr(self, 'timer') and self.timer.isActive():
             self.timer.stop()
+        self.stop_sampler()
         
         # ENHANCED CLEANUP: Handle dongle unplug crashes and thread recovery
         if hasattr(self, 'mouse') and self.mouse:
@@ -375,10 +414,11 @@ class BravoSensorWindow(QMainWindow):
         print("   USB recovery completed")
         
         try:
-            # Step 1: Create FRESH DevicesManager (rescans USB devices)
-            print(" Creating fresh device manager (USB rescan)...")
-            dev_manager = DevicesManager(log_to_console=False, log_level=logging.WARNING)
-            print("   USB device scan completed")
+            # Step 1: Device manager, devices looked up on demand by connect_with_name
+            # (USB rescan, direct devices first, receivers probed only if needed)
+            if self.dev_manager is None:
+                self.dev_manager = DevicesManager(log_to_console=False, log_level=logging.WARNING, lazy=True)
+            dev_manager = self.dev_manager
             compatible_devices = ["Bravo", "Malacca", "Spotlight 2", "SPOTLIGHT 2"]
             
             connection_attempts = 0
@@ -689,18 +729,145 @@ class BravoSensorWindow(QMainWindow):
             self.canvas.fig.canvas.draw()
             print(f"Plot setup complete - ADC range: [-50, 600], Baseline range: [{bl-20}, {bl+20}]")
             
-            # Start timer
+            # Start background acquisition, the timer only redraws
+            self.stop_sampler()
+            # store opened first: a failure only disables the recording
+            if self.record_button.isChecked():
+                self.open_store()
+            # monitorTest notifications if the firmware streams, else polling
+            self.sampler = X9402MonitorStream(self.mouse)
+            if not self.sampler.start():
+                print(" Monitor mode not available, polling readMeasurement")
+                self.sampler = X9402Sampler(self.mouse)
+                self.sampler.start()
+            self.start_recording()
+            self.stats.reset()
             self.timer.start(self.update_interval)
             self.start_button.setEnabled(False)
             self.stop_button.setEnabled(True)
-            self.status_label.setText(" Acquiring data...")
+            self.status_label.setText(" Acquiring data (recording)..." if self.recorder else " Acquiring data...")
             
         except Exception as e:
             print(f" Start error: {e}")
+            self.timer.stop()
+            self.stop_sampler()
+            self.start_button.setEnabled(True)
+            self.stop_button.setEnabled(False)
             self.status_label.setText(f" Start error: {e}")
 
+    def stop_sampler(self):
+        if self.sampler is not None:
+            self.sampler.stop()
+            self.sampler = None
+        if self.recorder is not None:
+            self.recorder.stop()
+            self.recorder = None
+
+    def toggle_recording(self, checked):
+        """Record button: choose the folder, record from now on if acquiring"""
+        if not checked:
+            if self.recorder is not None:
+                self.recorder.stop()
+                self.recorder = None
+                logging.info("Recording stopped (%d samples in %s)", len(self.store), self.store.path)
+                if self.sampler is not None:
+                    self.status_label.setText(" Acquiring data...")
+            return
+        folder = QFileDialog.getExistingDirectory(
+            self, "Record to folder", self.record_dir or os.path.expanduser("~")
+        )
+        if not folder:
+            self.record_button.setChecked(False)
+            return
+        self.record_dir = folder
+        if self.sampler is not None and self.open_store():
+            self.start_recording()
+
+    def open_store(self):
+        """New sample store in record_dir, recording disabled if it can not be created"""
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+        path = os.path.join(self.record_dir, datetime.datetime.now().strftime("viewer_%Y%m%d_%H%M%S"))
+        try:
+            self.store = SampleStore(path)
+            self.store.set_attributes(device="Bravo", version=__version__)
+        except (OSError, ValueError) as e:
+            logging.warning("Recording disabled, could not create %s: %s", path, e)
+            self.status_label.setText(" Recording disabled")
+            self.store = None
+            self.uncheck_record_button()
+            return False
+        self.pyramid = MinMaxPyramid(self.store)
+        return True
+
+    def uncheck_record_button(self):
+        # without asking for a folder again (toggle_recording)
+        self.record_button.blockSignals(True)
+        self.record_button.setChecked(False)
+        self.record_button.blockSignals(False)
+
+    def start_recording(self):
+        """Record the acquisition to the store opened by open_store, for the history view"""
+        if self.store is None or not self.record_button.isChecked():
+            return
+        self.recorder = StoreRecorder(self.sampler.ring, self.store)
+        self.recorder.start()
+        logging.info("Recording to %s", self.store.path)
+        self.status_label.setText(" Acquiring data (recording)...")
+
+    def update_stats_label(self):
+        adc, bl, pl = self.stats["adc"], self.stats["baseline"], self.stats["preload"]
+        if adc.count == 0:
+            self.stats_label.setText("No data")
+            return
+        drift = f"{bl.drift:+.1f}" if bl.drift is not None else "n/a"
+        self.stats_label.setText(
+            f"ADC: mean {adc.window_mean:.1f}, σ {adc.window_std:.2f}, "
+            f"p1/p99 {adc.percentile(1)}/{adc.percentile(99)} | "
+            f"Baseline: {bl.ewma:.1f}, σ {bl.window_std:.2f}, drift {drift} | "
+            f"Preload: {pl.window_mean:.1f} | {adc.count} samples"
+        )
+
+    def toggle_history(self, checked):
+        # sample number axis when live, seconds since the start in history
+        self.canvas.axs[2].set_xlabel('Time (s)' if checked else 'Sample Number')
+        if checked and self.store is not None and self.store.time_range is not None:
+            first, last = self.store.time_range
+            for ax in self.canvas.axs:
+                ax.set_xlim(0, max((last - first) / 1e9, 1.0))
+            self.update_history_plot()
+        else:
+            self.update_plot()
+
+    def on_xlim_changed(self, ax):
+        # toolbar zoom/pan in the history view: decimate the new time range
+        if self.history_button.isChecked():
+            self.update_history_plot()
+
+    def update_history_plot(self):
+        """Plot the min/max envelope of the recorded samples in the visible time range"""
+        if self.store is None or self.store.time_range is None:
+            return
+        first, last = self.store.time_range
+        x_min, x_max = self.canvas.axs[0].get_xlim()
+        width_px = int(self.canvas.axs[0].bbox.width)
+        points = self.pyramid.decimate(
+            first + int(x_min * 1e9), first + int(x_max * 1e9) + 1, max(2 * width_px, 100)
+        )
+        if len(points) == 0:
+            return
+        x_data = (points["t_ns"] - first) / 1e9
+        for line, name in zip(self.canvas.lines, ("adc", "baseline", "preload")):
+            line.set_data(x_data, points[name])
+        self.status_label.setText(
+            f" History: {len(self.store)} samples, {(last - first) / 1e9:.0f} s ({len(points)} points shown)"
+        )
+        self.canvas.fig.canvas.draw_idle()
+
     def stop_data_acquisition(self):
         self.timer.stop()
+        self.stop_sampler()
         self.start_button.setEnabled(True)
         self.stop_button.setEnabled(False)
         self.status_label.setText(" Stopped")
@@ -708,9 +875,10 @@ class BravoSensorWindow(QMainWindow):
     def clear_data(self):
         # Clear all three subplots (ADC, Baseline, Preload)
         for i in range(len(self.canvas.axs)):
-            self.canvas.x_data_arr[i].clear()
-            self.canvas.y_data_arr[i].clear()
             self.canvas.lines[i].set_data([], [])
+        if self.sampler is not None:
+            self.sampler.ring.clear()
+        self.stats.reset()
         self.counter = 0
         
         # Clear and re-add threshold lines
@@ -747,55 +915,43 @@ class BravoSensorWindow(QMainWindow):
         self.canvas.fig.canvas.draw()
 
     def update_plot(self):
-        if not self.sensor_available or not self.sensing_feature:
+        if not self.sensor_available or not self.sensing_feature or self.sampler is None:
             return
             
         try:
-            self.counter += 1
-            measurement_result = self.sensing_feature.read_measurement(0)
-            
-            # Add detailed logging every 10th reading to avoid spam
-            if self.counter % 10 == 0:
-                print(f"Reading #{self.counter}: {measurement_result}")
-            
-            if measurement_result is None:
+            if self.sampler.failed:
                 print("Sensor communication lost")
                 self.stop_data_acquisition()
                 self.status_label.setText(" Sensor communication lost")
                 return
+            if self.recorder is not None and self.recorder.failed:
+                # acquisition goes on, see the log for the write error
+                self.recorder = None
+                self.uncheck_record_button()
+                self.status_label.setText(" Recording failed")
             
-            # Handle different result formats
-            try:
-                if isinstance(measurement_result, (list, tuple)) and len(measurement_result) >= 3:
-                    new_measurement, bl, pl = measurement_result
-                else:
-                    # Handle single value or unexpected format
-                    new_measurement = measurement_result if isinstance(measurement_result, (int, float)) else 0
-                    bl = 0
-                    pl = 0
-                    if self.counter % 10 == 0:  # Log format issue occasionally
-                        print(f"Note: Using single value {new_measurement} from {measurement_result}")
-            except Exception as e:
-                print(f"Error unpacking measurement: {e}")
-                new_measurement, bl, pl = 0, 0, 0
-            
-            # Add data to all three plot arrays (ADC, Baseline, Preload)
-            self.canvas.x_data_arr[0].append(self.counter)
-            self.canvas.y_data_arr[0].append(new_measurement)
-            self.canvas.x_data_arr[1].append(self.counter)
-            self.canvas.y_data_arr[1].append(bl)
-            self.canvas.x_data_arr[2].append(self.counter)
-            self.canvas.y_data_arr[2].append(pl)
-            
-            # Debug: Print data being added every 10th reading
-            if self.counter % 10 == 0:
-                print(f"Plot Update #{self.counter}: ADC={new_measurement}, BL={bl}")
-                print(f"  Array lengths: ADC={len(self.canvas.x_data_arr[0])}, BL={len(self.canvas.x_data_arr[1])}")
-                print(f"  X data range: {min(self.canvas.x_data_arr[0]) if self.canvas.x_data_arr[0] else 'empty'} to {max(self.canvas.x_data_arr[0]) if self.canvas.x_data_arr[0] else 'empty'}")
-                print(f"  ADC range: {min(self.canvas.y_data_arr[0]) if self.canvas.y_data_arr[0] else 'empty'} to {max(self.canvas.y_data_arr[0]) if self.canvas.y_data_arr[0] else 'empty'}")
+            # Samples acquired since the last tick into the running statistics
+            ring = self.sampler.ring
+            self.stats.follow(ring)
+            self.update_stats_label()
+
+            if self.history_button.isChecked():
+                self.update_history_plot()
+                return
+
+            # Snapshot of the last samples acquired by the sampler thread
+            start, rows = ring.snapshot(self.canvas.max_points)
+            if len(rows) == 0:
+                return
+            x_data = np.arange(start - ring.first + 1, start - ring.first + 1 + len(rows))
+            y_data_adc = rows["adc"]
+            y_data_bl = rows["baseline"]
+            y_data_pl = rows["preload"]
+            self.counter = int(x_data[-1])
+            new_measurement, bl, pl = int(y_data_adc[-1]), int(y_data_bl[-1]), int(y_data_pl[-1])
             
             # Update status with sensitivity info if available
-            status_text = f" #{self.counter} ADC: {new_measurement}, BL: {bl}, PL: {pl}"
+            status_text = f" #{self.counter} ADC: {new_measurement}, BL: {bl}, PL: {pl} ({self.sampler.rate():.0f} Hz)"
             if self.sensitivity_adc_per_n is not None:
                 # Convert current ADC to force in Newtons
                 force_n = new_measurement / self.sensitivity_adc_per_n
@@ -804,16 +960,9 @@ class BravoSensorWindow(QMainWindow):
             self.status_label.setText(status_text)
             
             # Update plot lines with current data for all three subplots
-            x_data_adc = list(self.canvas.x_data_arr[0])
-            y_data_adc = list(self.canvas.y_data_arr[0])
-            x_data_bl = list(self.canvas.x_data_arr[1])
-            y_data_bl = list(self.canvas.y_data_arr[1])
-            x_data_pl = list(self.canvas.x_data_arr[2])
-            y_data_pl = list(self.canvas.y_data_arr[2])
-            
-            self.canvas.lines[0].set_data(x_data_adc, y_data_adc)
-            self.canvas.lines[1].set_data(x_data_bl, y_data_bl)
-            self.canvas.lines[2].set_data(x_data_pl, y_data_pl)
+            self.canvas.lines[0].set_data(x_data, y_data_adc)
+            self.canvas.lines[1].set_data(x_data, y_data_bl)
+            self.canvas.lines[2].set_data(x_data, y_data_pl)
             
             # Adjust x limits for scrolling effect
             if self.counter >= self.canvas.max_points:
@@ -827,12 +976,10 @@ class BravoSensorWindow(QMainWindow):
             for ax in self.canvas.axs:
                 ax.set_xlim(x_min, x_max)
             
-            # Auto-scale Y axis occasionally to handle dynamic range, including thresholds
-            if self.counter % 20 == 0 and len(y_data_adc) > 10:
-                # Auto-scale ADC plot based on recent data (last 20 points)
-                recent_adc = y_data_adc[-20:]
-                adc_min = min(recent_adc)
-                adc_max = max(recent_adc)
+            # Auto-scale Y axis to the plotted samples (statistics window), including thresholds
+            if len(y_data_adc) > 10:
+                adc_min = self.stats["adc"].percentile(0)
+                adc_max = self.stats["adc"].percentile(100)
                 
                 # Include threshold values in range calculation to ensure they're always visible
                 values_to_include = [adc_min, adc_max]
@@ -849,15 +996,13 @@ class BravoSensorWindow(QMainWindow):
                 
                 self.canvas.axs[0].set_ylim(final_min - margin, final_max + margin)
                 
-                # Auto-scale Baseline plot based on recent data (last 20 points)
-                if len(y_data_bl) > 10:
-                    recent_bl = y_data_bl[-20:]
-                    bl_min = min(recent_bl)
-                    bl_max = max(recent_bl)
-                    bl_range = bl_max - bl_min
-                    bl_margin = max(10, bl_range * 0.2)  # At least 10 units margin, 20% of range
-                    
-                    self.canvas.axs[1].set_ylim(bl_min - bl_margin, bl_max + bl_margin)
+                # Auto-scale Baseline plot to the plotted samples
+                bl_min = self.stats["baseline"].percentile(0)
+                bl_max = self.stats["baseline"].percentile(100)
+                bl_range = bl_max - bl_min
+                bl_margin = max(10, bl_range * 0.2)  # At least 10 units margin, 20% of range
+                
+                self.canvas.axs[1].set_ylim(bl_min - bl_margin, bl_max + bl_margin)
                 
                 if self.counter % 40 == 0:  # Less frequent debug
                     threshold_info = ""
@@ -869,13 +1014,7 @@ class BravoSensorWindow(QMainWindow):
                     print(f"  Auto-scaled ADC: [{final_min - margin:.0f}, {final_max + margin:.0f}]{threshold_info}")
                     
                     # Debug info for baseline auto-scaling
-                    if len(y_data_bl) > 10:
-                        recent_bl = y_data_bl[-20:]
-                        bl_min = min(recent_bl)
-                        bl_max = max(recent_bl)
-                        bl_range = bl_max - bl_min
-                        bl_margin = max(10, bl_range * 0.2)
-                        print(f"  Auto-scaled Baseline: [{bl_min - bl_margin:.1f}, {bl_max + bl_margin:.1f}]")
+                    print(f"  Auto-scaled Baseline: [{bl_min - bl_margin:.1f}, {bl_max + bl_margin:.1f}]")
 
             # Force canvas redraw
             self.canvas.fig.canvas.draw_idle()  # Use draw_idle for better performance
@@ -889,6 +1028,9 @@ class BravoSensorWindow(QMainWindow):
         """Handle window close event with cleanup"""
         print("Window closing, performing cleanup...")
         self.timer.stop()
+        self.stop_sampler()
+        if self.store is not None:
+            self.store.close()
         if self.mouse:
             self.mouse.disconnect()
 
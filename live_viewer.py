@@ -81,6 +81,8 @@ class LivePlotWindow(QMainWindow):
         self.timerCon = QTimer(self)
         self.timerCon.timeout.connect(self.reconnect)
         self.update_interval = 10  # milliseconds
+        # kept between reconnections, refreshed on each attempt
+        self.dev_manager = None
         
         # Initialize data counter
         self.counter = 0
@@ -181,9 +183,12 @@ class LivePlotWindow(QMainWindow):
         self.mouse.disconnect()
 
     def reconnect(self):
+        if self.dev_manager is None:
+            # devices looked up on demand by connect_with_name (USB rescan each time)
+            self.dev_manager = DevicesManager(log_to_console=False,log_level=logging.ERROR, lazy=True)
+        dev_manager = self.dev_manager
         for i in range(50):
             time.sleep(0.1)
-            dev_manager = DevicesManager(log_to_console=False,log_level=logging.ERROR)
             compatible_mice = ["Malacca", "Bravo"]
             for mouse_name in compatible_mice:
                 self.mouse = dev_manager.connect_with_name(mouse_name)
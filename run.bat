@@ -72,7 +72,7 @@ echo.
 echo Options:
 echo   --test              Run sensor tests only
 echo   --dev, --development Run in development mode
-echo   --console           Run without GUI
+echo   --console           Headless capture to captures/ (no GUI)
 echo   -h, --help, /?      Show this help message
 echo.
 echo Examples:
@@ -125,8 +125,8 @@ if "%MODE%"=="dev" (
 )
 
 if "%MODE%"=="console" (
-    echo 💻 Running console application...
-    %DOCKER_COMPOSE% run --rm %SERVICE% python simple_sensor_test.py
+    echo 💻 Running headless capture (Ctrl+C to stop)...
+    %DOCKER_COMPOSE% run --rm %SERVICE% python sensor_capture.py
 )
 
 echo ✨ Done!
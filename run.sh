@@ -99,7 +99,7 @@ while [[ $# -gt 0 ]]; do
             echo "Options:"
             echo "  --test              Run sensor tests only"
             echo "  --dev, --development Run in development mode"
-            echo "  --console           Run without GUI"
+            echo "  --console           Headless capture to captures/ (no GUI)"
             echo "  -h, --help          Show this help message"
             echo ""
             echo "Examples:"
@@ -149,8 +149,8 @@ case $MODE in
         $DOCKER_COMPOSE --profile development up --remove-orphans $SERVICE
         ;;
     "console")
-        echo -e "${BLUE}💻 Running console application...${NC}"
-        $DOCKER_COMPOSE run --rm $SERVICE python simple_sensor_test.py
+        echo -e "${BLUE}💻 Running headless capture (Ctrl+C to stop)...${NC}"
+        $DOCKER_COMPOSE run --rm $SERVICE python sensor_capture.py
         ;;
 esac
 
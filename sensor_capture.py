@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Headless sensor capture: x9402 measurements at the maximum rate into a sample store
+
+    python sensor_capture.py --output captures/line3 --duration 28800 --segment-minutes 10
+
+samples go to rotating chunk files of a SampleStore (pyhidpp.acquisition), read
+them back with SampleStore(path).window(t0_ns, t1_ns). Throughput, dropped samples
+and round trip times are reported on stderr every --stats-period seconds.
+Stops after --duration, on Ctrl+C or SIGTERM.
+
+exit code: 0 capture complete, 1 no device, 2 sensor not responding,
+3 acquisition or recording (ie disk full) failed during the capture
+"""
+
+import argparse
+import datetime
+import logging
+import os
+import signal
+import sys
+import time
+from threading import Event
+
+# Import version information
+try:
+    from version import __version__, get_version_string
+except ImportError:
+    __version__ = "2.0.0"
+    get_version_string = lambda: f"v{__version__}"
+from pyhidpp.core.devices_manager import DevicesManager
+from pyhidpp.security import SecurityManager
+from pyhidpp.features.x9402 import X9402
+from pyhidpp.features.x19c0 import X19C0
+from pyhidpp.acquisition import (
+    SampleRing,
+    SampleStore,
+    StoreRecorder,
+    X9402MonitorStream,
+    X9402Sampler,
+)
+
+COMPATIBLE_DEVICES = ["Bravo", "Malacca", "Spotlight 2"]
+PASSWORD_FILE = "./Vibration_test_scripts/passwords_enc_mecha.ini"
+# 4 minutes of samples at 1 kHz between the acquisition and the recorder
+RING_CAPACITY = 1 << 18
+
+EXIT_OK = 0
+EXIT_NO_DEVICE = 1
+EXIT_NO_SENSOR = 2
+EXIT_FAILED = 3
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Headless x9402 sensor capture")
+    parser.add_argument(
+        "--output",
+        help="sample store directory (default: captures/capture_<date>_<time>)",
+    )
+    parser.add_argument(
+        "--device",
+        action="append",
+        help="device name to connect to, may be repeated (default: {})".format(
+            ", ".join(COMPATIBLE_DEVICES)
+        ),
+    )
+    parser.add_argument(
+        "--duration", type=float, default=0, help="capture duration in s (0: until stopped)"
+    )
+    parser.add_argument(
+        "--mode",
+        choices=["auto", "monitor", "poll"],
+        default="auto",
+        help="monitor: x9402 monitorTest notifications, poll: readMeasurement requests, "
+        "auto: monitor if supported (default)",
+    )
+    parser.add_argument(
+        "--segment-minutes", type=float, default=10, help="new segment file every N minutes"
+    )
+    parser.add_argument(
+        "--stats-period", type=float, default=5, help="stats report period in s"
+    )
+    parser.add_argument(
+        "--thresholds",
+        action="store_true",
+        help="read the x19c0 L1/L2 thresholds every stats period (thresholds.csv)",
+    )
+    parser.add_argument("--passwords", default=PASSWORD_FILE, help="encrypted passwords file")
+    parser.add_argument(
+        "--simulate", action="store_true", help="capture from a simulated Bravo (no hardware)"
+    )
+    return parser.parse_args(argv)
+
+
+def connect(names):
+    dev_manager = DevicesManager(log_to_console=False, log_level=logging.WARNING)
+    for device_name in names:
+        device = dev_manager.connect_with_name(device_name)
+        if device:
+            return device_name, device
+    return None, None
+
+
+def read_thresholds(device):
+    thresholds = X19C0(device).get_button_config(0)
+    return thresholds if thresholds is not None else (None, None)
+
+
+def stats_line(elapsed_s, source, recorder, device):
+    rtt = max(
+        device.transport_stats()["functions"].values(),
+        key=lambda h: h["count"],
+        default=None,
+    )
+    line = "[{:8.1f}s] {:6.0f} Hz  recorded {:>10}  dropped {:>6}  lost {:>6}  segments {}".format(
+        elapsed_s,
+        source.rate(),
+        recorder.recorded,
+        recorder.dropped,
+        source.lost_samples,
+        recorder.segments + 1,
+    )
+    if rtt is not None:
+        line += "  rtt p50 {:.2f} ms p99 {:.2f} ms t/o {}".format(
+            rtt["p50_ms"], rtt["p99_ms"], rtt["timeouts"]
+        )
+    return line
+
+
+def capture(args, device_name, device, stop: Event):
+    x9402 = X9402(device)
+    if x9402.read_measurement(0) is None:
+        print("Sensor not responding", file=sys.stderr)
+        return EXIT_NO_SENSOR
+
+    output = args.output or os.path.join(
+        "captures", datetime.datetime.now().strftime("capture_%Y%m%d_%H%M%S")
+    )
+    store = SampleStore(output)
+    ring = SampleRing(RING_CAPACITY)
+
+    source = None
+    if args.mode in ("auto", "monitor"):
+        source = X9402MonitorStream(device, ring)
+        if not source.start():
+            if args.mode == "monitor":
+                print("Monitor mode not supported by the device", file=sys.stderr)
+                return EXIT_NO_SENSOR
+            source = None
+    if source is None:
+        source = X9402Sampler(device, ring)
+        source.start()
+    mode = "monitor" if isinstance(source, X9402MonitorStream) else "poll"
+
+    store.set_attributes(
+        device=device_name,
+        mode=mode,
+        started=datetime.datetime.now().isoformat(timespec="seconds"),
+        version=__version__,
+    )
+    recorder = StoreRecorder(ring, store, segment_s=args.segment_minutes * 60)
+    recorder.start()
+    print(
+        "Capturing {} ({} mode) to {}".format(device_name, mode, output), file=sys.stderr
+    )
+
+    thresholds_file = None
+    if args.thresholds:
+        thresholds_path = os.path.join(output, "thresholds.csv")
+        new_file = not os.path.exists(thresholds_path)
+        thresholds_file = open(thresholds_path, "a")
+        if new_file:
+            thresholds_file.write("t_ns,l1_threshold,l2_threshold\n")
+
+    start = time.monotonic()
+    end = start + args.duration if args.duration else None
+    result = EXIT_OK
+    try:
+        while not stop.is_set():
+            timeout = args.stats_period
+            if end is not None:
+                timeout = min(timeout, end - time.monotonic())
+            if timeout <= 0 or stop.wait(timeout):
+                break
+            if source.failed:
+                print("Sensor communication lost", file=sys.stderr)
+                result = EXIT_FAILED
+                break
+            if recorder.failed:
+                print("Recording to {} failed".format(output), file=sys.stderr)
+                result = EXIT_FAILED
+                break
+            print(stats_line(time.monotonic() - start, source, recorder, device), file=sys.stderr)
+            if thresholds_file is not None:
+                l1, l2 = read_thresholds(device)
+                thresholds_file.write("{},{},{}\n".format(time.monotonic_ns(), l1, l2))
+                thresholds_file.flush()
+    finally:
+        source.stop()
+        recorder.stop()
+        if recorder.failed:
+            result = EXIT_FAILED
+        try:
+            store.set_attributes(
+                stopped=datetime.datetime.now().isoformat(timespec="seconds"),
+                dropped=recorder.dropped,
+                lost=source.lost_samples,
+            )
+            store.close()
+        except OSError as e:
+            print("Could not close {}: {}".format(output, e), file=sys.stderr)
+            result = EXIT_FAILED
+        if thresholds_file is not None:
+            thresholds_file.close()
+        print(stats_line(time.monotonic() - start, source, recorder, device), file=sys.stderr)
+        print("{} samples in {}".format(len(store), output), file=sys.stderr)
+    return result
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    print(f"Sensor capture {get_version_string()}", file=sys.stderr)
+
+    backend = None
+    if args.simulate:
+        from pyhidpp.simulator import VirtualDevice, VirtualHid
+
+        backend = VirtualHid([VirtualDevice("Bravo")]).install()
+
+    stop = Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: stop.set())
+
+    device = None
+    try:
+        device_name, device = connect(args.device or COMPATIBLE_DEVICES)
+        if device is None:
+            print("Could not connect to any compatible device", file=sys.stderr)
+            return EXIT_NO_DEVICE
+        print(f"Connected to {device_name}", file=sys.stderr)
+
+        if not args.simulate and args.passwords:
+            unlock_result = SecurityManager(device, args.passwords).unlock_device()
+            print(f"Unlock result: {unlock_result}", file=sys.stderr)
+        device.enumerate_all()
+
+        return capture(args, device_name, device, stop)
+    finally:
+        if device is not None:
+            device.disconnect()
+        if backend is not None:
+            backend.uninstall()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
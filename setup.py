@@ -27,12 +27,13 @@ setup(
     author=__author__,
     python_requires=">=3.7",
     install_requires=read_requirements(),
-    py_modules=['bravo_sensor_viewer', 'bravo_device_test', 'simple_sensor_test', 'version'],
+    py_modules=['bravo_sensor_viewer', 'bravo_device_test', 'simple_sensor_test', 'sensor_capture', 'version'],
     entry_points={
         'console_scripts': [
             'bravo-sensor-viewer=bravo_sensor_viewer:main',
             'bravo-device-test=bravo_device_test:main',
             'simple-sensor-test=simple_sensor_test:test_continuous_readings',
+            'bravo-sensor-capture=sensor_capture:main',
         ],
     },
     classifiers=[
@@ -0,0 +1,39 @@
+import logging
+import os
+import sys
+
+import pytest
+
+# pyhidpp from the source tree when not installed (pip install -e)
+PYHIDPP_ROOT = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "Vibration_test_scripts",
+    "pyhidpp",
+)
+if PYHIDPP_ROOT not in sys.path:
+    sys.path.insert(0, PYHIDPP_ROOT)
+
+
+@pytest.fixture
+def virtual_hid():
+    """
+    virtual hid backend serving one simulated Bravo, installed for the test
+    (backend.link can be changed on the fly)
+    """
+    from pyhidpp.simulator import LinkModel, VirtualDevice, VirtualHid
+
+    with VirtualHid([VirtualDevice("Bravo")], LinkModel(seed=0)) as backend:
+        yield backend
+
+
+@pytest.fixture
+def bravo(virtual_hid):
+    """
+    ConnectedDevice of the simulated Bravo
+    """
+    from pyhidpp import DevicesManager
+
+    manager = DevicesManager(log_to_file=False, log_level=logging.WARNING)
+    dev = manager.connect_with_name("Bravo")
+    yield dev
+    dev.disconnect()
@@ -0,0 +1,71 @@
+import asyncio
+import logging
+
+from pyhidpp import DevicesManager
+from pyhidpp.core.async_connected_device import AsyncConnectedDevice
+from pyhidpp.core.request import HIDPPRequest
+from pyhidpp.features.x9402 import X9402
+
+
+def find_bravo():
+    manager = DevicesManager(log_to_file=False, log_level=logging.WARNING)
+    return manager.find_device(name="Bravo")
+
+
+def test_enumerate_all_and_feature_calls(virtual_hid):
+    device = virtual_hid.devices[0]
+
+    async def main():
+        async with AsyncConnectedDevice(find_bravo()) as dev:
+            assert await dev.enumerate_all()
+            features = dev.device_info.features
+            assert features[0x0000].idx == 0
+            assert {f_id: f.idx for f_id, f in features.items()} == {
+                f_id: device.feature_idx(f_id) for f_id in features
+            }
+            return await asyncio.gather(
+                *(dev.features.x9402.read_measurement(0) for _ in range(10))
+            )
+
+    measurements = asyncio.run(main())
+    assert len(measurements) == 10 and None not in measurements
+
+
+def test_enumerate_all_keeps_root_feature_without_response(virtual_hid, caplog):
+    device = virtual_hid.devices[0]
+    last_idx = len(device.features) - 1
+    write = virtual_hid._write
+
+    def lose_last_feature_id(dev, data):
+        # no response to getFeatureID of the last feature index
+        req = HIDPPRequest.from_report(data)
+        x0001_idx = device.feature_idx(0x0001)
+        if req.feature == x0001_idx and req.function == 1 and req.params[0] == last_idx:
+            return
+        write(dev, data)
+
+    virtual_hid._write = lose_last_feature_id
+
+    async def main():
+        async with AsyncConnectedDevice(find_bravo()) as dev:
+            assert await dev.enumerate_all()
+            return dev.device_info.features
+
+    features = asyncio.run(main())
+    assert features[0x0000].id == 0 and features[0x0000].idx == 0
+    assert device.features[last_idx] not in features
+    assert "Incomplete feature table" in caplog.text
+
+
+def test_native_call(virtual_hid):
+    async def main():
+        async with AsyncConnectedDevice(find_bravo()) as dev:
+            responses = await asyncio.gather(
+                *(dev.call(X9402.feature_id, 2, [0]) for _ in range(20))
+            )
+            missing = await dev.call(0x1234, 0, [])
+            return responses, missing
+
+    responses, missing = asyncio.run(main())
+    assert all(X9402.MEASUREMENT.decode(res.params) for res in responses)
+    assert missing is None
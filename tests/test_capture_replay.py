@@ -0,0 +1,49 @@
+import logging
+
+import pytest
+
+from pyhidpp import DevicesManager
+from pyhidpp.core.capture import CAPTURE_IN, CAPTURE_OUT, CaptureReader, CaptureWriter
+from pyhidpp.simulator import ReplayHid
+
+
+def test_capture_file_round_trip(tmp_path):
+    path = tmp_path / "session.hidcap"
+    reports = [(CAPTURE_OUT, bytes([0x10, 1, 2, 3, 4, 5, 6])), (CAPTURE_IN, bytes(20))]
+    with CaptureWriter(path, {"name": "Bravo", "pid": 0xB0A0}) as writer:
+        for direction, report in reports:
+            writer.record(direction, report)
+
+    with CaptureReader(path) as reader:
+        assert reader.metadata == {"name": "Bravo", "pid": 0xB0A0}
+        records = list(reader)
+    assert [(direction, report) for _, direction, report in records] == reports
+    assert records[0][0] <= records[1][0]
+
+
+def test_not_a_capture(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"not a capture at all, but long enough for the header")
+    with pytest.raises(ValueError, match="not a capture file"):
+        CaptureReader(path)
+
+
+def test_replay_of_a_simulated_session(tmp_path, virtual_hid, bravo):
+    path = str(tmp_path / "bravo.hidcap")
+    bravo.start_capture(path)
+    fw_info = bravo.features.x0003.get_fw_info(0)
+    captured = bravo.features.x9402.read_measurements(50)
+    bravo.disconnect()  # stops the capture
+    virtual_hid.uninstall()
+
+    with ReplayHid(path) as backend:
+        manager = DevicesManager(log_to_file=False, log_level=logging.WARNING)
+        device = manager.connect_with_name("Bravo")
+        try:
+            assert device.features.x0003.get_fw_info(0) == fw_info
+            replayed = device.features.x9402.read_measurements(50)
+        finally:
+            device.disconnect()
+    assert replayed == captured
+    assert backend.divergences == 0
+    assert backend.replayed_count > 50
@@ -0,0 +1,58 @@
+import struct
+
+import numpy as np
+import pytest
+
+from pyhidpp.core.codec import Codec
+from pyhidpp.core.request import HIDPPRequest
+from pyhidpp.features.x9402 import X9402
+
+LAYOUT = Codec([(None, "x"), ("value", "H"), ("flags", "B"), ("pair", "2h")], "<")
+
+
+def test_encode_decode_round_trip():
+    params = LAYOUT.encode(0x1234, 7, -1, 2)
+    assert params == bytes([0, 0x34, 0x12, 7, 0xFF, 0xFF, 2, 0])
+    assert LAYOUT.size == 8
+    assert LAYOUT.names == ("value", "flags", "pair")
+    assert LAYOUT.decode(params) == (0x1234, 7, -1, 2)
+    assert LAYOUT.decode(list(params)) == (0x1234, 7, -1, 2)
+    assert LAYOUT.decode(b"\x00" + params, offset=1) == (0x1234, 7, -1, 2)
+
+
+def test_decode_report_params():
+    res = HIDPPRequest(params=[0, 0x34, 0x12, 7, 0xFF, 0xFF, 2, 0])
+    assert Codec([(None, "x"), ("value", "H")], "<").decode_dict(res.params) == {
+        "value": 0x1234
+    }
+
+
+def test_big_endian():
+    codec = Codec([("id", "H"), ("idx", "B")])
+    assert codec.encode(0x9402, 3) == bytes([0x94, 0x02, 3])
+
+
+def test_unnamed_field_must_be_padding():
+    with pytest.raises(ValueError, match="not padding"):
+        Codec([(None, "B")])
+
+
+def test_short_params():
+    with pytest.raises(struct.error):
+        LAYOUT.decode(bytes(4))
+
+
+def test_decode_batch_matches_decode():
+    rng = np.random.default_rng(0)
+    reports = rng.integers(0, 256, size=(100, 20), dtype=np.uint8)
+    batch = X9402.MEASUREMENT.decode_batch(reports.tobytes(), stride=20, offset=4)
+
+    assert batch.dtype.names == ("value", "baseline", "preload")
+    for report, row in zip(reports, batch):
+        assert X9402.MEASUREMENT.decode(report[4:].tobytes()) == tuple(row)
+
+
+def test_decode_batch_arrays():
+    batch = LAYOUT.decode_batch(LAYOUT.encode(1, 2, 3, 4) + LAYOUT.encode(5, 6, 7, 8))
+    assert list(batch["value"]) == [1, 5]
+    assert batch["pair"].tolist() == [[3, 4], [7, 8]]
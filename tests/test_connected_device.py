@@ -0,0 +1,84 @@
+import time
+from threading import Thread
+
+from pyhidpp.core.request import HIDPPRequest
+
+
+def get_feature(dev, feature_id):
+    """
+    root feature getFeature request
+    """
+    return HIDPPRequest(
+        dev_idx=dev.device_info.sub_idx,
+        feature=0,
+        function=0,
+        params=[feature_id >> 8, feature_id & 0xFF],
+    )
+
+
+def test_late_response_not_given_to_next_request(virtual_hid, bravo):
+    virtual_hid.link.latency_s = 0.05
+    assert bravo.send_req_and_wait_response(get_feature(bravo, 0x0001), 0.01) is None
+
+    # the late response to getFeature(0x0001) comes first
+    res = bravo.send_req_and_wait_response(get_feature(bravo, 0x9402), 1)
+    device = virtual_hid.devices[0]
+    assert res.params[0] == device.feature_idx(0x9402)
+    assert bravo.router.late_responses == 1
+
+
+def test_late_response_dropped(virtual_hid, bravo):
+    virtual_hid.link.latency_s = 0.05
+    assert bravo.send_req_and_wait_response(get_feature(bravo, 0x0001), 0.01) is None
+
+    deadline = time.monotonic() + 1
+    while bravo.router.late_responses == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert bravo.router.late_responses == 1
+    # neither routed nor kept as an unrouted report
+    assert bravo.stats.unmatched == 0
+    assert bravo.get_buffer_in_req() is None
+
+
+def test_pipelined_requests_over_lossy_link(virtual_hid, bravo):
+    device = virtual_hid.devices[0]
+    virtual_hid.link.latency_s = 0.002
+    virtual_hid.link.loss = 0.1
+    visible = [f for f in device.features if f not in device.hidden_features]
+    feature_ids = visible * 20
+    reqs = [get_feature(bravo, feature_id) for feature_id in feature_ids]
+
+    start = time.monotonic()
+    responses = bravo.send_reqs_and_wait_responses(reqs, timeout=0.05)
+    elapsed = time.monotonic() - start
+
+    lost = responses.count(None)
+    assert 0 < lost < len(reqs) // 2
+    # each response went to its own request, whatever the losses
+    for feature_id, res in zip(feature_ids, responses):
+        if res is not None:
+            assert res.params[0] == device.feature_idx(feature_id)
+    # a lost request only holds its window slot until its own timeout
+    assert elapsed < lost * 0.05 + 1
+    function_stats = bravo.transport_stats()["functions"]
+    assert sum(f["timeouts"] for f in function_stats.values()) == lost
+
+
+def test_concurrent_callers(virtual_hid, bravo):
+    device = virtual_hid.devices[0]
+    virtual_hid.link.latency_s = 0.001
+    errors = []
+
+    def call(feature_id):
+        for _ in range(20):
+            res = bravo.send_req_and_wait_response(get_feature(bravo, feature_id), 1)
+            if res is None or res.params[0] != device.feature_idx(feature_id):
+                errors.append(feature_id)
+
+    threads = [Thread(target=call, args=(f,)) for f in (0x0001, 0x0003, 0x0005, 0x9402)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert bravo.router.pending_count() == 0
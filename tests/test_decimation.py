@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+from pyhidpp.acquisition.decimation import MinMaxPyramid, lttb
+from pyhidpp.acquisition.ring_buffer import SAMPLE_DTYPE
+from pyhidpp.acquisition.sample_store import SampleStore
+
+ROWS = 10_000
+
+
+@pytest.fixture
+def store(tmp_path):
+    rng = np.random.default_rng(0)
+    data = np.zeros(ROWS, dtype=SAMPLE_DTYPE)
+    data["t_ns"] = np.arange(ROWS) * 1000
+    data["adc"] = rng.integers(-2000, 2000, ROWS)
+    data["adc"][[17, 4321, 9998]] = [30000, -30000, 29000]  # spikes
+    data["baseline"] = np.arange(ROWS) % 777
+    with SampleStore(str(tmp_path / "store"), chunk_rows=3000) as store:
+        store.write(data)
+        yield store
+
+
+def brute_force_envelope(rows, points, field):
+    """
+    min and max of the rows of each bucket of the decimated points (a bucket
+    starts at the t_ns of its points)
+    """
+    starts = np.searchsorted(rows["t_ns"], points["t_ns"][::2])
+    stops = np.append(starts[1:], len(rows))
+    values = rows[field]
+    return (
+        np.array([values[a:b].min() for a, b in zip(starts, stops)]),
+        np.array([values[a:b].max() for a, b in zip(starts, stops)]),
+    )
+
+
+@pytest.mark.parametrize(
+    "t0_ns, t1_ns, max_points",
+    [
+        (0, ROWS * 1000, 200),
+        (0, ROWS * 1000, 64),
+        (123_456, 8_765_432, 300),
+        (5_000_000, 5_400_000, 100),
+        (2_990_000, 3_010_000, 10),  # crosses a chunk boundary
+    ],
+)
+def test_minmax_envelope_equals_brute_force(store, t0_ns, t1_ns, max_points):
+    pyramid = MinMaxPyramid(store, block_rows=16, fanout=4)
+    points = pyramid.decimate(t0_ns, t1_ns, max_points)
+    assert len(points) <= max_points
+
+    rows = store.window(t0_ns, t1_ns)
+    assert points["t_ns"][0] == rows["t_ns"][0]
+    assert np.all(np.diff(points["t_ns"][::2]) > 0)
+    for field in ("adc", "baseline"):
+        mins, maxs = brute_force_envelope(rows, points, field)
+        assert np.array_equal(points[field][0::2], mins)
+        assert np.array_equal(points[field][1::2], maxs)
+    # the spikes of the window are never lost
+    assert points["adc"].max() == rows["adc"].max()
+    assert points["adc"].min() == rows["adc"].min()
+
+
+def test_small_window_returns_raw_rows(store):
+    points = MinMaxPyramid(store).decimate(1_000_000, 1_050_000, 100)
+    rows = store.window(1_000_000, 1_050_000)
+    assert np.array_equal(points["t_ns"], rows["t_ns"])
+    assert np.array_equal(points["adc"], rows["adc"])
+
+
+def test_incremental_update(tmp_path):
+    data = np.zeros(1000, dtype=SAMPLE_DTYPE)
+    data["t_ns"] = np.arange(1000)
+    data["adc"] = np.arange(1000) % 97
+    with SampleStore(str(tmp_path / "store")) as growing:
+        pyramid = MinMaxPyramid(growing, block_rows=8, fanout=2)
+        for start in range(0, 1000, 137):
+            growing.write(data[start : start + 137])
+            points = pyramid.decimate(0, 1000, 40)
+            mins, maxs = brute_force_envelope(growing.rows(), points, "adc")
+            assert np.array_equal(points["adc"][0::2], mins)
+            assert np.array_equal(points["adc"][1::2], maxs)
+
+
+def test_lttb_method(store):
+    points = MinMaxPyramid(store).decimate(0, ROWS * 1000, 100, method="lttb")
+    assert len(points) == 100
+    assert np.all(np.diff(points["t_ns"]) >= 0)
+    # the spikes are in the minmax preselection and make the largest triangles
+    assert {30000, -30000} <= set(points["adc"].tolist())
+    with pytest.raises(ValueError):
+        MinMaxPyramid(store).decimate(0, ROWS * 1000, 100, method="mean")
+
+
+def test_lttb():
+    x = np.arange(100)
+    y = np.zeros(100)
+    y[42] = 10
+    selected = lttb(x, y, 10)
+    assert len(selected) == 10
+    assert selected[0] == 0 and selected[-1] == 99
+    assert np.all(np.diff(selected) > 0)
+    assert 42 in selected
+    assert list(lttb(x[:5], y[:5], 10)) == [0, 1, 2, 3, 4]
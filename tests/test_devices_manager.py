@@ -0,0 +1,52 @@
+import logging
+
+from pyhidpp import DevicesManager
+from pyhidpp.simulator import LinkModel, VirtualDevice, VirtualHid
+
+
+def names(devices):
+    return sorted(dev.name for dev in devices)
+
+
+def test_refresh_reports_plugged_and_unplugged_devices():
+    bravo = VirtualDevice("Bravo", pid=0xB001, serial_number="S1")
+    with VirtualHid([bravo]) as backend:
+        manager = DevicesManager(log_to_file=False, log_level=logging.WARNING)
+        assert names(manager.devices) == ["Bravo"]
+        kept = manager.devices[0]
+        assert manager.refresh() == ([], [])
+
+        added_events = []
+        manager.device_added_callback = added_events.append
+        other = VirtualDevice("Other", pid=0xB002, serial_number="S2")
+        backend.add_device(other)
+        added, removed = manager.refresh()
+        assert names(added) == ["Other"] and removed == []
+        assert added_events == added
+        # the devices still present are kept as they are
+        assert any(dev is kept for dev in manager.devices)
+
+        backend.remove_device(bravo)
+        added, removed = manager.refresh()
+        assert added == [] and removed == [kept]
+        assert names(manager.devices) == ["Other"]
+
+
+def test_device_types_probed_once_per_plugged_device():
+    mouse = VirtualDevice("Mouse", pid=0xB001, device_type=3, serial_number="S1")
+    keyboard = VirtualDevice("Keys", pid=0xB002, device_type=0, serial_number="S2")
+    with VirtualHid([mouse, keyboard], LinkModel(latency_s=0.001)) as backend:
+        manager = DevicesManager(log_to_file=False, log_level=logging.WARNING)
+        assert names(manager.get_devices_type("Mouse")) == ["Mouse"]
+        count = mouse.requests_count
+        assert names(manager.get_devices_type("Keyboard")) == ["Keys"]
+        assert mouse.requests_count == count  # cached
+
+        # replugged with another type: probed again
+        backend.remove_device(mouse)
+        manager.refresh()
+        mouse.device_type = 0
+        backend.add_device(mouse)
+        manager.refresh()
+        assert names(manager.get_devices_type("Keyboard")) == ["Keys", "Mouse"]
+        assert mouse.requests_count > count
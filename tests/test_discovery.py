@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+from pyhidpp.core import discovery, hid_backend
+from pyhidpp.simulator import LinkModel, VirtualDevice, VirtualHid, VirtualReceiver
+
+
+def receiver_handles(backend, receiver):
+    """
+    short and long handles opened on the endpoints of receiver
+    """
+    handles = []
+    for usage in (1, 2):
+        path = next(
+            info["path"]
+            for info in backend.enumerate(product_id=receiver.pid)
+            if info["usage"] == usage
+        )
+        handle = hid_backend.device()
+        handle.open_path(path)
+        handle.set_nonblocking(1)
+        handles.append(handle)
+    return handles
+
+
+@pytest.mark.parametrize("silent_errors", [False, True])
+def test_read_receiver_registers(silent_errors):
+    receiver = VirtualReceiver(
+        paired={1: VirtualDevice("M720"), 4: VirtualDevice("Bravo")},
+        silent_errors=silent_errors,
+    )
+    with VirtualHid([receiver], LinkModel(latency_s=0.002)) as backend:
+        h_short, h_long = receiver_handles(backend, receiver)
+        start = time.monotonic()
+        replies = discovery.read_receiver_registers(
+            h_short, h_long, [0x40 + i for i in range(6)], timeout_s=0.5
+        )
+        elapsed = time.monotonic() - start
+        h_short.close()
+        h_long.close()
+
+    assert sorted(replies) == [0x40, 0x43]
+    for sub_register, reply in replies.items():
+        assert list(reply[2:5]) == [0x83, 0xB5, sub_register]
+    assert bytes(replies[0x43][6:11]) == b"Bravo"
+    if silent_errors:
+        # the empty slots are waited for until the deadline
+        assert elapsed >= 0.5
+    else:
+        # one error per empty slot: done as soon as all the slots answered
+        assert elapsed < 0.4
+
+
+def test_list_devices_of_receivers():
+    receivers = [
+        VirtualReceiver("Bolt", pid=0xC548, paired={2: VirtualDevice("MX Keys")}),
+        VirtualReceiver("Unifying", pid=0xC52B, paired={1: VirtualDevice("M720")}),
+        VirtualReceiver("Unifying", pid=0xC52B),
+    ]
+    with VirtualHid(receivers, LinkModel(latency_s=0.002)):
+        devices = discovery.list_devices(discovery.get_interfaces_list())
+
+    paired = [(d.name, d.pid, d.sub_idx) for d in devices if d.sub_idx != 0xFF]
+    assert sorted(paired) == [("M720", 0xC52B, 1), ("MX Keys", 0xB0A0, 2)]
+    bolt = next(d for d in devices if d.name == "MX Keys")
+    assert bolt.dev_type == "Mouse"
+    assert sum(d.sub_idx == 0xFF for d in devices) == 3
@@ -0,0 +1,81 @@
+import json
+import logging
+
+from pyhidpp import DevicesManager
+from pyhidpp.core.feature_cache import FeatureCache
+from pyhidpp.core.feature_info import FeatureInfo
+
+
+def connect(cache):
+    manager = DevicesManager(log_to_file=False, log_level=logging.WARNING)
+    dev = manager.connect_with_name("Bravo")
+    dev.feature_cache = cache
+    return dev
+
+
+def feature_table(dev):
+    return {f_id: f.idx for f_id, f in dev.device_info.features.items()}
+
+
+def test_store_and_load(tmp_path):
+    path = tmp_path / "tables.json"
+    cache = FeatureCache(str(path))
+    features = [
+        FeatureInfo(f_id, idx, False, False, 0)
+        for f_id, idx in ((0x0000, 0), (0x9402, 4), (0x0001, 1))
+    ]
+    cache.store("B0A0:BRV:42:0000", features)
+
+    assert cache.has_pid(0xB0A0) and not cache.has_pid(0xB0A1)
+    loaded = FeatureCache(str(path)).load("B0A0:BRV:42:0000")
+    # sorted by index, without the root feature
+    assert [(f.id, f.idx) for f in loaded] == [(0x0001, 1), (0x9402, 4)]
+
+    cache.remove("B0A0:BRV:42:0000")
+    assert json.loads(path.read_text()) == {}
+
+
+def test_corrupted_file_ignored(tmp_path, caplog):
+    path = tmp_path / "tables.json"
+    path.write_text("{not json")
+    assert FeatureCache(str(path)).load("B0A0:BRV:42:0000") is None
+    assert "Ignoring feature cache" in caplog.text
+
+
+def test_known_firmware_not_enumerated_again(tmp_path, virtual_hid):
+    device = virtual_hid.devices[0]
+    cache = FeatureCache(str(tmp_path / "tables.json"))
+
+    dev = connect(cache)
+    assert dev.enumerate_all()
+    table = feature_table(dev)
+    dev.disconnect()
+
+    dev = connect(cache)
+    count = device.requests_count
+    assert dev.enumerate_all()
+    # fw info, and one probe of the last feature index
+    assert device.requests_count - count < 5
+    assert feature_table(dev) == table
+    dev.disconnect()
+
+
+def test_stale_table_enumerated_again(tmp_path, virtual_hid, caplog):
+    device = virtual_hid.devices[0]
+    cache = FeatureCache(str(tmp_path / "tables.json"))
+    dev = connect(cache)
+    assert dev.enumerate_all()
+    dev.disconnect()
+
+    # same firmware key, other feature table
+    device.features[-1], device.features[-2] = device.features[-2], device.features[-1]
+    dev = connect(cache)
+    assert dev.enumerate_all()
+    assert "Stale feature cache entry" in caplog.text
+    expected = {f_id: device.feature_idx(f_id) for f_id in device.features}
+    assert feature_table(dev) == expected
+    dev.disconnect()
+
+
+def test_not_used_with_the_simulator(bravo):
+    assert bravo.feature_cache is None
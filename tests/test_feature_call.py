@@ -0,0 +1,49 @@
+import pytest
+
+from pyhidpp.core.request import REPORT_LENGTHS, request_type
+
+BOUNDARIES = [
+    (3, "SHORT", 0x10),
+    (4, "LONG", 0x11),
+    (16, "LONG", 0x11),
+    (17, "VERY LONG", 0x12),
+    (60, "VERY LONG", 0x12),
+]
+
+
+@pytest.mark.parametrize("length, req_type, _", BOUNDARIES)
+def test_request_type(length, req_type, _):
+    assert request_type(length) == req_type
+
+
+def test_request_type_too_long():
+    with pytest.raises(ValueError, match="max 60"):
+        request_type(61)
+
+
+@pytest.mark.parametrize("length, _, report_id", BOUNDARIES)
+def test_stub_report_by_params_length(bravo, monkeypatch, length, _, report_id):
+    assert bravo.enumerate_feature(0x9402)
+    sent = []
+    monkeypatch.setattr(
+        bravo, "send_req_and_wait_response", lambda req, timeout: sent.append(req)
+    )
+    stub = bravo.features.x9402.call_stub(2)
+    params = list(range(1, length + 1))
+    assert stub(params) is None
+
+    (req,) = sent
+    assert req.report_id == report_id
+    assert len(req) == REPORT_LENGTHS[report_id]
+    assert list(req.params[:length]) == params
+
+
+def test_stub_too_many_params(bravo):
+    stub = bravo.features.x9402.call_stub(2)
+    with pytest.raises(ValueError, match="max 60"):
+        stub([0] * 61)
+
+
+def test_stub_response(bravo):
+    res = bravo.features.x9402.call_stub(2)([0])
+    assert res is not None and res.feature == bravo.device_info.features[0x9402].idx
@@ -0,0 +1,76 @@
+"""
+import time budget of pyhidpp: each statement is timed in fresh interpreters, a
+failure lists the slowest modules (python -X importtime). No device needed
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import PYHIDPP_ROOT
+
+# statement -> budget (ms), best of RUNS fresh interpreters
+IMPORT_BUDGETS_MS = {
+    "import pyhidpp": 50,
+    "from pyhidpp import DevicesManager": 150,
+    # pyhidpp imports of the viewers (bravo_sensor_viewer, live_viewer)
+    "from pyhidpp.core.devices_manager import DevicesManager;"
+    "from pyhidpp.security import SecurityManager;"
+    "from pyhidpp.features.x9402 import X9402;"
+    "from pyhidpp.features.x19c0 import X19C0": 200,
+}
+RUNS = 5
+
+TIMER = """
+import time
+start = time.perf_counter()
+{}
+print((time.perf_counter() - start) * 1000)
+"""
+
+
+def run_python(*args):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        path for path in (PYHIDPP_ROOT, env.get("PYTHONPATH")) if path
+    )
+    return subprocess.run(
+        [sys.executable, *args], capture_output=True, text=True, env=env
+    )
+
+
+def import_time_ms(statement):
+    out = run_python("-c", TIMER.format(statement))
+    assert out.returncode == 0, out.stderr
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def slowest_modules(statement, count=8):
+    out = run_python("-X", "importtime", "-c", statement)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, module = line.split("|")
+        try:
+            rows.append((int(cumulative), module.strip()))
+        except ValueError:
+            continue  # header
+    return sorted(rows, reverse=True)[:count]
+
+
+@pytest.mark.parametrize("statement, budget_ms", IMPORT_BUDGETS_MS.items())
+def test_import_budget(statement, budget_ms):
+    elapsed = min(import_time_ms(statement) for _ in range(RUNS))
+    if elapsed > budget_ms:
+        slowest = "\n".join(
+            "    {:7.1f} ms  {}".format(cumulative / 1000, module)
+            for cumulative, module in slowest_modules(statement)
+        )
+        pytest.fail(
+            "{:.1f} ms, budget {} ms: {}\nslowest modules:\n{}".format(
+                elapsed, budget_ms, statement, slowest
+            )
+        )
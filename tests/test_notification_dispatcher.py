@@ -0,0 +1,73 @@
+from datetime import datetime
+from threading import Event
+
+from pyhidpp.core.notification_dispatcher import NotificationDispatcher
+from pyhidpp.core.request import HIDPPRequest
+
+
+def notification(feature, function, sw_id=0):
+    return HIDPPRequest(dev_idx=1, feature=feature, function=function, sw_id=sw_id)
+
+
+def test_inline_callback_timestamps():
+    dispatcher = NotificationDispatcher(workers=0, clock=lambda: 12.5)
+    got = []
+    dispatcher.register(3, 1, lambda req, timestamp: got.append((req, timestamp)))
+
+    req = notification(3, 1)
+    assert dispatcher.dispatch(req)
+    (res, timestamp), = got
+    assert res is req
+    assert isinstance(timestamp, datetime)
+    assert res.received_s == 12.5
+
+
+def test_unregistered_and_responses_not_dispatched():
+    dispatcher = NotificationDispatcher(workers=0)
+    dispatcher.register(3, 1, lambda req, timestamp: None)
+
+    assert not dispatcher.dispatch(notification(3, 2))
+    assert not dispatcher.dispatch(notification(4, 1))
+    assert not dispatcher.dispatch(notification(3, 1, sw_id=5))  # response
+    dispatcher.unregister(3, 1)
+    assert not dispatcher.dispatch(notification(3, 1))
+    assert dispatcher.dispatched == 0
+
+
+def test_worker_keeps_order_and_drops_when_full():
+    dispatcher = NotificationDispatcher(workers=1, queue_size=4)
+    release = Event()
+    got = []
+
+    def callback(req, timestamp):
+        release.wait(1)
+        got.append(req.params[0])
+
+    dispatcher.register(3, 0, callback)
+    for i in range(10):
+        req = notification(3, 0)
+        req.params[0] = i
+        dispatcher.dispatch(req)
+    release.set()
+    dispatcher.stop()
+
+    # the worker took the first one, 4 more queued, the rest dropped
+    assert got == sorted(got) and got[0] == 0
+    assert dispatcher.dispatched == len(got)
+    assert dispatcher.dropped == 10 - len(got)
+    assert dispatcher.max_queue_depth == 4
+
+
+def test_failing_callback_does_not_stop_dispatch(caplog):
+    dispatcher = NotificationDispatcher(workers=0)
+    got = []
+
+    def callback(req, timestamp):
+        got.append(req)
+        raise ValueError("boom")
+
+    dispatcher.register(3, 0, callback)
+    dispatcher.dispatch(notification(3, 0))
+    dispatcher.dispatch(notification(3, 0))
+    assert len(got) == 2
+    assert "Notification callback" in caplog.text
@@ -0,0 +1,60 @@
+import logging
+
+from pyhidpp import DevicesManager
+from pyhidpp.core.probe_session import ProbeSession, get_devices_type
+from pyhidpp.core.request import HIDPPRequest
+from pyhidpp.simulator import LinkModel, VirtualDevice, VirtualHid
+
+
+def devices(*virtual_devices, link=None):
+    return VirtualHid(list(virtual_devices), link or LinkModel(latency_s=0.002))
+
+
+def discovered():
+    return DevicesManager(log_to_file=False, log_level=logging.WARNING).devices
+
+
+def get_feature(dev, feature_id):
+    params = [feature_id >> 8, feature_id & 0xFF]
+    return HIDPPRequest(dev.sub_idx, 0x00, 0, params=params)
+
+
+def test_round_matches_replies_per_device():
+    first = VirtualDevice("First", pid=0xB001, features=[0x0000, 0x0001, 0x0005])
+    second = VirtualDevice("Second", pid=0xB002, features=[0x0000, 0x0005])
+    with devices(first, second):
+        infos = discovered()
+        with ProbeSession(infos) as session:
+            responses = session.round({dev: get_feature(dev, 0x0005) for dev in infos})
+            # error report: invalid feature index
+            errors = session.round(
+                {dev: HIDPPRequest(dev.sub_idx, 9, 0) for dev in infos}
+            )
+
+    idx = {dev.name: res.params[0] for dev, res in responses.items()}
+    assert idx == {"First": 2, "Second": 1}
+    assert all(res.feature == 0xFF for res in errors.values())
+
+
+def test_round_without_reply():
+    with devices(VirtualDevice("Bravo"), link=LinkModel(loss=1.0)):
+        infos = discovered()
+        with ProbeSession(infos, timeout_s=0.05) as session:
+            responses = session.round({dev: get_feature(dev, 0x0005) for dev in infos})
+    assert list(responses.values()) == [None]
+
+
+def test_get_devices_type_cache():
+    mouse = VirtualDevice("Mouse", pid=0xB001, device_type=3, serial_number="S1")
+    keys = VirtualDevice("Keys", pid=0xB002, device_type=0, serial_number="S2")
+    with devices(mouse, keys):
+        infos = discovered()
+        cache = {}
+        types = get_devices_type(infos, cache=cache)
+        assert {dev.name: t for dev, t in types.items()} == {
+            "Mouse": "Mouse",
+            "Keys": "Keyboard",
+        }
+        count = mouse.requests_count
+        assert get_devices_type(infos, cache=cache) == types
+        assert mouse.requests_count == count
@@ -0,0 +1,115 @@
+from concurrent.futures import Future
+
+from pyhidpp.core import response_router
+from pyhidpp.core.request import HIDPPRequest
+from pyhidpp.core.response_router import ResponseRouter
+
+
+def request(feature=3, function=2, sw_id=5, params=None):
+    return HIDPPRequest(
+        dev_idx=1, feature=feature, function=function, sw_id=sw_id, params=params
+    )
+
+
+def error(req, code=0x05):
+    # [0xFF, feature idx, function | sw_id, error code]
+    return HIDPPRequest(
+        dev_idx=req.dev_idx,
+        feature=0xFF,
+        function=req.feature >> 4,
+        sw_id=req.feature & 0x0F,
+        params=[req.function << 4 | req.sw_id, code],
+    )
+
+
+def test_same_key_served_in_order():
+    router = ResponseRouter()
+    first, second = router.register(request()), router.register(request())
+    assert router.pending_count() == 2
+
+    assert router.dispatch(request(params=[1]))
+    assert router.dispatch(request(params=[2]))
+    assert first.result(0).params[0] == 1
+    assert second.result(0).params[0] == 2
+    assert not router.has_pending()
+
+
+def test_keys_routed_independently():
+    router = ResponseRouter()
+    futures = {sw_id: router.register(request(sw_id=sw_id)) for sw_id in (1, 2, 3)}
+    for sw_id in (3, 1, 2):
+        assert router.dispatch(request(sw_id=sw_id, params=[sw_id]))
+    assert all(f.result(0).params[0] == sw_id for sw_id, f in futures.items())
+
+
+def test_error_report_routed_to_its_request():
+    router = ResponseRouter()
+    req = request(feature=0x23, function=4, sw_id=7)
+    other = router.register(request(feature=0x23, function=4, sw_id=8))
+    future = router.register(req)
+
+    assert router.dispatch(error(req, 0x05))
+    res = future.result(0)
+    assert res.feature == 0xFF and res.params[1] == 0x05
+    assert not other.done()
+
+
+def test_notifications_and_unknown_responses_not_routed():
+    router = ResponseRouter()
+    router.register(request(sw_id=5))
+    assert not router.dispatch(request(sw_id=0))  # notification
+    assert not router.dispatch(request(sw_id=6))  # nobody waiting
+    assert router.pending_count() == 1
+
+
+def test_late_response_dropped(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(response_router.time, "monotonic", lambda: now[0])
+    router = ResponseRouter()
+    req = request()
+    router.unregister(req, router.register(req), lost=True)
+    assert router.is_waiting(req)  # not to be reused while its response may come
+    assert not router.is_pending(req)
+
+    assert router.dispatch(request(params=[1]))
+    assert router.late_responses == 1
+    assert not router.is_waiting(req)
+    assert not router.dispatch(request(params=[2]))  # unmatched
+
+    router.unregister(req, router.register(req), lost=True)
+    now[0] += response_router.LATE_RESPONSE_S
+    assert not router.is_waiting(req)  # given up waiting for it
+    assert not router.dispatch(request())
+
+
+def test_lost_key_reused():
+    router = ResponseRouter()
+    req = request()
+    router.unregister(req, router.register(req), lost=True)
+
+    # the lost request is forgotten: the next response goes to the new one
+    future = router.register(request())
+    assert router.dispatch(request(params=[1]))
+    assert future.result(0).params[0] == 1
+    assert router.late_responses == 0
+
+
+def test_cancel_all():
+    router = ResponseRouter()
+    futures = [router.register(request(sw_id=sw_id)) for sw_id in (1, 2)]
+    router.cancel_all()
+    assert all(f.cancelled() for f in futures)
+    assert not router.has_pending()
+
+
+def test_future_factory():
+    created = []
+
+    def factory():
+        created.append(Future())
+        return created[-1]
+
+    router = ResponseRouter(future_factory=factory)
+    assert router.register(request()) is created[0]
+    router.dispatch(request())
+    assert created[0].done()
@@ -0,0 +1,83 @@
+from threading import Event, Thread
+
+import numpy as np
+
+from pyhidpp.acquisition.ring_buffer import SAMPLE_DTYPE, SampleRing
+
+
+def rows(start, stop):
+    """
+    samples start..stop - 1, timestamped with their absolute index
+    """
+    data = np.zeros(stop - start, dtype=SAMPLE_DTYPE)
+    data["t_ns"] = np.arange(start, stop)
+    data["adc"] = np.arange(start, stop)
+    return data
+
+
+def test_append_and_snapshot():
+    ring = SampleRing(capacity=8)
+    for i in range(5):
+        ring.append(i, i, 0, 0)
+    start, data = ring.snapshot()
+    assert start == 0 and list(data["t_ns"]) == [0, 1, 2, 3, 4]
+
+    for i in range(5, 20):
+        ring.append(i, i, 0, 0)
+    start, data = ring.snapshot()
+    assert start == 12 and list(data["t_ns"]) == list(range(12, 20))
+    assert list(ring.snapshot(n=3)[1]["t_ns"]) == [17, 18, 19]
+    assert ring.snapshot(since=18)[0] == 18
+    assert len(ring) == 8
+
+    ring.clear()
+    start, data = ring.snapshot()
+    assert start == 20 and len(data) == 0 and len(ring) == 0
+
+
+def test_extend_wraps():
+    ring = SampleRing(capacity=8)
+    ring.extend(rows(0, 5))
+    ring.extend(rows(5, 11))
+    start, data = ring.snapshot()
+    assert ring.count == 11
+    assert start == 3 and list(data["t_ns"]) == list(range(3, 11))
+
+
+def test_extend_more_than_capacity():
+    ring = SampleRing(capacity=8)
+    ring.extend(rows(0, 3))
+    ring.extend(rows(3, 23))
+    # all the rows are counted, only the last capacity ones kept, in their slots
+    assert ring.count == 23
+    start, data = ring.snapshot()
+    assert start == 15 and list(data["t_ns"]) == list(range(15, 23))
+    ring.append(23, 23, 0, 0)
+    assert list(ring.snapshot(n=2)[1]["t_ns"]) == [22, 23]
+
+
+def test_snapshot_consistent_with_concurrent_writer():
+    ring = SampleRing(capacity=64)
+    stop = Event()
+
+    def write():
+        i = 0
+        while not stop.is_set():
+            n = i % 50 + 1
+            ring.extend(rows(i, i + n))
+            i += n
+            ring.append(i, i, 0, 0)
+            i += 1
+
+    writer = Thread(target=write)
+    writer.start()
+    try:
+        for _ in range(2000):
+            start, data = ring.snapshot()
+            # every returned row is the sample of its absolute index
+            expected = np.arange(start, start + len(data))
+            assert np.array_equal(data["t_ns"], expected)
+            assert np.array_equal(data["adc"], expected)
+    finally:
+        stop.set()
+        writer.join()
@@ -0,0 +1,97 @@
+import os
+
+import numpy as np
+import pytest
+
+from pyhidpp.acquisition.ring_buffer import SAMPLE_DTYPE
+from pyhidpp.acquisition.sample_store import STORE_DTYPE, SampleStore
+
+
+def rows(start, stop):
+    """
+    samples start..stop - 1, t_ns = 10 * absolute index
+    """
+    data = np.zeros(stop - start, dtype=SAMPLE_DTYPE)
+    data["t_ns"] = 10 * np.arange(start, stop)
+    data["adc"] = np.arange(start, stop) % 1000
+    return data
+
+
+def test_write_and_window(tmp_path):
+    with SampleStore(str(tmp_path / "store"), chunk_rows=64) as store:
+        store.set_attributes(device="Bravo")
+        store.write(rows(0, 100), device_id=3)
+        store.write(rows(100, 250), device_id=3)
+        assert len(store) == 250 and len(list(store.chunks())) == 4
+        assert store.time_range == (0, 2490)
+
+        window = store.window(555, 1805)  # crosses chunk boundaries
+        assert list(window["t_ns"]) == list(range(560, 1810, 10))
+        assert np.all(window["device_id"] == 3)
+        assert len(store.window(5000, 6000)) == 0
+
+    reopened = SampleStore(str(tmp_path / "store"))
+    assert reopened.chunk_rows == 64 and reopened.dtype == STORE_DTYPE
+    assert reopened.attributes == {"device": "Bravo"}
+    assert len(reopened) == 250
+    assert list(reopened.rows(60, 70)["adc"]) == list(range(60, 70))
+
+
+def test_write_out_of_order(tmp_path):
+    with SampleStore(str(tmp_path / "store")) as store:
+        store.write(rows(10, 20))
+        with pytest.raises(ValueError):
+            store.write(rows(0, 5))
+        with pytest.raises(ValueError):
+            store.write(rows(20, 30)[::-1])
+        assert len(store) == 10
+
+
+def test_rotate(tmp_path):
+    with SampleStore(str(tmp_path / "store"), chunk_rows=64) as store:
+        store.write(rows(0, 10))
+        store.rotate()
+        store.write(rows(10, 30))
+        store.rotate()
+        store.rotate()  # no empty chunk
+        store.write(rows(30, 35))
+        assert [len(chunk) for chunk in store.chunks()] == [10, 20, 5]
+        assert list(store.window(0, 350)["t_ns"]) == list(range(0, 350, 10))
+
+    reopened = SampleStore(str(tmp_path / "store"), chunk_rows=64)
+    assert [len(chunk) for chunk in reopened.chunks()] == [10, 20, 5]
+    assert reopened.index(100) == 10 and reopened.index(305) == 31
+
+
+def test_crash_truncated_row(tmp_path):
+    path = str(tmp_path / "store")
+    with SampleStore(path, chunk_rows=64) as store:
+        store.write(rows(0, 70))
+    # interrupted capture: half a row at the end of the last chunk
+    last_chunk = os.path.join(path, "chunk_000001.bin")
+    with open(last_chunk, "ab") as f:
+        f.write(b"\x01" * (STORE_DTYPE.itemsize // 2))
+
+    store = SampleStore(path)
+    assert len(store) == 70 and store.time_range == (0, 690)
+    # appending drops the partial row
+    store.write(rows(70, 80))
+    store.close()
+    assert os.path.getsize(last_chunk) == 16 * STORE_DTYPE.itemsize
+
+    reopened = SampleStore(path)
+    assert list(reopened.rows()["t_ns"]) == list(range(0, 800, 10))
+
+
+def test_reader_refresh(tmp_path):
+    path = str(tmp_path / "store")
+    writer = SampleStore(path, chunk_rows=64)
+    writer.write(rows(0, 10))
+    writer.flush()
+    reader = SampleStore(path)
+    assert len(reader) == 10
+
+    writer.write(rows(10, 100))
+    writer.close()
+    reader.refresh()
+    assert len(reader) == 100 and reader.time_range == (0, 990)
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from pyhidpp.acquisition.ring_buffer import SAMPLE_DTYPE
+from pyhidpp.acquisition.statistics import ChannelStats, SampleStatistics
+
+
+def assert_same_stats(a: ChannelStats, b: ChannelStats):
+    sa, sb = a.snapshot(), b.snapshot()
+    for key in ("count", "min", "max", "p1", "p50", "p99"):
+        assert sa[key] == sb[key], key
+    for key in ("mean", "std", "ewma", "window_mean", "window_std"):
+        assert sa[key] == pytest.approx(sb[key], rel=1e-9, abs=1e-9), key
+    if sa["drift"] is None:
+        assert sb["drift"] is None
+    else:
+        assert sa["drift"] == pytest.approx(sb["drift"], rel=1e-9, abs=1e-9)
+
+
+@pytest.mark.parametrize("batch_size", [1, 7, 64, 100, 1000])
+def test_update_batch_equals_update(batch_size):
+    rng = np.random.default_rng(batch_size)
+    values = rng.integers(-500, 500, 2500) + np.arange(2500) // 100
+    values[123] = 1 << 20  # clamped in the window histogram
+    one_by_one = ChannelStats(window=256)
+    batched = ChannelStats(window=256)
+    for start in range(0, len(values), batch_size):
+        batch = values[start : start + batch_size]
+        for value in batch:
+            one_by_one.update(value)
+        batched.update_batch(batch)
+        assert_same_stats(batched, one_by_one)
+
+
+def test_window_statistics():
+    stats = ChannelStats(window=100)
+    stats.update_batch(np.arange(1000))
+    assert stats.window_count == 100
+    assert stats.window_mean == pytest.approx(949.5)
+    assert stats.window_std == pytest.approx(np.std(np.arange(900, 1000), ddof=1))
+    assert stats.percentile(0) == 900 and stats.percentile(100) == 999
+    assert stats.percentile(50) == 949
+    assert stats.min == 0 and stats.max == 999
+    assert stats.mean == pytest.approx(499.5)
+    assert stats.std == pytest.approx(np.std(np.arange(1000), ddof=1))
+    assert stats.reference == pytest.approx(49.5)
+
+
+def test_drift_needs_a_window():
+    stats = ChannelStats(window=10)
+    stats.update_batch(np.full(9, 5))
+    assert stats.drift is None and stats.percentile(50) == 5
+    stats.update(5)
+    assert stats.drift == pytest.approx(0)
+    stats.reset()
+    assert stats.count == 0 and stats.percentile(50) is None
+
+
+def test_sample_statistics():
+    rows = np.zeros(50, dtype=SAMPLE_DTYPE)
+    rows["adc"] = np.arange(50)
+    rows["preload"] = 7
+    stats = SampleStatistics(window=16)
+    stats.update(rows[:20])
+    stats.update(rows[20:])
+    assert stats["adc"].count == 50 and stats["adc"].max == 49
+    assert stats["preload"].window_std == 0
+    assert stats.snapshot()["adc"]["p50"] == 41
@@ -0,0 +1,62 @@
+"""
+x9402 readMeasurement decoding: the batch decoder (decode_measurements) against
+the scalar path (_decode_measurement)
+"""
+
+import numpy as np
+import pytest
+
+from pyhidpp.core.request import HIDPPRequest
+from pyhidpp.features.x9402 import X9402, signed_count, signed_preload
+
+REPORT_HEADER = [0x11, 0xFF, 0x08, 0x2F]
+
+
+def report(value, baseline, preload):
+    params = [0, value & 0xFF, value >> 8, baseline & 0xFF, baseline >> 8, preload]
+    return bytes(REPORT_HEADER + params + [0] * (20 - len(REPORT_HEADER) - len(params)))
+
+
+def scalar_decode(reports):
+    feature = X9402(None)
+    return [feature._decode_measurement(HIDPPRequest.from_report(r)) for r in reports]
+
+
+def batch_decode(reports):
+    decoded = X9402.decode_measurements(b"".join(reports))
+    return [tuple(int(x) for x in row) for row in decoded]
+
+
+COUNT_EDGES = [0x0000, 0x0001, 0x07FF, 0x0800, 0x0801, 0x8000, 0xFFFE, 0xFFFF]
+PRELOAD_EDGES = [0, 1, 127, 128, 129, 240, 254, 255]
+
+
+@pytest.mark.parametrize("value", COUNT_EDGES)
+@pytest.mark.parametrize("preload", PRELOAD_EDGES)
+def test_edge_values(value, preload):
+    reports = [report(value, value, preload)]
+    assert batch_decode(reports) == scalar_decode(reports)
+
+
+def test_random_reports():
+    rng = np.random.default_rng(9402)
+    rows = rng.integers(0, [1 << 16, 1 << 16, 1 << 8], size=(2000, 3))
+    reports = [report(*map(int, row)) for row in rows]
+    assert batch_decode(reports) == scalar_decode(reports)
+
+
+def test_batch_array_input():
+    reports = [report(0x0801, 0xFFFF, 129), report(0x0800, 0, 128)]
+    array = np.frombuffer(b"".join(reports), dtype=np.uint8).reshape(-1, 20)
+    decoded = X9402.decode_measurements(array)
+    assert [tuple(int(x) for x in row) for row in decoded] == scalar_decode(reports)
+
+
+def test_sign_conversion():
+    assert signed_count(0x0800) == 0x0800  # COUNT_MAX, last positive value
+    assert signed_count(0x0801) == 0x0801 - 0x10000
+    # two's complement: 0xFFFF is -1 (was 0 when the range was taken as 65535)
+    assert signed_count(0xFFFF) == -1
+    assert signed_preload(128) == 128  # PRELOAD_MAX, last positive value
+    assert signed_preload(129) == 240 - 129
+    assert signed_preload(255) == 240 - 255